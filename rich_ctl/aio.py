@@ -0,0 +1,214 @@
+"""
+asyncio support for rich-ctl.
+
+Shaping new text and discovering fonts can take long enough to stall an
+event loop. The coroutines in this module run that work in an executor, so
+that a following render on the loop only reads cached measurements.
+
+prewarm() measures given strings; prerender() renders whole renderables
+(tables, panels, markup) without writing them, so every string Rich
+measures for them is cached, whatever the renderable.
+"""
+
+import asyncio
+import re
+from concurrent.futures import Executor
+from typing import TYPE_CHECKING, Iterable, List, Optional
+
+from rich.pretty import Pretty, is_expandable
+from rich.protocol import is_renderable
+from rich.segment import Segment
+from rich.text import Text
+
+if TYPE_CHECKING:
+    from rich.console import Console, ConsoleOptions
+
+from . import calibrate
+from .fonts import get_font, get_font_index
+from .layout import get_layout
+from .patch import cell_len_many, uncached_texts
+
+# Strings measured per executor job
+DEFAULT_BATCH_SIZE = 256
+
+# Jobs allowed in flight before prewarm() waits for one to finish
+DEFAULT_MAX_PENDING = 4
+
+# Words as Rich's wrapper splits them, with surrounding whitespace
+_WORD_RE = re.compile(r"\s*\S+\s*")
+
+
+def _warm_batch(texts: List[str]) -> None:
+    """Measure and lay out a batch of strings; runs in the executor."""
+    cell_len_many(texts)
+    for text in texts:
+        get_layout(text, calibrate.width_model)
+
+
+def texts_to_warm(objects: Iterable[object]) -> List[str]:
+    """
+    Get the strings Rich will measure when rendering some objects.
+    
+    Strings and Text objects contribute their lines and the words the
+    wrapper measures; other renderables are skipped, and strings are taken
+    as plain text, with any console markup still in them. Use prerender()
+    for renderables and markup.
+    
+    Args:
+        objects: Objects about to be printed.
+    
+    Returns:
+        List of strings, possibly with duplicates.
+    """
+    texts = []
+    for obj in objects:
+        if isinstance(obj, Text):
+            obj = obj.plain
+        if not isinstance(obj, str):
+            continue
+        for line in obj.splitlines():
+            texts.append(line)
+            texts.extend(_WORD_RE.findall(line))
+    return texts
+
+
+async def prewarm(texts: Iterable[str], executor: Optional[Executor] = None,
+                  batch_size: int = DEFAULT_BATCH_SIZE,
+                  max_pending: int = DEFAULT_MAX_PENDING) -> int:
+    """
+    Shape and measure strings off the event loop.
+    
+    Strings are sent to the executor in batches; at most ``max_pending``
+    batches are in flight, and submitting the next one waits until one
+    finishes, so a large input does not flood the executor.
+    
+    Args:
+        texts: Strings that are about to be rendered.
+        executor: Executor to run in; the loop's default executor if None.
+        batch_size: Number of strings per executor job.
+        max_pending: Maximum number of jobs in flight.
+    
+    Returns:
+        The number of strings that were measured.
+    """
+    loop = asyncio.get_running_loop()
+    pending = uncached_texts(texts)
+    slots = asyncio.Semaphore(max_pending)
+    
+    async def run(batch: List[str]) -> None:
+        try:
+            await loop.run_in_executor(executor, _warm_batch, batch)
+        finally:
+            slots.release()
+    
+    jobs = []
+    for start in range(0, len(pending), batch_size):
+        await slots.acquire()
+        jobs.append(asyncio.ensure_future(run(pending[start:start + batch_size])))
+    await asyncio.gather(*jobs)
+    return len(pending)
+
+
+def collect_renderables(console: "Console", objects: Iterable[object], sep: str = " ", end: str = "\n",
+                        markup: Optional[bool] = None, emoji: Optional[bool] = None,
+                        highlight: Optional[bool] = None) -> List[object]:
+    """
+    Convert objects to the renderables Console.print() renders for them.
+    
+    Consecutive strings and Text objects are joined by ``sep`` into one
+    Text, with markup and emoji codes converted by Console.render_str(), as
+    Console.print() does, so the text measured later is the text without
+    markup.
+    
+    Args:
+        console: The console that will print the objects.
+        objects: Objects about to be printed.
+        sep: Separator between strings.
+        end: String written at the end.
+        markup, emoji, highlight: As for Console.print(); the console's
+            settings if None.
+    
+    Returns:
+        List of renderables.
+    """
+    renderables: List[object] = []
+    texts: List[Text] = []
+    
+    def flush() -> None:
+        if texts:
+            renderables.append(Text(sep, end=end).join(texts))
+            texts.clear()
+    
+    for obj in objects:
+        if isinstance(obj, str):
+            texts.append(console.render_str(obj, markup=markup, emoji=emoji, highlight=highlight))
+        elif isinstance(obj, Text):
+            texts.append(obj)
+        elif is_renderable(obj):
+            flush()
+            renderables.append(obj)
+        elif is_expandable(obj):
+            flush()
+            renderables.append(Pretty(obj))
+        else:
+            texts.append(Text(str(obj)))
+    flush()
+    return renderables
+
+
+def _render_batch(console: "Console", renderables: List[object], options: "ConsoleOptions",
+                  crop: bool) -> None:
+    """Render objects without writing them, filling the caches; runs in the executor."""
+    for renderable in renderables:
+        segments = console.render(renderable, options)
+        if crop:
+            # Console.print() crops the lines to the console width, measuring them again
+            segments = Segment.split_and_crop_lines(segments, console.width, pad=False)
+        for _ in segments:
+            pass
+
+
+async def prerender(console: "Console", renderables: Iterable[object],
+                    options: Optional["ConsoleOptions"] = None,
+                    executor: Optional[Executor] = None, crop: bool = True) -> None:
+    """
+    Render objects off the event loop, so rendering them again is cache hits.
+    
+    The objects are rendered in the executor with the console and options
+    they will be printed with, and cropped as Console.print() crops them;
+    the segments are dropped, but every string Rich measures on the way,
+    such as table cells, wrapped lines and their pieces, is shaped and
+    cached there.
+    
+    Args:
+        console: The console that will print the objects.
+        renderables: Renderables, e.g. from collect_renderables().
+        options: Render options; the console's options if None.
+        executor: Executor to run in; the loop's default executor if None.
+        crop: Whether the print crops lines to the console width.
+    """
+    if options is None:
+        options = console.options
+    await asyncio.get_running_loop().run_in_executor(
+        executor, _render_batch, console, list(renderables), options, crop)
+
+
+def load_fonts() -> None:
+    """
+    Build the font index and load the default font.
+    
+    Called from a background thread or executor so the first render does
+    not pay for font discovery.
+    """
+    get_font_index()
+    get_font()
+
+
+async def aload_fonts(executor: Optional[Executor] = None) -> None:
+    """
+    Run load_fonts() in an executor.
+    
+    Args:
+        executor: Executor to run in; the loop's default executor if None.
+    """
+    await asyncio.get_running_loop().run_in_executor(executor, load_fonts)
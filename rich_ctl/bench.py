@@ -0,0 +1,265 @@
+"""
+Benchmarks for rich-ctl.
+
+This module times each stage of the CTL pipeline (font discovery, shaping,
+measurement, rendering helpers) and compares CTLConsole.print with plain
+Rich on tables, panels and wrapped paragraphs. Results are plain data, so
+``rich-ctl bench --json`` can be stored and compared across commits.
+
+Benchmarks clear the shared caches and switch the Rich patches on and off;
+run them in their own process rather than inside an application.
+"""
+
+import io
+import platform
+import statistics
+import sys
+import timeit
+from time import perf_counter
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from rich.console import Console
+from rich.panel import Panel
+from rich.table import Table
+
+from . import __version__, calibrate, fonts, patch
+from .cache import clear_cache
+from .console import CTLConsole
+from .fontindex import FontIndex
+from .itemize import _itemize_span
+from .patch import ctl_cell_len
+from .render import improve_rendering
+from .shape import shape_text
+
+# Sample text per script; "mixed" combines scripts with Latin text
+SAMPLES = {
+    "telugu": "తెలుగు భాష ద్రావిడ భాషల కుటుంబానికి చెందినది",
+    "hindi": "हिन्दी भारत की राजभाषा है और देवनागरी लिपि में लिखी जाती है",
+    "arabic": "اللغة العربية هي أكثر اللغات السامية تحدثا",
+    "mixed": "Status: తెలుగు, हिन्दी and مرحبا in one line",
+}
+
+# Width of the consoles used for rendering benchmarks
+CONSOLE_WIDTH = 80
+
+# Minimum time per repeat, in seconds
+DEFAULT_MIN_TIME = 0.05
+
+DEFAULT_REPEAT = 5
+
+
+class BenchResult(NamedTuple):
+    """Timing of one benchmark; times are per call, in microseconds."""
+
+    name: str
+    group: str
+    loops: int
+    best_us: float
+    median_us: float
+    mean_us: float
+
+
+class _Case(NamedTuple):
+    name: str
+    group: str
+    func: Callable[[], object]
+    reset: Optional[Callable[[], None]] = None
+    prepare: Optional[Callable[[], None]] = None
+
+
+def _cold() -> None:
+    """Reset the in-memory shaping caches."""
+    clear_cache()
+    _itemize_span.cache_clear()
+
+
+def _time(func: Callable[[], object], reset: Optional[Callable[[], None]],
+          repeat: int, min_time: float) -> Tuple[int, List[float]]:
+    """
+    Time a function.
+
+    With a ``reset`` function, each call is timed on its own after calling
+    ``reset``, so the reset is not counted.
+
+    Returns:
+        (loops, samples): calls in the last repeat, and the mean seconds
+        per call of each repeat.
+    """
+    samples = []
+    if reset is None:
+        timer = timeit.Timer(func)
+        loops, elapsed = timer.autorange()
+        loops = max(1, int(loops * min_time / max(elapsed, 1e-9)))
+        for _ in range(repeat):
+            samples.append(timer.timeit(loops) / loops)
+        return loops, samples
+    loops = 0
+    for _ in range(repeat):
+        loops = 0
+        elapsed = 0.0
+        while loops == 0 or elapsed < min_time:
+            reset()
+            start = perf_counter()
+            func()
+            elapsed += perf_counter() - start
+            loops += 1
+        samples.append(elapsed / loops)
+    return loops, samples
+
+
+def sample_renderables(text: str) -> Dict[str, object]:
+    """
+    Build the renderables compared between Rich and rich-ctl.
+
+    Args:
+        text: Text filling the renderables, such as one of SAMPLES.
+
+    Returns:
+        Mapping of kind ("table", "panel", "paragraph") to a renderable.
+    """
+    table = Table(title="Report")
+    table.add_column("#", justify="right")
+    table.add_column("Text")
+    table.add_column("Note")
+    for i in range(20):
+        table.add_row(str(i), text, text.split()[0])
+    return {
+        "table": table,
+        "panel": Panel(" ".join([text] * 4), title=text.split()[0]),
+        "paragraph": " ".join([text] * 40),
+    }
+
+
+def _print_case(console_class: type, renderable: object) -> Callable[[], object]:
+    """Build a function printing a renderable; the console is created on first call."""
+    consoles = []
+
+    def render():
+        if not consoles:
+            consoles.append(console_class(width=CONSOLE_WIDTH, force_terminal=True, color_system=None))
+        console = consoles[0]
+        console.file = io.StringIO()
+        console.print(renderable)
+    return render
+
+
+def _cases() -> List[_Case]:
+    """
+    Build the list of benchmark cases.
+
+    Building the cases has no side effects; a case's ``prepare`` function
+    switches the Rich patches on or off before it runs.
+    """
+    cases = [
+        _Case("font_index_scan", "fonts",
+              lambda: FontIndex(fonts.get_system_font_paths())),
+        _Case("font_index_cached", "fonts", fonts.get_font_index,
+              reset=lambda: setattr(fonts, "_font_index", None)),
+    ]
+    for script, text in SAMPLES.items():
+        cases += [
+            _Case(f"shape_text_cold/{script}", "shape", lambda text=text: shape_text(text), reset=_cold),
+            _Case(f"shape_text_warm/{script}", "shape", lambda text=text: shape_text(text)),
+            _Case(f"cell_len_miss/{script}", "measure", lambda text=text: ctl_cell_len(text), reset=clear_cache),
+            _Case(f"cell_len_hit/{script}", "measure", lambda text=text: ctl_cell_len(text)),
+            _Case(f"improve_rendering/{script}", "render", lambda text=text: improve_rendering(text)),
+        ]
+    for script, text in SAMPLES.items():
+        for kind, renderable in sample_renderables(text).items():
+            cases += [
+                _Case(f"print_rich/{kind}/{script}", "print",
+                      _print_case(Console, renderable), prepare=patch.unpatch_rich),
+                _Case(f"print_ctl/{kind}/{script}", "print",
+                      _print_case(CTLConsole, renderable), prepare=patch.patch_rich),
+            ]
+    return cases
+
+
+def run_benchmarks(filters: Iterable[str] = (), repeat: int = DEFAULT_REPEAT,
+                   min_time: float = DEFAULT_MIN_TIME) -> List[BenchResult]:
+    """
+    Run the benchmarks.
+
+    Args:
+        filters: Substrings of benchmark names to run; all benchmarks if empty.
+        repeat: Number of timed repeats per benchmark.
+        min_time: Minimum time per repeat in seconds.
+
+    Returns:
+        List of BenchResult, in run order.
+    """
+    filters = list(filters)
+    was_patched = bool(patch._patched)
+    results = []
+    try:
+        for case in _cases():
+            if filters and not any(f in case.name for f in filters):
+                continue
+            if case.prepare is not None:
+                case.prepare()
+            case.func()
+            loops, samples = _time(case.func, case.reset, repeat, min_time)
+            results.append(BenchResult(
+                case.name, case.group, loops,
+                min(samples) * 1e6, statistics.median(samples) * 1e6, statistics.mean(samples) * 1e6,
+            ))
+    finally:
+        if was_patched:
+            patch.patch_rich()
+        else:
+            patch.unpatch_rich()
+    return results
+
+
+def overhead(results: Iterable[BenchResult]) -> Dict[str, float]:
+    """
+    Get the rendering overhead of rich-ctl over plain Rich.
+
+    Args:
+        results: Results including matching print_rich/print_ctl benchmarks.
+
+    Returns:
+        Mapping of "kind/script" to the relative overhead of the median
+        time, e.g. 0.05 for 5% slower than plain Rich.
+    """
+    medians = {result.name: result.median_us for result in results}
+    ratios = {}
+    for name, median in medians.items():
+        if name.startswith("print_ctl/"):
+            key = name[len("print_ctl/"):]
+            base = medians.get(f"print_rich/{key}")
+            if base:
+                ratios[key] = median / base - 1
+    return ratios
+
+
+def report(results: List[BenchResult]) -> dict:
+    """
+    Build a JSON-serializable report of benchmark results and the environment.
+
+    Args:
+        results: Results from run_benchmarks().
+
+    Returns:
+        Dictionary with "environment", "results" and "overhead" entries.
+    """
+    import rich
+    import uharfbuzz as hb
+    try:
+        from importlib.metadata import version
+        rich_version = version("rich")
+    except Exception:
+        rich_version = getattr(rich, "__version__", "unknown")
+    return {
+        "environment": {
+            "rich_ctl": __version__,
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "harfbuzz": hb.version_string(),
+            "rich": rich_version,
+            "width_model": calibrate.width_model.describe(),
+        },
+        "results": [result._asdict() for result in results],
+        "overhead": overhead(results),
+    }
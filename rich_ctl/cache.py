@@ -0,0 +1,425 @@
+"""
+Shaping cache for rich-ctl.
+
+This module provides the single bounded cache shared by the shaping and
+measurement layers, with size/byte limits and LRU or TinyLFU eviction.
+The shared instance is split into independently locked stripes so that
+threads measuring different strings rarely wait for each other.
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, List, NamedTuple, Optional
+
+# Default limits, overridable through install_rich_ctl(**options)
+DEFAULT_MAXSIZE = 8192
+DEFAULT_MAXBYTES = 32 * 1024 * 1024
+
+# Number of independently locked stripes in the shared cache
+DEFAULT_STRIPES = 16
+
+# Smallest share of the limits a stripe gets; smaller limits use fewer stripes
+MIN_STRIPE_ENTRIES = 16
+MIN_STRIPE_BYTES = 2 * 1024 * 1024
+
+POLICIES = ("lru", "tinylfu")
+
+
+class CacheKey(NamedTuple):
+    """Key of a cache entry; every field that changes the result is part of it."""
+
+    text: str
+    script: Optional[str] = None
+    direction: Optional[str] = None
+    language: str = "en"
+    font: Optional[str] = None
+    width_model: Optional[Hashable] = None
+    kind: Optional[str] = None
+
+
+class CacheInfo(NamedTuple):
+    """Statistics returned by ShapeCache.cache_info()."""
+
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    maxbytes: int
+    currsize: int
+    currbytes: int
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estimate the memory held by a cached value.
+
+    Values may report their own footprint through an ``nbytes`` attribute;
+    sequences are estimated from their elements.
+
+    Args:
+        value: The cached value.
+
+    Returns:
+        Approximate size in bytes.
+    """
+    nbytes = getattr(value, "nbytes", None)
+    if nbytes is not None:
+        return nbytes
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        for item in value:
+            size += sys.getsizeof(item)
+            item_dict = getattr(item, "__dict__", None)
+            if item_dict is not None:
+                size += sys.getsizeof(item_dict)
+    return size
+
+
+class _FrequencySketch:
+    """
+    Count-min sketch with periodic halving, used for TinyLFU admission.
+
+    Counters are kept in a bytearray per row and saturate at 15, so the
+    sketch stays a few kilobytes regardless of how many keys it sees.
+    """
+
+    _ROWS = 4
+    _SEEDS = (0x9E3779B1, 0x85EBCA77, 0xC2B2AE3D, 0x27D4EB2F)
+
+    def __init__(self, width: int):
+        self._width = max(64, width)
+        self._rows = [bytearray(self._width) for _ in range(self._ROWS)]
+        self._additions = 0
+        self._reset_at = self._width * 10
+
+    def _indexes(self, key: Hashable):
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        for seed in self._SEEDS:
+            # Take high bits of the product so every row uses a different hash
+            yield (((h * seed) & 0xFFFFFFFFFFFFFFFF) >> 32) % self._width
+
+    def increment(self, key: Hashable) -> None:
+        for row, index in zip(self._rows, self._indexes(key)):
+            if row[index] < 15:
+                row[index] += 1
+        self._additions += 1
+        if self._additions >= self._reset_at:
+            self._halve()
+
+    def frequency(self, key: Hashable) -> int:
+        return min(row[index] for row, index in zip(self._rows, self._indexes(key)))
+
+    def _halve(self) -> None:
+        # Age all counters so that old popularity decays
+        for i, row in enumerate(self._rows):
+            self._rows[i] = bytearray(count >> 1 for count in row)
+        self._additions //= 2
+
+
+class ShapeCache:
+    """
+    Bounded cache for shaped runs and measured widths.
+
+    Entries are evicted in least-recently-used order once either the entry
+    limit or the byte limit is exceeded. With the "tinylfu" policy a new
+    entry is only admitted if it has been requested more often than the
+    entry it would evict, which keeps one-off strings (such as unique log
+    lines) from flushing frequently used labels.
+
+    All operations take an internal lock, so an instance can be shared
+    between threads.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, maxbytes: int = DEFAULT_MAXBYTES,
+                 policy: str = "lru"):
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._bytes = 0
+        self._sketch: Optional[_FrequencySketch] = None
+        self.maxsize = DEFAULT_MAXSIZE
+        self.maxbytes = DEFAULT_MAXBYTES
+        self.policy = "lru"
+        self.configure(maxsize=maxsize, maxbytes=maxbytes, policy=policy)
+
+    def configure(self, maxsize: Optional[int] = None, maxbytes: Optional[int] = None,
+                  policy: Optional[str] = None) -> None:
+        """
+        Change the cache limits or eviction policy.
+
+        Args:
+            maxsize: Maximum number of entries (0 disables caching).
+            maxbytes: Maximum estimated bytes held by the entries.
+            policy: Eviction policy, "lru" or "tinylfu".
+
+        Raises:
+            ValueError: If the policy is unknown or a limit is negative.
+        """
+        _check_limits(maxsize, maxbytes, policy)
+        with self._lock:
+            if policy is not None:
+                self.policy = policy
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if maxbytes is not None:
+                self.maxbytes = maxbytes
+
+            if self.policy != "tinylfu":
+                self._sketch = None
+            elif self._sketch is None or maxsize is not None:
+                self._sketch = _FrequencySketch(self.maxsize)
+            self._evict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Look up an entry, marking it as recently used.
+
+        Args:
+            key: The cache key.
+            default: Value returned on a miss.
+
+        Returns:
+            The cached value, or ``default``.
+        """
+        with self._lock:
+            if self._sketch is not None:
+                self._sketch.increment(key)
+            entry = self._data.get(key)
+            if entry is None:
+                self._misses += 1
+                return default
+            self._data.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, nbytes: Optional[int] = None) -> None:
+        """
+        Store an entry, evicting older entries if a limit is exceeded.
+
+        Args:
+            key: The cache key.
+            value: The value to store.
+            nbytes: Size of the value in bytes; estimated if omitted.
+        """
+        if nbytes is None:
+            nbytes = estimate_size(value)
+        with self._lock:
+            if self.maxsize == 0 or nbytes > self.maxbytes:
+                return
+
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            elif self._sketch is not None and len(self._data) >= self.maxsize:
+                # TinyLFU admission: only replace the victim with a more popular key
+                victim = next(iter(self._data))
+                if self._sketch.frequency(key) <= self._sketch.frequency(victim):
+                    return
+
+            self._data[key] = (value, nbytes)
+            self._bytes += nbytes
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop least-recently-used entries until both limits are met; the lock must be held."""
+        data = self._data
+        while data and (len(data) > self.maxsize or self._bytes > self.maxbytes):
+            _, (_, nbytes) = data.popitem(last=False)
+            self._bytes -= nbytes
+            self._evictions += 1
+
+    def clear(self) -> None:
+        """Remove all entries and reset the statistics."""
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+            if self._sketch is not None:
+                self._sketch = _FrequencySketch(self.maxsize)
+
+    def cache_info(self) -> CacheInfo:
+        """
+        Get cache statistics.
+
+        Returns:
+            A CacheInfo tuple with hit/miss/eviction counts and current usage.
+        """
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._evictions,
+                             self.maxsize, self.maxbytes, len(self._data), self._bytes)
+
+    def keys(self) -> List[Hashable]:
+        """
+        Get a snapshot of the cached keys, least recently used first.
+
+        Returns:
+            List of keys.
+        """
+        with self._lock:
+            return list(self._data)
+
+    def items(self) -> List[tuple]:
+        """
+        Get a snapshot of the cached entries, least recently used first.
+
+        Returns:
+            List of (key, (value, nbytes)) pairs.
+        """
+        with self._lock:
+            return list(self._data.items())
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+
+def _check_limits(maxsize: Optional[int], maxbytes: Optional[int], policy: Optional[str]) -> None:
+    """Validate configure() arguments before any of them is applied."""
+    if policy is not None and policy not in POLICIES:
+        raise ValueError(f"Unknown cache policy {policy!r}, expected one of {POLICIES}")
+    if maxsize is not None and maxsize < 0:
+        raise ValueError("maxsize must be >= 0")
+    if maxbytes is not None and maxbytes < 0:
+        raise ValueError("maxbytes must be >= 0")
+
+
+class StripedShapeCache:
+    """
+    ShapeCache split into independently locked stripes.
+
+    Each key lives in the stripe chosen by its hash, and each stripe holds
+    an even share of the limits, so eviction order is least-recently-used
+    within a stripe rather than globally. Limits too small to give every
+    stripe MIN_STRIPE_ENTRIES entries and MIN_STRIPE_BYTES bytes are split
+    over fewer stripes, down to one, so every key can be cached and an
+    entry of up to MIN_STRIPE_BYTES (or the whole byte limit, if smaller)
+    is never too big for its stripe. It has the same interface as
+    ShapeCache, with statistics summed over the stripes.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, maxbytes: int = DEFAULT_MAXBYTES,
+                 policy: str = "lru", stripes: int = DEFAULT_STRIPES):
+        if stripes < 1:
+            raise ValueError("stripes must be >= 1")
+        self.max_stripes = stripes
+        self._stripes = [ShapeCache(0, 0, policy)]
+        self.maxsize = DEFAULT_MAXSIZE
+        self.maxbytes = DEFAULT_MAXBYTES
+        self.policy = policy
+        self.configure(maxsize=maxsize, maxbytes=maxbytes)
+
+    def _stripe(self, key: Hashable) -> ShapeCache:
+        stripes = self._stripes
+        return stripes[hash(key) % len(stripes)]
+
+    def configure(self, maxsize: Optional[int] = None, maxbytes: Optional[int] = None,
+                  policy: Optional[str] = None) -> None:
+        """
+        Change the cache limits or eviction policy; see ShapeCache.configure().
+        """
+        _check_limits(maxsize, maxbytes, policy)
+        if maxsize is not None:
+            self.maxsize = maxsize
+        if maxbytes is not None:
+            self.maxbytes = maxbytes
+        if policy is not None:
+            self.policy = policy
+        count = max(1, min(self.max_stripes, self.maxsize // MIN_STRIPE_ENTRIES,
+                           self.maxbytes // MIN_STRIPE_BYTES))
+        old = self._stripes
+        stripes = old if count == len(old) else [ShapeCache(0, 0, self.policy) for _ in range(count)]
+        new = stripes is not old
+        for i, stripe in enumerate(stripes):
+            # Spread the remainder so the stripe limits add up to the total
+            stripe.configure(
+                maxsize=self.maxsize // count + (i < self.maxsize % count) if new or maxsize is not None else None,
+                maxbytes=self.maxbytes // count + (i < self.maxbytes % count) if new or maxbytes is not None else None,
+                policy=policy,
+            )
+        if new:
+            # Move the entries over, oldest first, so recency is kept within each stripe
+            for stripe in old:
+                for key, (value, nbytes) in stripe.items():
+                    stripes[hash(key) % count].put(key, value, nbytes)
+            self._stripes = stripes
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Look up an entry; see ShapeCache.get()."""
+        return self._stripe(key).get(key, default)
+
+    def put(self, key: Hashable, value: Any, nbytes: Optional[int] = None) -> None:
+        """Store an entry; see ShapeCache.put()."""
+        self._stripe(key).put(key, value, nbytes)
+
+    def clear(self) -> None:
+        """Remove all entries and reset the statistics."""
+        for stripe in self._stripes:
+            stripe.clear()
+
+    def cache_info(self) -> CacheInfo:
+        """
+        Get cache statistics summed over all stripes.
+
+        Returns:
+            A CacheInfo tuple.
+        """
+        infos = [stripe.cache_info() for stripe in self._stripes]
+        return CacheInfo(sum(i.hits for i in infos), sum(i.misses for i in infos),
+                         sum(i.evictions for i in infos), self.maxsize, self.maxbytes,
+                         sum(i.currsize for i in infos), sum(i.currbytes for i in infos))
+
+    def keys(self) -> List[Hashable]:
+        """
+        Get a snapshot of the cached keys of all stripes.
+
+        Returns:
+            List of keys.
+        """
+        return [key for stripe in self._stripes for key in stripe.keys()]
+
+    def __len__(self) -> int:
+        return sum(len(stripe) for stripe in self._stripes)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._stripe(key)
+
+
+# Singleton cache instance shared by shape.py and patch.py
+shape_cache = StripedShapeCache()
+
+
+def cache_info() -> CacheInfo:
+    """
+    Get statistics for the shared shaping cache.
+
+    Returns:
+        A CacheInfo tuple.
+    """
+    return shape_cache.cache_info()
+
+
+def clear_cache() -> None:
+    """
+    Clear the shared shaping cache.
+    """
+    shape_cache.clear()
+
+
+def configure_cache(maxsize: Optional[int] = None, maxbytes: Optional[int] = None,
+                    policy: Optional[str] = None) -> None:
+    """
+    Configure the shared shaping cache.
+
+    Args:
+        maxsize: Maximum number of entries.
+        maxbytes: Maximum estimated bytes held by the entries.
+        policy: Eviction policy, "lru" or "tinylfu".
+    """
+    shape_cache.configure(maxsize=maxsize, maxbytes=maxbytes, policy=policy)
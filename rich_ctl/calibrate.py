@@ -0,0 +1,349 @@
+"""
+Terminal width calibration for rich-ctl.
+
+HarfBuzz reports cluster advances in 1/64 pixel at the shaping size
+(fonts.DEFAULT_FONT_SIZE). This module decides how many terminal cells
+such a cluster takes:
+
+- The width of one cell is derived from a monospace font's '0' advance and
+  units-per-em, at the same size, unless it is given in pixels.
+- A terminal profile says how the terminal allots cells: by the shaped
+  advance, by grapheme cluster, or by per-code-point wcwidth. Profiles come
+  from a table and are selected by name or from the environment (TERM,
+  TERM_PROGRAM, VTE_VERSION, or RICH_CTL_TERMINAL).
+
+A WidthModel precompiles the conversion into a lookup table indexed by
+advance (and a memo keyed by cluster text for the text-based profiles), so
+measuring a cluster is a table hit.
+"""
+
+import os
+from typing import Dict, Hashable, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Union
+
+from .measure import _TABLE_LIMIT, _load_width_table, _width_beyond_table, grapheme_widths
+
+# How a profile measures a cluster
+SHAPED = "shaped"      # from the cluster's advance in the shaping font
+GRAPHEME = "grapheme"  # from the width table, one width per grapheme cluster
+WCWIDTH = "wcwidth"    # the sum of per-code-point widths, like wcswidth()
+
+# Monospace fonts tried, in order, for the width of a terminal cell
+MONOSPACE_FONTS = ("DejaVu Sans Mono", "Noto Sans Mono", "Liberation Mono", "Menlo",
+                   "Consolas", "Courier New", "FreeMono")
+
+# Cells covered by the precomputed advance table; wider clusters are computed
+_TABLE_CELLS = 16
+
+# Cluster text widths remembered by a text-based model before the memo is reset
+_MAX_CLUSTER_MEMO = 1 << 16
+
+
+class TerminalProfile(NamedTuple):
+    """How a terminal allots cells to clusters of complex-script text."""
+
+    name: str
+    mode: str
+    rounding: str
+    description: str
+
+
+# name, mode, rounding of shaped advances, description
+_PROFILE_TABLE = (
+    ("default", SHAPED, "round",
+     "Cells follow the font's advances, rounded to the nearest cell"),
+    ("mlterm", SHAPED, "ceil",
+     "Shaping terminal; a cluster takes every cell its glyphs touch"),
+    ("kitty", GRAPHEME, "round",
+     "One width per grapheme cluster"),
+    ("wezterm", GRAPHEME, "round",
+     "One width per grapheme cluster"),
+    ("gnome-terminal", WCWIDTH, "round",
+     "VTE; each code point takes its wcwidth()"),
+    ("wcwidth-compatible", WCWIDTH, "round",
+     "Each code point takes its wcwidth(), as most terminals without shaping do"),
+)
+
+PROFILES: Dict[str, TerminalProfile] = {row[0]: TerminalProfile(*row) for row in _PROFILE_TABLE}
+
+# Environment variable, value (None for any value) and the profile it selects
+_DETECT_TABLE = (
+    ("TERM", "xterm-kitty", "kitty"),
+    ("TERM_PROGRAM", "WezTerm", "wezterm"),
+    ("TERM", "mlterm", "mlterm"),
+    ("VTE_VERSION", None, "gnome-terminal"),
+)
+
+# Explicit profile choice, taking precedence over detection
+PROFILE_ENV = "RICH_CTL_TERMINAL"
+
+_cell_units_cache: Dict[Optional[str], int] = {}
+
+
+def register_profile(profile: TerminalProfile) -> None:
+    """
+    Add or replace a terminal profile.
+
+    Args:
+        profile: The profile; it is selected by ``profile.name``.
+
+    Raises:
+        ValueError: If the mode or rounding is unknown.
+    """
+    if profile.mode not in (SHAPED, GRAPHEME, WCWIDTH):
+        raise ValueError(f"Unknown width mode: {profile.mode!r}")
+    if profile.rounding not in ("round", "ceil"):
+        raise ValueError(f"Unknown rounding: {profile.rounding!r}")
+    PROFILES[profile.name] = profile
+
+
+def detect_profile(environ: Optional[Mapping[str, str]] = None) -> str:
+    """
+    Choose a terminal profile from the environment.
+
+    Args:
+        environ: Environment to inspect; defaults to os.environ.
+
+    Returns:
+        The name of a profile in PROFILES; "default" if nothing matches.
+    """
+    if environ is None:
+        environ = os.environ
+    chosen = environ.get(PROFILE_ENV)
+    if chosen in PROFILES:
+        return chosen
+    for variable, value, name in _DETECT_TABLE:
+        current = environ.get(variable)
+        if current is not None and (value is None or current == value):
+            return name
+    return "default"
+
+
+def font_cell_units(font: Optional[str] = None) -> int:
+    """
+    Get the width of a terminal cell in advance units (1/64 pixel at the shaping size).
+
+    The width is the advance of '0' in a monospace font, scaled from its
+    units-per-em to the shaping size; half an em if the font has no '0'.
+
+    Args:
+        font: Path or name of the terminal's font; the first installed
+            font of MONOSPACE_FONTS, or else the default font, if None.
+
+    Returns:
+        The cell width in advance units.
+    """
+    units = _cell_units_cache.get(font)
+    if units is not None:
+        return units
+
+    import uharfbuzz as hb
+    from .fonts import DEFAULT_FONT_SIZE, find_font_face, get_face, resolve_font_face
+
+    found = None
+    if font is not None:
+        found = resolve_font_face(font_path=font) if "/" in font else find_font_face(font)
+    else:
+        for name in MONOSPACE_FONTS:
+            found = find_font_face(name)
+            if found is not None:
+                break
+    if found is None:
+        found = resolve_font_face()
+
+    scale = DEFAULT_FONT_SIZE * 64
+    units = scale // 2
+    if found is not None:
+        try:
+            face = get_face(*found)
+        except ValueError:
+            face = None
+        if face is not None and face.upem:
+            # An unscaled font reports advances in font units
+            unscaled = hb.Font(face)
+            glyph = unscaled.get_nominal_glyph(ord("0"))
+            advance = unscaled.get_glyph_h_advance(glyph) if glyph else 0
+            if advance <= 0:
+                advance = face.upem // 2
+            units = round(advance * scale / face.upem)
+    units = max(1, units)
+    _cell_units_cache[font] = units
+    return units
+
+
+class WidthModel:
+    """
+    Converts shaped clusters to terminal cells for one terminal profile.
+
+    Construction is cheap; the cell width and lookup tables are computed on
+    first use, so the fonts are only loaded once complex-script text is
+    measured. ``key`` identifies the model's configuration in cache keys.
+    """
+
+    __slots__ = ("profile", "cell_width_px", "font", "key", "_cell_units", "_table", "_clusters")
+
+    def __init__(self, profile: Union[str, TerminalProfile, None] = None,
+                 cell_width_px: Optional[float] = None, font: Optional[str] = None):
+        """
+        Args:
+            profile: Profile or profile name; detected from the environment if None.
+            cell_width_px: Width of a cell in pixels at the shaping size;
+                derived from ``font`` if None.
+            font: Terminal font used to derive the cell width.
+
+        Raises:
+            ValueError: If the profile name is unknown or the width is not positive.
+        """
+        if profile is None:
+            profile = detect_profile()
+        if isinstance(profile, str):
+            if profile not in PROFILES:
+                raise ValueError(f"Unknown terminal profile: {profile!r} "
+                                 f"(known: {', '.join(sorted(PROFILES))})")
+            profile = PROFILES[profile]
+        if cell_width_px is not None and cell_width_px <= 0:
+            raise ValueError("cell_width_px must be positive")
+        self.profile = profile
+        self.cell_width_px = cell_width_px
+        self.font = font
+        self.key: Hashable = (profile, cell_width_px, font)
+        self._cell_units: Optional[int] = None
+        self._table: Optional[bytes] = None
+        self._clusters: Dict[str, int] = {}
+
+    @property
+    def cell_units(self) -> int:
+        """Width of a cell in advance units (1/64 pixel at the shaping size)."""
+        if self._cell_units is None:
+            if self.cell_width_px is not None:
+                self._cell_units = max(1, round(self.cell_width_px * 64))
+            else:
+                self._cell_units = font_cell_units(self.font)
+        return self._cell_units
+
+    @property
+    def table(self) -> bytes:
+        """Cells per advance, for advances below _TABLE_CELLS cells."""
+        if self._table is None:
+            self._table = bytes(self._convert(advance)
+                                for advance in range(self.cell_units * _TABLE_CELLS))
+        return self._table
+
+    def _convert(self, advance: int) -> int:
+        """Convert an advance to cells by the profile's rounding."""
+        if advance <= 0:
+            return 0
+        units = self.cell_units
+        if self.profile.rounding == "ceil":
+            cells = -(-advance // units)
+        else:
+            cells = max(1, (2 * advance + units) // (2 * units))
+        return cells
+
+    def cells(self, advance: int) -> int:
+        """
+        Get the cells taken by a cluster advance.
+
+        Args:
+            advance: Cluster advance in 1/64 pixel at the shaping size.
+
+        Returns:
+            Width in cells.
+        """
+        table = self.table
+        return table[advance] if 0 <= advance < len(table) else self._convert(advance)
+
+    def text_cells(self, text: str) -> int:
+        """
+        Get the cells taken by text under a text-based profile.
+
+        Args:
+            text: A cluster or any string.
+
+        Returns:
+            Width in cells by grapheme cluster or per code point.
+        """
+        if self.profile.mode == GRAPHEME:
+            cells = sum(grapheme_widths(text)[1])
+        else:
+            table, _ = _load_width_table()
+            cells = 0
+            for char in text:
+                codepoint = ord(char)
+                cells += table[codepoint] if codepoint < _TABLE_LIMIT else _width_beyond_table(codepoint)
+        return cells
+
+    def cluster_widths(self, text: str, offsets: Sequence[int], advances: Iterable[int]) -> List[int]:
+        """
+        Get the cells of each cluster of a shaped run.
+
+        Args:
+            text: The run text.
+            offsets: Cluster boundaries, one more than there are clusters.
+            advances: Cluster advances.
+
+        Returns:
+            Width in cells of each cluster.
+        """
+        if self.profile.mode == SHAPED:
+            table = self.table
+            limit = len(table)
+            return [table[advance] if 0 <= advance < limit else self._convert(advance)
+                    for advance in advances]
+        memo = self._clusters
+        if len(memo) > _MAX_CLUSTER_MEMO:
+            memo.clear()
+        widths = []
+        for i in range(len(offsets) - 1):
+            cluster = text[offsets[i]:offsets[i + 1]]
+            cells = memo.get(cluster)
+            if cells is None:
+                cells = memo[cluster] = self.text_cells(cluster)
+            widths.append(cells)
+        return widths
+
+    @property
+    def shaped(self) -> bool:
+        """Whether widths depend on shaping, rather than on the text alone."""
+        return self.profile.mode == SHAPED
+
+    def describe(self) -> dict:
+        """Get the model's settings, for reports."""
+        return {
+            "profile": self.profile.name,
+            "mode": self.profile.mode,
+            "rounding": self.profile.rounding,
+            "cell_units": self.cell_units,
+            "cell_width_px": self.cell_units / 64,
+            "font": self.font,
+        }
+
+    def __getstate__(self):
+        return (self.profile, self.cell_width_px, self.font, self._cell_units)
+
+    def __setstate__(self, state):
+        profile, cell_width_px, font, cell_units = state
+        self.__init__(profile, cell_width_px, font)
+        self._cell_units = cell_units
+
+    def __repr__(self) -> str:
+        return f"WidthModel(profile={self.profile.name!r}, cell_width_px={self.cell_width_px!r}, font={self.font!r})"
+
+
+# Model used by the Rich patches, set by install_rich_ctl()
+width_model = WidthModel()
+
+
+def set_width_model(model: WidthModel) -> WidthModel:
+    """
+    Replace the width model used for measuring.
+
+    Args:
+        model: The new model.
+
+    Returns:
+        The previous model.
+    """
+    global width_model
+    previous = width_model
+    width_model = model
+    return previous
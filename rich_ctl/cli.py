@@ -2,6 +2,9 @@
 Command-line interface for rich-ctl.
 
 Provides a simple CLI for demonstrating rich-ctl capabilities.
+
+Commands import what they use, so argument parsing and light commands do
+not pay for loading Rich's console or HarfBuzz.
 """
 
 import argparse
@@ -9,13 +12,6 @@ import sys
 import os
 from typing import List, Optional
 
-from rich.console import Console as RichConsole
-
-from .shape import shape_text
-from .measure import px_to_cells
-from .fonts import get_font, list_available_fonts
-from .__init__ import CTLConsole
-
 
 def echo_command(text: str, bidi: bool = False, script: Optional[str] = None, debug: bool = False) -> None:
     """
@@ -27,6 +23,9 @@ def echo_command(text: str, bidi: bool = False, script: Optional[str] = None, de
         script: Optional script tag (e.g., 'arab', 'deva', 'telu').
         debug: Whether to print debug information.
     """
+    from rich.console import Console as RichConsole
+    from .console import CTLConsole
+    
     # Create a rich-ctl console with the specified options
     ctl_console = CTLConsole(bidi=bidi)
     
@@ -41,22 +40,24 @@ def echo_command(text: str, bidi: bool = False, script: Optional[str] = None, de
     
     # Print debug information if requested
     if debug:
+        from . import calibrate
+        from .layout import cluster_cells
+        from .shape import shape_text_compact
+        
         # Shape text with the specified script
-        shaped_text = shape_text(text, script=script) if script else shape_text(text)
+        run = shape_text_compact(text, script=script) if script else shape_text_compact(text)
         
         # Print debug information
         ctl_console.print("\n[bold]Debug information:[/bold]")
         ctl_console.print(f"Script: {script if script else 'auto'}")
         
-        # Print information about each cluster
-        for i, cluster in enumerate(shaped_text):
-            cell_width = px_to_cells(cluster.advance_px)
-            ctl_console.print(f"Cluster {i+1}: '{cluster.text}' - {cluster.advance_px}px - {cell_width} cells")
+        # Print information about each cluster, with widths converted for the whole run at once
+        widths, cells = cluster_cells(run, calibrate.width_model)
+        for i, cluster in enumerate(run):
+            ctl_console.print(f"Cluster {i+1}: '{cluster.text}' - {cluster.advance_px}px - {widths[i]} cells")
         
         # Print total width information
-        total_px = sum(cluster.advance_px for cluster in shaped_text)
-        total_cells = px_to_cells(total_px)
-        ctl_console.print(f"\nTotal width: {total_px}px - {total_cells} cells")
+        ctl_console.print(f"\nTotal width: {run.total_advance}px - {cells[-1]} cells")
 
 
 def fonts_command(script: Optional[str] = None) -> None:
@@ -66,6 +67,9 @@ def fonts_command(script: Optional[str] = None) -> None:
     Args:
         script: Optional script tag to filter by (e.g., 'arab', 'deva')
     """
+    from .console import CTLConsole
+    from .fonts import list_available_fonts
+    
     console = CTLConsole()
     fonts = list_available_fonts(script)
     
@@ -86,6 +90,8 @@ def examples_command() -> None:
     """
     Show example texts in various scripts.
     """
+    from .console import CTLConsole
+    
     console = CTLConsole()
     
     examples = [
@@ -103,6 +109,159 @@ def examples_command() -> None:
         console.print(text)
 
 
+def bench_command(filters: List[str], repeat: int, min_time: float,
+                  as_json: bool = False, output: Optional[str] = None) -> None:
+    """
+    Run the benchmark suite and print or save the results.
+    
+    Args:
+        filters: Substrings of benchmark names to run; all if empty.
+        repeat: Number of timed repeats per benchmark.
+        min_time: Minimum time per repeat in seconds.
+        as_json: Whether to print JSON instead of a table.
+        output: Optional file to write the JSON report to.
+    """
+    import json
+    from .bench import report, run_benchmarks
+    
+    data = report(run_benchmarks(filters, repeat=repeat, min_time=min_time))
+    if output:
+        with open(output, "w", encoding="utf-8") as report_file:
+            json.dump(data, report_file, indent=2)
+    if as_json:
+        print(json.dumps(data, indent=2))
+        return
+    
+    from rich.console import Console as RichConsole
+    from rich.table import Table
+    
+    table = Table(title="rich-ctl benchmarks (microseconds per call)")
+    table.add_column("Benchmark")
+    table.add_column("Best", justify="right")
+    table.add_column("Median", justify="right")
+    table.add_column("Loops", justify="right")
+    for result in data["results"]:
+        table.add_row(result["name"], f"{result['best_us']:.1f}", f"{result['median_us']:.1f}", str(result["loops"]))
+    console = RichConsole()
+    console.print(table)
+    for key, ratio in data["overhead"].items():
+        console.print(f"Overhead {key}: {ratio:+.1%}")
+
+
+def stats_command(path: Optional[str] = None, repeat: int = 2, as_json: bool = False) -> None:
+    """
+    Render a workload with instrumentation enabled and print the statistics.
+    
+    Args:
+        path: Optional text file to render; the benchmark samples are
+            rendered as tables, panels and paragraphs if None.
+        repeat: Number of times to render the workload.
+        as_json: Whether to print JSON instead of tables.
+    """
+    import io
+    import json
+    from rich.console import Console as RichConsole
+    from rich.table import Table
+    from . import instrument
+    from .console import CTLConsole
+    
+    if path:
+        with open(path, "r", encoding="utf-8", errors="replace") as text_file:
+            workload = [text_file.read()]
+    else:
+        from .bench import SAMPLES, sample_renderables
+        workload = [renderable for text in SAMPLES.values() for renderable in sample_renderables(text).values()]
+    
+    console = CTLConsole(file=io.StringIO(), width=80, force_terminal=True, color_system=None)
+    instrument.reset()
+    instrument.enable()
+    try:
+        for _ in range(repeat):
+            for renderable in workload:
+                console.print(renderable)
+    finally:
+        instrument.disable()
+    data = instrument.stats()
+    
+    if as_json:
+        print(json.dumps(data, indent=2))
+        return
+    
+    out = RichConsole()
+    counters = Table(title="Counters")
+    counters.add_column("Counter")
+    counters.add_column("Value", justify="right")
+    for name, value in data["counters"].items():
+        counters.add_row(name, str(value))
+    out.print(counters)
+    
+    latency = Table(title="Latency (microseconds)")
+    latency.add_column("Operation")
+    for column in ("Count", "Mean", "p50", "p90", "p99", "Max"):
+        latency.add_column(column, justify="right")
+    for name, summary in data["latency"].items():
+        latency.add_row(name, str(summary["count"]), *(f"{summary[key]:.1f}" for key in
+                        ("mean_us", "p50_us", "p90_us", "p99_us", "max_us")))
+    out.print(latency)
+    
+    ratio = data["fast_path_ratio"]
+    if ratio is not None:
+        out.print(f"Fast path: {ratio:.1%} of width lookups needed no shaping")
+    cache = data["cache"]
+    out.print(f"Cache: {cache['currsize']} entries, {cache['currbytes']} bytes, "
+              f"{cache['hits']} hits, {cache['misses']} misses, {cache['evictions']} evictions")
+
+
+def cat_command(files: List[str], width: Optional[int] = None, wrap: bool = True,
+                compare: bool = True, line_buffered: bool = False,
+                chunk_size: Optional[int] = None) -> int:
+    """
+    Stream files or stdin to stdout, wrapped with the CTL width engine.
+    
+    Args:
+        files: Paths to read; "-" or no paths reads stdin.
+        width: Output width in cells (default: terminal width).
+        wrap: Whether to wrap long lines.
+        compare: Whether to also show how plain Rich would wrap each line.
+        line_buffered: Read and flush line by line, for live input.
+        chunk_size: Characters per read in chunked mode.
+    
+    Returns:
+        Exit code.
+    """
+    import io
+    import shutil
+    from .stream import DEFAULT_CHUNK_SIZE, stream
+    
+    if width is None:
+        width = shutil.get_terminal_size().columns
+    inputs = []
+    try:
+        for path in files or ["-"]:
+            if path == "-":
+                inputs.append(io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", errors="replace"))
+            else:
+                inputs.append(open(path, "r", encoding="utf-8", errors="replace"))
+        stream(inputs, sys.stdout, width, wrap_lines=wrap, compare=compare,
+               line_buffered=line_buffered, chunk_size=chunk_size or DEFAULT_CHUNK_SIZE)
+    except BrokenPipeError:
+        # The reader went away (e.g. `| head`); stop quietly, and keep the
+        # interpreter from failing to flush stdout at exit
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+    except OSError as e:
+        print(f"rich-ctl cat: {e}", file=sys.stderr)
+        return 1
+    finally:
+        for stream_in in inputs:
+            if stream_in.buffer is sys.stdin.buffer:
+                # Leave stdin open for the interpreter
+                stream_in.detach()
+            else:
+                stream_in.close()
+    return 0
+
+
 def main(argv: Optional[List[str]] = None) -> int:
     """
     Main entry point for the CLI.
@@ -114,6 +273,9 @@ def main(argv: Optional[List[str]] = None) -> int:
         Exit code (0 for success, non-zero for error).
     """
     parser = argparse.ArgumentParser(description="rich-ctl: Complex Text Layout for Rich")
+    parser.add_argument("--persistent-cache", action="store_true",
+                        help="Keep shaped text in an on-disk cache across runs")
+    parser.add_argument("--cache-dir", help="Directory for the on-disk cache (implies --persistent-cache)")
     subparsers = parser.add_subparsers(dest="command", help="Command to run")
     
     # Echo command
@@ -130,11 +292,43 @@ def main(argv: Optional[List[str]] = None) -> int:
     # Examples command
     examples_parser = subparsers.add_parser("examples", help="Show example texts in various scripts")
     
+    # Cat command
+    cat_parser = subparsers.add_parser("cat", aliases=["stream"],
+                                       help="Stream files or stdin through the CTL width engine")
+    cat_parser.add_argument("files", nargs="*", help="Files to read (default: stdin)")
+    cat_parser.add_argument("--width", type=int, help="Output width in cells (default: terminal width)")
+    cat_parser.add_argument("--no-wrap", action="store_true", help="Copy long lines without wrapping")
+    cat_parser.add_argument("--no-compare", action="store_true",
+                            help="Only show rich-ctl output, not plain Rich's wrapping")
+    cat_parser.add_argument("--line-buffered", action="store_true",
+                            help="Read and write line by line instead of in large chunks")
+    cat_parser.add_argument("--chunk-size", type=int, help="Characters per read in chunked mode")
+    
+    # Bench command
+    bench_parser = subparsers.add_parser("bench", help="Benchmark the CTL pipeline against plain Rich")
+    bench_parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    bench_parser.add_argument("--output", help="Also write the JSON report to this file")
+    bench_parser.add_argument("--filter", action="append", default=[],
+                              help="Only run benchmarks whose name contains this text (repeatable)")
+    bench_parser.add_argument("--repeat", type=int, default=5, help="Timed repeats per benchmark")
+    bench_parser.add_argument("--min-time", type=float, default=0.05,
+                              help="Minimum seconds per repeat")
+    
+    # Stats command
+    stats_parser = subparsers.add_parser("stats", help="Render a workload and show shaping and cache statistics")
+    stats_parser.add_argument("file", nargs="?", help="Text file to render (default: built-in samples)")
+    stats_parser.add_argument("--repeat", type=int, default=2, help="Times to render the workload")
+    stats_parser.add_argument("--json", action="store_true", help="Print statistics as JSON")
+    
     # Version command
     version_parser = subparsers.add_parser("version", help="Show version information")
     
     args = parser.parse_args(argv)
     
+    if args.persistent_cache or args.cache_dir:
+        from .persist import enable_persistent_cache
+        enable_persistent_cache(args.cache_dir)
+    
     if args.command == "echo":
         echo_command(args.text, args.bidi, args.script, args.debug)
         return 0
@@ -144,6 +338,15 @@ def main(argv: Optional[List[str]] = None) -> int:
     elif args.command == "examples":
         examples_command()
         return 0
+    elif args.command in ("cat", "stream"):
+        return cat_command(args.files, args.width, not args.no_wrap, not args.no_compare,
+                           args.line_buffered, args.chunk_size)
+    elif args.command == "bench":
+        bench_command(args.filter, args.repeat, args.min_time, args.json, args.output)
+        return 0
+    elif args.command == "stats":
+        stats_command(args.file, args.repeat, args.json)
+        return 0
     elif args.command == "version":
         from . import __version__
         print(f"rich-ctl version {__version__}")
@@ -0,0 +1,118 @@
+"""
+Console for rich-ctl.
+
+This module provides CTLConsole, a Rich Console that installs the rich-ctl
+patches when it is created.
+"""
+
+import threading
+
+from rich.console import Console
+
+from .patch import install_rich_ctl
+from .render import PAD, RENDER_MODES, improve_rendering, pad_segments
+
+
+class CTLConsole(Console):
+    """
+    A Rich Console with Complex Text Layout (CTL) support.
+    
+    This is a drop-in replacement for rich.console.Console that
+    adds support for proper rendering of complex scripts like
+    Indic, Arabic, Hebrew, etc.
+    """
+    
+    def __init__(self, *args, bidi=False, improve_display=True, preload_fonts=False,
+                 render_mode=PAD, **kwargs):
+        if render_mode not in RENDER_MODES:
+            raise ValueError(f"Unknown render mode: {render_mode!r} (known: {', '.join(RENDER_MODES)})")
+        super().__init__(*args, **kwargs)
+        self.bidi = bidi
+        self.improve_display = improve_display
+        self.render_mode = render_mode
+        # Whether this thread is inside a padded render; Rich lets threads print at once
+        self._padding = threading.local()
+        install_rich_ctl(self)
+        # Fonts are otherwise discovered on first use; preloading runs in the
+        # background so construction never blocks
+        if preload_fonts:
+            from .aio import load_fonts
+            threading.Thread(target=load_fonts, name="rich-ctl-fonts", daemon=True).start()
+        
+    def print(self, *objects, **kwargs):
+        """
+        Print to the console with CTL support.
+        
+        Args:
+            *objects: Objects to print to the console.
+            **kwargs: Keyword arguments passed to Console.print.
+        """
+        # Process objects to improve rendering if needed
+        if self.improve_display:
+            processed_objects = []
+            for obj in objects:
+                if isinstance(obj, str):
+                    processed_objects.append(improve_rendering(obj, self.render_mode))
+                else:
+                    processed_objects.append(obj)
+            super().print(*processed_objects, **kwargs)
+        else:
+            super().print(*objects, **kwargs)
+    
+    def render(self, renderable, options=None):
+        """
+        Render an object to segments, padded to rich-ctl's cluster widths.
+        
+        In the PAD render mode, the outermost render of a terminal console
+        passes its segments through pad_segments(); renders nested inside
+        it, and other modes, are Rich's own.
+        
+        Args:
+            renderable: Object to render.
+            options: Render options; the console's options if None.
+        
+        Yields:
+            Rendered segments.
+        """
+        if (getattr(self._padding, "active", False) or not self.improve_display
+                or self.render_mode != PAD or not self.is_terminal or self.legacy_windows):
+            yield from super().render(renderable, options)
+            return
+        self._padding.active = True
+        try:
+            yield from pad_segments(super().render(renderable, options))
+        finally:
+            self._padding.active = False
+    
+    async def aprint(self, *objects, executor=None, **kwargs):
+        """
+        Print without shaping on the event loop.
+        
+        ``objects`` are rendered in an executor first, with their markup
+        converted and the options the print uses, so the print itself only
+        reads cached measurements, for tables, panels and other renderables
+        as well as strings.
+        
+        Args:
+            *objects: Objects to print to the console.
+            executor: Executor for shaping; the loop's default executor if None.
+            **kwargs: Keyword arguments passed to Console.print.
+        """
+        texts = objects
+        if self.improve_display:
+            texts = [improve_rendering(obj, self.render_mode) if isinstance(obj, str) else obj
+                     for obj in objects]
+        from rich.console import NO_CHANGE
+        from .aio import collect_renderables, prerender
+        renderables = collect_renderables(
+            self, texts, sep=kwargs.get("sep", " "), end=kwargs.get("end", "\n"),
+            markup=kwargs.get("markup"), emoji=kwargs.get("emoji"), highlight=kwargs.get("highlight"))
+        width = kwargs.get("width")
+        options = self.options.update(
+            justify=kwargs.get("justify"), overflow=kwargs.get("overflow"),
+            width=min(width, self.width) if width is not None else NO_CHANGE,
+            height=kwargs.get("height"), no_wrap=kwargs.get("no_wrap"),
+            markup=kwargs.get("markup"), highlight=kwargs.get("highlight"))
+        await prerender(self, renderables, options, executor=executor, crop=kwargs.get("crop", True))
+        self.print(*objects, **kwargs)
+
@@ -0,0 +1,224 @@
+"""
+Coverage-driven font fallback for rich-ctl.
+
+This module decides which font shapes each code point: the first font in a
+per-script fallback chain whose cmap maps it. Coverage is probed with
+``hb.Font.get_nominal_glyph`` one 256-code-point page at a time and kept as
+a paged bitmap per font, so no trial shaping across fonts is needed.
+"""
+
+import os
+import threading
+from typing import Dict, List, Optional, Sequence
+
+from .cache import clear_cache
+from .fonts import (find_font_face, font_name_for_script, font_ref, get_font, get_font_index,
+                    resolve_font_face, split_font_ref)
+from .fontindex import name_key
+from .scripts import COMMON
+
+_PAGE_BITS = 8
+_PAGE_SIZE = 1 << _PAGE_BITS
+
+
+class FontCoverage:
+    """
+    Paged bitmap of the code points a font can map to a glyph.
+
+    Each 256-code-point page is stored as one integer bit mask and built on
+    first use, so a font only pays for the pages of text it actually sees.
+    """
+
+    __slots__ = ("font_path", "_font", "_pages")
+
+    def __init__(self, font_path: Optional[str]):
+        self.font_path = font_path
+        self._font = None
+        self._pages: Dict[int, int] = {}
+
+    def _build_page(self, page: int) -> int:
+        if self._font is None:
+            if self.font_path and not os.path.exists(split_font_ref(self.font_path)[0]):
+                # A missing file covers nothing; get_font() would load the default
+                self._pages[page] = 0
+                return 0
+            self._font = get_font(font_path=self.font_path) if self.font_path else get_font()
+        get_glyph = self._font.get_nominal_glyph
+        base = page << _PAGE_BITS
+        mask = 0
+        for offset in range(_PAGE_SIZE):
+            if get_glyph(base + offset):
+                mask |= 1 << offset
+        self._pages[page] = mask
+        return mask
+
+    def covers(self, codepoint: int) -> bool:
+        """
+        Check whether the font maps a code point to a glyph.
+
+        Args:
+            codepoint: The code point to check.
+
+        Returns:
+            True if the font's cmap has a glyph for it.
+        """
+        page = codepoint >> _PAGE_BITS
+        mask = self._pages.get(page)
+        if mask is None:
+            mask = self._build_page(page)
+        return bool(mask >> (codepoint & (_PAGE_SIZE - 1)) & 1)
+
+
+class FallbackChain:
+    """
+    Ordered list of fonts tried for a script.
+
+    The chosen font for each code point is remembered, so after warm-up a
+    lookup is a single dictionary hit.
+    """
+
+    def __init__(self, fonts: Sequence[Optional[str]]):
+        self.fonts: List[Optional[str]] = list(fonts) or [None]
+        self._decisions: Dict[int, Optional[str]] = {}
+
+    def font_for(self, codepoint: int) -> Optional[str]:
+        """
+        Get the first font in the chain that covers a code point.
+
+        Args:
+            codepoint: The code point to place.
+
+        Returns:
+            The font path, or the last font in the chain if none covers it
+        """
+        try:
+            return self._decisions[codepoint]
+        except KeyError:
+            pass
+        chosen = self.fonts[-1]
+        for font_path in self.fonts:
+            if coverage_for(font_path).covers(codepoint):
+                chosen = font_path
+                break
+        self._decisions[codepoint] = chosen
+        return chosen
+
+
+# Coverage bitmaps, one per font path
+_coverage: Dict[Optional[str], FontCoverage] = {}
+
+# Fallback chains, one per ISO 15924 script code
+_chains: Dict[str, FallbackChain] = {}
+
+# User-configured fonts tried after the script's preferred font
+_configured_fonts: List[str] = []
+
+# Incremented whenever the chains change, so callers can invalidate caches
+_generation = 0
+
+# Guards creation of coverage bitmaps and chains. Filling in a bitmap page or
+# a chain decision is idempotent, so lookups themselves need no lock.
+_lock = threading.Lock()
+
+
+def coverage_for(font_path: Optional[str]) -> FontCoverage:
+    """
+    Get the coverage bitmap for a font.
+
+    Args:
+        font_path: Font file path, or None for the default font
+
+    Returns:
+        The shared FontCoverage for that font
+    """
+    coverage = _coverage.get(font_path)
+    if coverage is None:
+        with _lock:
+            coverage = _coverage.setdefault(font_path, FontCoverage(font_path))
+    return coverage
+
+
+def _resolve(font: str) -> Optional[str]:
+    """Resolve a configured font given as a path or a font name."""
+    if "/" in font or "\\" in font:
+        return font
+    face = find_font_face(font)
+    return font_ref(*face) if face else None
+
+
+def chain_for_script(script: str) -> FallbackChain:
+    """
+    Get the fallback chain for a script.
+
+    The chain is: the script's preferred font (if installed), the fonts
+    configured with set_fallback_fonts(), the default font, and finally
+    other installed fonts whose cmap covers the script.
+
+    Args:
+        script: ISO 15924 script code
+
+    Returns:
+        The FallbackChain for the script
+    """
+    chain = _chains.get(script)
+    if chain is not None:
+        return chain
+
+    candidates: List[Optional[str]] = []
+    preferred = font_name_for_script(script)
+    if preferred:
+        candidates.append(_resolve(preferred))
+    candidates.extend(_resolve(font) for font in _configured_fonts)
+    default = resolve_font_face()
+    candidates.append(font_ref(*default) if default else None)
+    if script != COMMON:
+        # Other installed fonts covering the script, regular faces first
+        covering = get_font_index().for_script(script)
+        covering = sorted(covering, key=lambda info: name_key(info.style) not in ("regular", "book"))
+        candidates.extend(font_ref(info.path, info.index) for info in covering)
+
+    # Drop fonts that are not installed and duplicates, keeping the order
+    fonts: List[Optional[str]] = []
+    for font_path in candidates:
+        if font_path is not None and font_path not in fonts:
+            fonts.append(font_path)
+    with _lock:
+        return _chains.setdefault(script, FallbackChain(fonts))
+
+
+def set_fallback_fonts(fonts: Sequence[str]) -> None:
+    """
+    Configure fonts to try after each script's preferred font.
+
+    Cached widths and layouts are keyed without the font that shaped them,
+    so the shaping cache is cleared too.
+
+    Args:
+        fonts: Font names (e.g. "NotoSansTamil") or font file paths
+    """
+    global _generation
+    with _lock:
+        _configured_fonts[:] = list(fonts)
+        _chains.clear()
+        _generation += 1
+    clear_cache()
+
+
+def get_fallback_fonts() -> List[str]:
+    """
+    Get the fonts configured with set_fallback_fonts().
+
+    Returns:
+        A copy of the configured font names or paths
+    """
+    return list(_configured_fonts)
+
+
+def generation() -> int:
+    """
+    Get a counter that changes whenever the fallback configuration changes.
+
+    Returns:
+        The current configuration generation
+    """
+    return _generation
@@ -0,0 +1,258 @@
+"""
+Font discovery index for rich-ctl.
+
+This module scans font directories recursively once, records each face's
+family, style and supported scripts, and answers lookups by name or script
+from dictionaries. The index is persisted as JSON and refreshed using
+directory and file modification times.
+"""
+
+import json
+import os
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import uharfbuzz as hb
+
+from .scripts import COMMON, INHERITED, UNKNOWN, scripts_of
+
+# Bump when the stored layout or the way scripts are derived changes
+INDEX_VERSION = 1
+
+FONT_EXTENSIONS = (".ttf", ".otf", ".ttc")
+
+# Minimum number of covered code points for a font to count as supporting a script
+MIN_SCRIPT_COVERAGE = 8
+
+_NAME_KEY_RE = re.compile(r"[^0-9a-z]+")
+
+
+class FontInfo(NamedTuple):
+    """Metadata of one face in a font file."""
+
+    path: str
+    index: int
+    family: str
+    style: str
+    scripts: Tuple[str, ...]
+
+
+def name_key(name: str) -> str:
+    """
+    Normalize a font name for lookups.
+
+    "Noto Sans Telugu", "NotoSansTelugu" and "noto-sans-telugu" share a key.
+
+    Args:
+        name: A family name or file stem.
+
+    Returns:
+        The lowercased name with separators removed.
+    """
+    return _NAME_KEY_RE.sub("", name.lower())
+
+
+def read_font_info(path: Path) -> List[FontInfo]:
+    """
+    Read family, style and script coverage of every face in a font file.
+
+    Args:
+        path: Path to a .ttf, .otf or .ttc file.
+
+    Returns:
+        One FontInfo per face; empty if the file cannot be parsed.
+    """
+    try:
+        blob = hb.Blob.from_file_path(str(path))
+        count = hb.Face(blob).count
+    except Exception:
+        return []
+
+    infos = []
+    for index in range(max(count, 1)):
+        face = hb.Face(blob, index)
+        family = (face.get_name(hb.OTNameIdPredefined.TYPOGRAPHIC_FAMILY)
+                  or face.get_name(hb.OTNameIdPredefined.FONT_FAMILY) or path.stem)
+        style = (face.get_name(hb.OTNameIdPredefined.TYPOGRAPHIC_SUBFAMILY)
+                 or face.get_name(hb.OTNameIdPredefined.FONT_SUBFAMILY) or "")
+        # Script support comes from what the cmap actually covers
+        coverage = Counter(scripts_of("".join(map(chr, sorted(face.unicodes)))))
+        scripts = tuple(sorted(
+            script for script, count in coverage.items()
+            if count >= MIN_SCRIPT_COVERAGE and script not in (COMMON, INHERITED, UNKNOWN)
+        ))
+        infos.append(FontInfo(str(path), index, family, style, scripts))
+    return infos
+
+
+class FontIndex:
+    """
+    Index of installed fonts, queryable by name or script.
+
+    The index is built by walking the font directories recursively. When a
+    cache file is given, directory listings and per-file metadata are stored
+    there; on the next start only directories whose mtime changed are listed
+    again, and every listed file is stat'ed so that only files whose mtime or
+    size changed, including files replaced in place, are parsed again.
+    """
+
+    def __init__(self, directories: Iterable[Path], cache_path: Optional[Path] = None):
+        self.directories = [Path(d) for d in directories]
+        self.cache_path = cache_path
+        self.fonts: List[FontInfo] = []
+        self._by_name: Dict[str, List[FontInfo]] = {}
+        self._by_script: Dict[str, List[FontInfo]] = {}
+        self._substring_cache: Dict[str, Optional[FontInfo]] = {}
+        self._dirs: Dict[str, dict] = {}
+        self._files: Dict[str, dict] = {}
+        self.refresh()
+
+    def _load_cache(self) -> None:
+        if self.cache_path is None:
+            return
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as cache_file:
+                data = json.load(cache_file)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != INDEX_VERSION:
+            return
+        self._dirs = data.get("dirs", {})
+        self._files = data.get("files", {})
+
+    def _save_cache(self) -> None:
+        if self.cache_path is None:
+            return
+        data = {"version": INDEX_VERSION, "dirs": self._dirs, "files": self._files}
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file and rename, so readers never see a partial index
+            tmp_path = self.cache_path.with_name(f"{self.cache_path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as cache_file:
+                json.dump(data, cache_file)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            pass
+
+    def _walk(self, directory: str, seen_dirs: Dict[str, dict], font_files: List[str]) -> bool:
+        """Collect font files under a directory, reusing unchanged listings."""
+        directory = os.path.realpath(directory)
+        if directory in seen_dirs:
+            # Already visited through another path or a symlink loop
+            return False
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            return False
+        changed = False
+        entry = self._dirs.get(directory)
+        if entry is None or entry["mtime"] != mtime:
+            subdirs, files = [], []
+            try:
+                with os.scandir(directory) as it:
+                    for item in it:
+                        if item.is_dir():
+                            subdirs.append(item.path)
+                        elif item.name.lower().endswith(FONT_EXTENSIONS):
+                            files.append(item.path)
+            except OSError:
+                return False
+            entry = {"mtime": mtime, "subdirs": sorted(subdirs), "files": sorted(files)}
+            changed = True
+        seen_dirs[directory] = entry
+        font_files.extend(entry["files"])
+        for subdir in entry["subdirs"]:
+            changed = self._walk(subdir, seen_dirs, font_files) or changed
+        return changed
+
+    def refresh(self) -> None:
+        """
+        Bring the index up to date with the font directories.
+        """
+        self._load_cache()
+        seen_dirs: Dict[str, dict] = {}
+        font_files: List[str] = []
+        changed = False
+        for directory in self.directories:
+            changed = self._walk(str(directory), seen_dirs, font_files) or changed
+
+        files: Dict[str, dict] = {}
+        for path in font_files:
+            # Rewriting a file in place leaves its directory's mtime alone
+            try:
+                stat = os.stat(path)
+            except OSError:
+                changed = True
+                continue
+            entry = self._files.get(path)
+            if entry is None or entry["mtime"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+                faces = [list(info[1:]) for info in read_font_info(Path(path))]
+                entry = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "faces": faces}
+                changed = True
+            files[path] = entry
+
+        changed = changed or len(files) != len(self._files)
+        self._dirs = seen_dirs
+        self._files = files
+        if changed:
+            self._save_cache()
+        self._build_lookups()
+
+    def _build_lookups(self) -> None:
+        self.fonts = []
+        self._by_name = {}
+        self._by_script = {}
+        self._substring_cache = {}
+        for path, entry in self._files.items():
+            for index, family, style, scripts in entry["faces"]:
+                info = FontInfo(path, index, family, style, tuple(scripts))
+                self.fonts.append(info)
+                stem = Path(path).stem
+                for key in {name_key(stem), name_key(family), name_key(family + style)}:
+                    self._by_name.setdefault(key, []).append(info)
+                for script in info.scripts:
+                    self._by_script.setdefault(script, []).append(info)
+
+    def find(self, name: str) -> Optional[FontInfo]:
+        """
+        Find a font by file stem or family name.
+
+        Exact (normalized) matches are dictionary lookups; otherwise the
+        first font whose file stem contains ``name`` is returned, and that
+        answer is remembered.
+
+        Args:
+            name: Font name such as "DejaVuSans" or "Noto Sans Telugu".
+
+        Returns:
+            The best matching FontInfo, or None.
+        """
+        key = name_key(name)
+        matches = self._by_name.get(key)
+        if matches:
+            # Prefer the regular face when several styles share a family
+            for info in matches:
+                if name_key(info.style) in ("regular", "book", ""):
+                    return info
+            return matches[0]
+        if key not in self._substring_cache:
+            self._substring_cache[key] = next(
+                (info for info in self.fonts if key in name_key(Path(info.path).stem)), None)
+        return self._substring_cache[key]
+
+    def for_script(self, script: str) -> List[FontInfo]:
+        """
+        Get the fonts whose cmap covers a script.
+
+        Args:
+            script: ISO 15924 script code, in any case.
+
+        Returns:
+            List of FontInfo entries, possibly empty.
+        """
+        return self._by_script.get(script.title(), [])
+
+    def __len__(self) -> int:
+        return len(self.fonts)
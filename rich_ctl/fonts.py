@@ -4,16 +4,75 @@ Font utilities for rich-ctl.
 This module provides font loading and discovery functions for HarfBuzz shaping.
 """
 
+import hashlib
 import os
-import sys
 import platform
+import threading
 from pathlib import Path
-from typing import Optional, Dict, List
+from time import perf_counter
+from typing import Optional, Dict, List, Tuple
 
 import uharfbuzz as hb
 
-# Cache for loaded fonts to avoid reloading the same font multiple times
-_font_cache: Dict[str, hb.Font] = {}
+from . import instrument
+from .fontindex import FontIndex
+from .persist import default_cache_dir
+
+FONT_INDEX_FILENAME = "font-index.json"
+
+# Index of installed fonts, built on first lookup
+_font_index: Optional[FontIndex] = None
+
+# Guards font discovery and loading, so concurrent first lookups load a font once.
+# Reentrant because get_font() resolves paths through the index under the lock.
+_font_lock = threading.RLock()
+
+# Font size used for shaping, in pixels
+DEFAULT_FONT_SIZE = 36
+
+# Loaded fonts keyed by the get_font() arguments, so repeated lookups skip resolution
+_font_cache: Dict[Tuple[str, int], hb.Font] = {}
+
+# Loaded fonts keyed by (resolved path, face index, size), shared by all names resolving to a face
+_scaled_font_cache: Dict[Tuple[str, int, int], hb.Font] = {}
+
+# Memory-mapped faces keyed by (resolved path, face index), shared by all sizes
+_face_cache: Dict[Tuple[str, int], hb.Face] = {}
+
+# Preferred font family for each ISO 15924 script code
+SCRIPT_FONT_NAMES: Dict[str, str] = {
+    "Arab": "NotoSansArabic",
+    "Hebr": "NotoSansHebrew",
+    "Deva": "NotoSansDevanagari",
+    "Beng": "NotoSansBengali",
+    "Guru": "NotoSansGurmukhi",
+    "Gujr": "NotoSansGujarati",
+    "Orya": "NotoSansOriya",
+    "Taml": "NotoSansTamil",
+    "Telu": "NotoSansTelugu",
+    "Knda": "NotoSansKannada",
+    "Mlym": "NotoSansMalayalam",
+    "Sinh": "NotoSansSinhala",
+    "Thai": "NotoSansThai",
+    "Laoo": "NotoSansLao",
+    "Mymr": "NotoSansMyanmar",
+    "Khmr": "NotoSansKhmer",
+}
+
+
+def font_name_for_script(script: Optional[str]) -> Optional[str]:
+    """
+    Get the preferred font name for a script.
+    
+    Args:
+        script: ISO 15924 script code, in any case (e.g., 'telu', 'Telu')
+    
+    Returns:
+        A font name to pass to get_font(), or None to use the default font
+    """
+    if not script:
+        return None
+    return SCRIPT_FONT_NAMES.get(script.title())
 
 
 def get_system_font_paths() -> List[Path]:
@@ -52,12 +111,81 @@ def get_system_font_paths() -> List[Path]:
     return [p for p in paths if p.exists()]
 
 
+def get_font_index() -> FontIndex:
+    """
+    Get the index of installed fonts, building it on first use.
+    
+    The index is stored in the rich-ctl cache directory and refreshed from
+    directory modification times, so later processes skip the full scan.
+    
+    Returns:
+        The shared FontIndex
+    """
+    global _font_index
+    if _font_index is None:
+        with _font_lock:
+            if _font_index is None:
+                start = perf_counter()
+                _font_index = FontIndex(get_system_font_paths(), default_cache_dir() / FONT_INDEX_FILENAME)
+                if instrument.enabled:
+                    instrument.observe("fonts.index", start)
+    return _font_index
+
+
+def font_ref(font_path, index: int = 0) -> str:
+    """
+    Get the string naming one face of a font file.
+    
+    Faces after the first in a collection (.ttc) are named "<path>#<index>";
+    everywhere a font path is accepted, such a reference is too.
+    
+    Args:
+        font_path: Path to the font file
+        index: Face index within the file
+    
+    Returns:
+        The path, with the face index appended if it is not 0
+    """
+    return f"{font_path}#{index}" if index else str(font_path)
+
+
+def split_font_ref(ref) -> Tuple[str, int]:
+    """
+    Split a font reference made by font_ref() into path and face index.
+    
+    Args:
+        ref: Font path, optionally followed by "#<index>"
+    
+    Returns:
+        Tuple of (path, face index)
+    """
+    ref = str(ref)
+    path, sep, index = ref.rpartition("#")
+    if sep and index.isdigit() and not os.path.exists(ref):
+        return path, int(index)
+    return ref, 0
+
+
+def find_font_face(font_name: str) -> Optional[Tuple[Path, int]]:
+    """
+    Find a font face by name in system font directories.
+    
+    Args:
+        font_name: Name of the font to find (e.g., "DejaVuSans")
+    
+    Returns:
+        Tuple of (font file, face index) if found, None otherwise
+    """
+    info = get_font_index().find(font_name)
+    return (Path(info.path), info.index) if info else None
+
+
 def find_font_file(font_name: str) -> Optional[Path]:
     """
     Find a font file by name in system font directories.
     
-    This is a basic implementation that checks for common extensions.
-    A more robust implementation would parse font metadata.
+    Fonts are looked up in the font index by file stem or family name,
+    including fonts in subdirectories of the system font directories.
     
     Args:
         font_name: Name of the font to find (e.g., "DejaVuSans")
@@ -65,21 +193,8 @@ def find_font_file(font_name: str) -> Optional[Path]:
     Returns:
         Path to the font file if found, None otherwise
     """
-    extensions = [".ttf", ".otf", ".ttc"]
-    
-    for font_dir in get_system_font_paths():
-        # Check for exact name match with extensions
-        for ext in extensions:
-            font_path = font_dir / f"{font_name}{ext}"
-            if font_path.exists():
-                return font_path
-            
-            # Check case-insensitive
-            for path in font_dir.glob(f"*{ext}"):
-                if font_name.lower() in path.stem.lower():
-                    return path
-    
-    return None
+    face = find_font_face(font_name)
+    return face[0] if face else None
 
 
 def get_bundled_font_path() -> Optional[Path]:
@@ -89,6 +204,12 @@ def get_bundled_font_path() -> Optional[Path]:
     Returns:
         Path to bundled font if available, None otherwise
     """
+    face = _bundled_font_face()
+    return face[0] if face else None
+
+
+def _bundled_font_face() -> Optional[Tuple[Path, int]]:
+    """Get the (font file, face index) of the fallback font."""
     # TODO: Bundle a font with the package for fallback
     # For now, try to find a common font on the system
     fallback_fonts = [
@@ -100,19 +221,63 @@ def get_bundled_font_path() -> Optional[Path]:
     ]
     
     for font_name in fallback_fonts:
-        font_path = find_font_file(font_name)
-        if font_path:
-            return font_path
+        face = find_font_face(font_name)
+        if face:
+            return face
             
     return None
 
 
-def load_font_from_path(font_path: Path) -> hb.Font:
+def get_face(font_path: Path, index: int = 0) -> hb.Face:
+    """
+    Get the shared HarfBuzz face for a font file.
+    
+    The file is memory-mapped by HarfBuzz rather than read into a Python
+    bytes object, so its pages are shared with every other process using
+    the same font. One face is kept per resolved path and face index.
+    
+    Args:
+        font_path: Path to the font file
+        index: Face index within a font collection (.ttc)
+    
+    Returns:
+        HarfBuzz face object
+    
+    Raises:
+        ValueError: If the font cannot be loaded
+    """
+    key = (os.path.realpath(font_path), index)
+    face = _face_cache.get(key)
+    if face is not None:
+        return face
+    with _font_lock:
+        face = _face_cache.get(key)
+        if face is not None:
+            return face
+        start = perf_counter()
+        try:
+            blob = hb.Blob.from_file_path(key[0])
+            face = hb.Face(blob, index)
+        except Exception as e:
+            raise ValueError(f"Failed to load font from {font_path}: {e}")
+        if face.glyph_count == 0:
+            raise ValueError(f"Failed to load font from {font_path}: no glyphs in face {index}")
+        _face_cache[key] = face
+        if instrument.enabled:
+            instrument.observe("fonts.face_load", start)
+        return face
+
+
+def load_font_from_path(font_path: Path, size: int = DEFAULT_FONT_SIZE, index: int = 0) -> hb.Font:
     """
     Load a font file into a HarfBuzz font object.
     
+    Fonts of different sizes created from the same face share it.
+    
     Args:
         font_path: Path to the font file
+        size: Font size in pixels; advances are in 1/64 pixel units
+        index: Face index within a font collection (.ttc)
     
     Returns:
         HarfBuzz font object
@@ -120,27 +285,26 @@ def load_font_from_path(font_path: Path) -> hb.Font:
     Raises:
         ValueError: If the font cannot be loaded
     """
-    try:
-        # Read the font file
-        with open(font_path, 'rb') as font_file:
-            # Create a blob from the font data
-            blob = hb.Blob(font_file.read())
-            
-        # Create a face from the blob
-        face = hb.Face(blob)
-        
-        # Create a font from the face
-        font = hb.Font(face)
-        
-        # Scale the font to a reasonable size (default to 36pt at 72dpi)
-        font.scale = (36 * 64, 36 * 64)
-        
+    key = (os.path.realpath(font_path), index, size)
+    font = _scaled_font_cache.get(key)
+    if font is not None:
+        return font
+    
+    with _font_lock:
+        font = _scaled_font_cache.get(key)
+        if font is None:
+            start = perf_counter()
+            # Fully set up before it is published; shaping never modifies it
+            font = hb.Font(get_face(font_path, index))
+            font.scale = (size * 64, size * 64)
+            _scaled_font_cache[key] = font
+            if instrument.enabled:
+                instrument.observe("fonts.load", start)
         return font
-    except Exception as e:
-        raise ValueError(f"Failed to load font from {font_path}: {e}")
 
 
-def get_font(font_path: Optional[str] = None, font_name: Optional[str] = None) -> hb.Font:
+def get_font(font_path: Optional[str] = None, font_name: Optional[str] = None,
+             size: int = DEFAULT_FONT_SIZE) -> hb.Font:
     """
     Get a HarfBuzz font object for text shaping.
     
@@ -150,8 +314,9 @@ def get_font(font_path: Optional[str] = None, font_name: Optional[str] = None) -
     3. From a bundled font as fallback
     
     Args:
-        font_path: Optional path to a font file
+        font_path: Optional path to a font file, or a font_ref() to one face
         font_name: Optional name of a system font to find
+        size: Font size in pixels (default: 36)
     
     Returns:
         HarfBuzz font object
@@ -159,44 +324,104 @@ def get_font(font_path: Optional[str] = None, font_name: Optional[str] = None) -
     Raises:
         ValueError: If no suitable font can be found or loaded
     """
-    # Use cached font if available
-    cache_key = str(font_path) if font_path else str(font_name)
-    if cache_key in _font_cache:
-        return _font_cache[cache_key]
-    
-    # Try user-specified font path
-    if font_path:
-        path = Path(font_path)
-        if path.exists():
-            font = load_font_from_path(path)
-            _font_cache[cache_key] = font
-            return font
-    
-    # Try to find system font by name
-    if font_name:
-        path = find_font_file(font_name)
-        if path:
-            font = load_font_from_path(path)
-            _font_cache[cache_key] = font
-            return font
-    
-    # Try to find a suitable fallback font
-    fallback_path = get_bundled_font_path()
-    if fallback_path:
-        font = load_font_from_path(fallback_path)
-        _font_cache["fallback"] = font
+    # Use cached font if available; misses that fell back are cached too
+    cache_key = (str(font_path) if font_path else str(font_name), size)
+    font = _font_cache.get(cache_key)
+    if font is not None:
         return font
     
-    raise ValueError("No suitable font found for text shaping")
+    with _font_lock:
+        face = resolve_font_face(font_path=font_path, font_name=font_name)
+        if face is None:
+            raise ValueError("No suitable font found for text shaping")
+        
+        font = load_font_from_path(face[0], size, face[1])
+        _font_cache[cache_key] = font
+        return font
+
+
+# Resolved (font file, face index) pairs, keyed like _font_cache
+_path_cache: Dict[str, Optional[Tuple[Path, int]]] = {}
+
+# File digests, keyed by (path, size, mtime) so a replaced file is re-hashed
+_digest_cache: Dict[tuple, str] = {}
+
+
+def resolve_font_face(font_path: Optional[str] = None,
+                      font_name: Optional[str] = None) -> Optional[Tuple[Path, int]]:
+    """
+    Resolve the font face that get_font() would load for the same arguments.
+    
+    Args:
+        font_path: Optional path to a font file, or a font_ref() to one face
+        font_name: Optional name of a system font to find
+    
+    Returns:
+        Tuple of (font file, face index), or None if no font can be found
+    """
+    cache_key = str(font_path) if font_path else str(font_name)
+    if cache_key in _path_cache:
+        return _path_cache[cache_key]
+    
+    with _font_lock:
+        if cache_key in _path_cache:
+            return _path_cache[cache_key]
+        face = None
+        path, index = split_font_ref(font_path) if font_path else (None, 0)
+        if path and Path(path).exists():
+            face = (Path(path), index)
+        elif font_name:
+            face = find_font_face(font_name)
+        if face is None:
+            face = _bundled_font_face()
+        _path_cache[cache_key] = face
+    return face
+
+
+def resolve_font_path(font_path: Optional[str] = None, font_name: Optional[str] = None) -> Optional[Path]:
+    """
+    Resolve the font file that get_font() would load for the same arguments.
+    
+    Args:
+        font_path: Optional path to a font file
+        font_name: Optional name of a system font to find
+    
+    Returns:
+        Path to the font file, or None if no font can be found
+    """
+    face = resolve_font_face(font_path=font_path, font_name=font_name)
+    return face[0] if face else None
+
+
+def font_digest(font_path: Path) -> str:
+    """
+    Get a content digest of a font file.
+    
+    Args:
+        font_path: Path to the font file
+    
+    Returns:
+        Hex digest identifying the file contents
+    """
+    stat = font_path.stat()
+    key = (str(font_path), stat.st_size, stat.st_mtime_ns)
+    digest = _digest_cache.get(key)
+    if digest is None:
+        hasher = hashlib.blake2b(digest_size=16)
+        with open(font_path, 'rb') as font_file:
+            for chunk in iter(lambda: font_file.read(1 << 20), b''):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+        _digest_cache[key] = digest
+    return digest
 
 
 def list_available_fonts(script: Optional[str] = None) -> List[str]:
     """
     List available fonts, optionally filtering by script support.
     
-    This is a basic implementation that simply checks font file names.
-    A more sophisticated implementation would check actual script support
-    in the font metadata.
+    Script support is taken from each font's cmap coverage, as recorded
+    in the font index.
     
     Args:
         script: Optional script tag to filter by (e.g., 'arab', 'deva')
@@ -204,28 +429,6 @@ def list_available_fonts(script: Optional[str] = None) -> List[str]:
     Returns:
         List of available font names
     """
-    available_fonts = []
-    
-    # Script-specific font patterns to look for
-    script_patterns = {
-        "arab": ["arab", "nastaliq", "naskh"],
-        "deva": ["devanagari", "deva"],
-        "telu": ["telugu", "telu"],
-        "taml": ["tamil", "taml"],
-        "beng": ["bengali", "beng"],
-    }
-    
-    patterns = script_patterns.get(script, []) if script else []
-    
-    for font_dir in get_system_font_paths():
-        for ext in [".ttf", ".otf", ".ttc"]:
-            for font_path in font_dir.glob(f"*{ext}"):
-                font_name = font_path.stem
-                
-                # If filtering by script, check if font name contains any pattern
-                if script and not any(p in font_name.lower() for p in patterns):
-                    continue
-                    
-                available_fonts.append(font_name)
-    
-    return sorted(available_fonts)
+    index = get_font_index()
+    fonts = index.for_script(script) if script else index.fonts
+    return sorted({Path(info.path).stem for info in fonts})
@@ -0,0 +1,324 @@
+"""
+Incremental shaping for rich-ctl.
+
+Log views and input fields change a line a few characters at a time, and
+every version of the line is a new string to the shape cache. An
+IncrementalShaper keeps the shaped state of one line and, when the line
+changes, reuses the shaped clusters up to the last point before the edit
+where HarfBuzz reports the text safe to break (no UNSAFE_TO_BREAK flag),
+shaping only the rest.
+
+IncrementalLines keeps one shaper per line of a multi-line value, and
+watch_widget() attaches one to a reactive text attribute of a Textual
+widget, so the width of each line is in the cache before Textual measures it:
+
+    from rich_ctl.incremental import watch_widget
+
+    class Editor(App):
+        def on_mount(self) -> None:
+            watch_widget(self.query_one(Input), "value")
+"""
+
+import unicodedata
+import weakref
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional
+
+from . import calibrate, instrument
+from .cache import CacheKey, shape_cache
+from .itemize import _NEUTRAL_SCRIPTS, Run, itemize
+from .layout import CellLayout
+from .scripts import has_complex_script, script_of
+
+if TYPE_CHECKING:
+    from .shape import ShapedRun
+
+# Characters searched back from a change for a point where itemization can restart
+_RESTART_SCAN = 64
+
+
+class _ShapedItem(NamedTuple):
+    item: Run
+    run: "ShapedRun"
+    flags: bytes
+
+
+def _common_prefix(a: str, b: str) -> int:
+    """Get the length of the longest common prefix of two strings."""
+    if b.startswith(a):
+        return len(a)
+    # Binary search on slice comparisons, which run in C
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[:mid] == b[:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+class IncrementalShaper:
+    """
+    Shaped state of one line of text that changes in place.
+
+    The line is itemized as shape_text() would do it, and each item keeps
+    its shaped run with the HarfBuzz glyph flags of every cluster. Items
+    before the first changed character are reused as they are, without
+    itemizing that text again; the item holding it is reshaped from its
+    last safe-to-break cluster boundary before the change, with the text
+    before that boundary as context.
+    Offsets index the text as given; it is not normalized.
+    """
+
+    __slots__ = ("text", "run", "language", "_items")
+
+    def __init__(self, language: str = "en"):
+        """
+        Args:
+            language: Language tag passed to HarfBuzz.
+        """
+        self.text = ""
+        self.run: Optional["ShapedRun"] = None
+        self.language = language
+        self._items: List[_ShapedItem] = []
+
+    def update(self, text: str) -> "ShapedRun":
+        """
+        Shape a new version of the line.
+
+        Args:
+            text: The current text of the line.
+
+        Returns:
+            A ShapedRun over ``text``, equal to shaping it from scratch.
+        """
+        if text == self.text and self.run is not None:
+            return self.run
+        from .shape import _EMPTY_RUN, ShapedRun
+
+        prefix = _common_prefix(self.text, text)
+        old_items = {shaped.item.start: shaped for shaped in self._items}
+        items = []
+        for item in self._itemize(text, prefix):
+            old = old_items.get(item.start)
+            if old is not None and old.item[2:] != item[2:]:
+                old = None
+            if old is not None and old.item.end == item.end <= prefix:
+                shaped = old
+            elif old is not None and item.start < prefix:
+                shaped = self._reshape(text, item, old, min(prefix, item.end) - item.start)
+            else:
+                shaped = self._shape(text, item, 0)
+            items.append(shaped)
+        self._items = items
+        self.text = text
+        self.run = ShapedRun.concat(text, [shaped.run for shaped in items]) if items else _EMPTY_RUN
+        return self.run
+
+    def _itemize(self, text: str, prefix: int) -> List[Run]:
+        """
+        Itemize a new version of the line, reusing the items before the change.
+
+        Itemization restarts at a character of a real script before the
+        change, either a non-ASCII one close to it or the start of a
+        previous item: items are built left to right, so those before it
+        stay as they were, and the first new item joins the one it
+        continues.
+        """
+        restart = 0
+        for i in range(prefix - 1, max(prefix - _RESTART_SCAN, 0), -1):
+            char = text[i]
+            if not char.isascii() and script_of(char) not in _NEUTRAL_SCRIPTS:
+                restart = i
+                break
+        for shaped in reversed(self._items):
+            start = shaped.item.start
+            if start <= restart:
+                break
+            if start < prefix and script_of(text[start]) not in _NEUTRAL_SCRIPTS:
+                restart = start
+                break
+        if restart == 0:
+            return itemize(text)
+
+        items = []
+        for shaped in self._items:
+            item = shaped.item
+            if item.end > restart:
+                if item.start < restart:
+                    items.append(item._replace(end=restart))
+                break
+            items.append(item)
+        for item in itemize(text[restart:]):
+            item = item._replace(start=restart + item.start, end=restart + item.end)
+            if items and items[-1][2:] == item[2:]:
+                items[-1] = items[-1]._replace(end=item.end)
+            else:
+                items.append(item)
+        return items
+
+    def _shape(self, text: str, item: Run, start: int) -> _ShapedItem:
+        """Shape an item of ``text`` from ``start``, relative to the item."""
+        from .shape import shape_item_tail
+        run, flags = shape_item_tail(text[item.start:item.end], start, item.direction,
+                                     item.script, self.language, item.font)
+        return _ShapedItem(item, run, flags)
+
+    def _reshape(self, text: str, item: Run, old: _ShapedItem, unchanged: int) -> _ShapedItem:
+        """Reshape an item whose first ``unchanged`` characters are as before."""
+        from .shape import UNSAFE_TO_BREAK, ShapedRun
+
+        offsets = old.run.offsets
+        flags = old.flags
+        # The last cluster starting before the change: the cluster at the change
+        # is reshaped, since a mark inserted there, or left there by a
+        # deletion, joins the cluster before it
+        k = bisect_left(offsets, min(unchanged, len(old.run.text))) - 1
+        while k > 0 and flags[k] & UNSAFE_TO_BREAK:
+            k -= 1
+        if k <= 0:
+            if instrument.enabled:
+                instrument.incr("incremental.full")
+            return self._shape(text, item, 0)
+
+        start = offsets[k]
+        tail = self._shape(text, item, start)
+        if tail.flags and tail.flags[0] & UNSAFE_TO_BREAK:
+            # The new text joins the context before the boundary after all
+            if instrument.enabled:
+                instrument.incr("incremental.full")
+            return self._shape(text, item, 0)
+        if instrument.enabled:
+            instrument.incr("incremental.reused", k)
+        new_offsets = offsets[:k]
+        new_offsets.extend(start + offset for offset in tail.run.offsets)
+        advances = old.run.advances[:k]
+        advances.extend(tail.run.advances)
+        run = ShapedRun(text[item.start:item.end], new_offsets, advances)
+        return _ShapedItem(item, run, flags[:k] + tail.flags)
+
+    def cell_len(self, text: str) -> int:
+        """
+        Measure a new version of the line and cache its width and layout.
+
+        Text that rich-ctl measures without shaping is measured as
+        ctl_cell_len() does it; otherwise the line is shaped incrementally
+        and, for the "en" language tag that ctl_cell_len() and the Rich
+        patches shape with, its layout and width are stored where they
+        look them up.
+
+        Args:
+            text: The current text of the line.
+
+        Returns:
+            The width of ``text`` in cells.
+        """
+        from .patch import _put_width, ctl_cell_len
+
+        model = calibrate.width_model
+        if text.isascii() or not model.shaped or not has_complex_script(text):
+            return ctl_cell_len(text)
+        layout = CellLayout.from_run(self.update(text), model)
+        if self.language != "en":
+            # Shaped for another language than the cached entries are
+            return layout.total
+        shape_cache.put(CacheKey(text, width_model=model.key, kind="layout"), layout)
+        if unicodedata.is_normalized("NFC", text):
+            # ctl_cell_len() shapes the normalized text; other forms are left to it
+            _put_width(CacheKey(text, width_model=model.key), layout.total)
+        return layout.total
+
+
+class IncrementalLines:
+    """
+    Incremental shapers for the lines of a multi-line text.
+
+    Lines are matched to the shapers of the previous text by content
+    first, so inserting or removing lines does not reshape the lines
+    after them, and then by position, so an edited line continues from
+    its previous version.
+    """
+
+    def __init__(self, language: str = "en"):
+        """
+        Args:
+            language: Language tag passed to HarfBuzz.
+        """
+        self.language = language
+        self.shapers: List[IncrementalShaper] = []
+
+    def update(self, text: str) -> List[int]:
+        """
+        Measure a new version of the text.
+
+        Args:
+            text: The current text; lines are separated by "\\n".
+
+        Returns:
+            The width of each line in cells.
+        """
+        lines = text.split("\n")
+        by_text: Dict[str, IncrementalShaper] = {}
+        for shaper in self.shapers:
+            by_text.setdefault(shaper.text, shaper)
+        shapers: List[Optional[IncrementalShaper]] = [by_text.pop(line, None) for line in lines]
+        used = {id(shaper) for shaper in shapers if shaper is not None}
+        for i, shaper in enumerate(shapers):
+            if shaper is None:
+                if i < len(self.shapers) and id(self.shapers[i]) not in used:
+                    shaper = self.shapers[i]
+                else:
+                    shaper = IncrementalShaper(self.language)
+                used.add(id(shaper))
+                shapers[i] = shaper
+        self.shapers = shapers
+        return [shaper.cell_len(line) for shaper, line in zip(shapers, lines)]
+
+
+# Shaping state of each watched widget, dropped with the widget
+_widget_lines: "weakref.WeakKeyDictionary[object, IncrementalLines]" = weakref.WeakKeyDictionary()
+
+
+def lines_for(widget: object, language: str = "en") -> IncrementalLines:
+    """
+    Get the incremental shaping state kept for a widget.
+
+    Args:
+        widget: Any weakly referenceable object, usually a Textual widget.
+        language: Language tag used when the state is created.
+
+    Returns:
+        The widget's IncrementalLines, created on first use.
+    """
+    lines = _widget_lines.get(widget)
+    if lines is None:
+        lines = _widget_lines[widget] = IncrementalLines(language)
+    return lines
+
+
+def watch_widget(widget: object, attribute: str = "value", language: str = "en") -> IncrementalLines:
+    """
+    Measure a Textual widget's text incrementally whenever it changes.
+
+    Registers a watcher on a reactive attribute holding the widget's text,
+    such as ``Input.value`` or ``TextArea.text``. Each change updates the
+    widget's shaping state before Textual renders the new value, so the
+    widths Textual asks for are cache hits.
+
+    Args:
+        widget: A mounted Textual widget.
+        attribute: Name of the reactive attribute with the text.
+        language: Language tag passed to HarfBuzz.
+
+    Returns:
+        The widget's IncrementalLines.
+    """
+    lines = lines_for(widget, language)
+
+    def changed(value) -> None:
+        if isinstance(value, str):
+            lines.update(value)
+
+    widget.watch(widget, attribute, changed, init=True)
+    return lines
@@ -0,0 +1,154 @@
+"""
+Opt-in instrumentation for rich-ctl.
+
+Counters and latency histograms for the hot paths: shaping, the shape and
+width caches, font loading, and which measurement path each string took.
+Recording is off by default; instrumented code checks ``enabled`` before
+doing any work, so the cost when disabled is one attribute lookup.
+
+    from rich_ctl import instrument
+    instrument.enable()
+    ...  # render
+    print(rich_ctl.stats())
+"""
+
+import threading
+from time import perf_counter
+from typing import Dict, Optional
+
+from .cache import shape_cache
+
+# Whether hot paths record counters and timings
+enabled = False
+
+# Histogram buckets: bucket i counts durations below 2**i microseconds
+_BUCKETS = 32
+
+# Counters of ctl_cell_len() calls answered without shaping
+_FAST_PATHS = ("cell_len.ascii", "cell_len.hit", "cell_len.simple")
+
+_lock = threading.Lock()
+_counters: Dict[str, int] = {}
+_histograms: Dict[str, "Histogram"] = {}
+
+
+class Histogram:
+    """Latency histogram with power-of-two microsecond buckets."""
+
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets = [0] * _BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        micros = seconds * 1e6
+        self.buckets[min(int(micros).bit_length(), _BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += micros
+        if micros > self.max:
+            self.max = micros
+
+    def percentile(self, q: float) -> float:
+        """
+        Get an upper bound of a percentile in microseconds.
+
+        Args:
+            q: Percentile between 0 and 100.
+
+        Returns:
+            The upper edge of the bucket holding the percentile, capped at
+            the largest observed value.
+        """
+        rank = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return min(float(2 ** i), self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean_us": self.total / self.count if self.count else 0.0,
+            "p50_us": self.percentile(50),
+            "p90_us": self.percentile(90),
+            "p99_us": self.percentile(99),
+            "max_us": self.max,
+        }
+
+
+def enable() -> None:
+    """Start recording counters and timings."""
+    global enabled
+    enabled = True
+
+
+def disable() -> None:
+    """Stop recording; collected values are kept until reset()."""
+    global enabled
+    enabled = False
+
+
+def reset() -> None:
+    """Discard all collected counters and timings."""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def incr(name: str, n: int = 1) -> None:
+    """Add ``n`` to a counter."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def observe(name: str, start: float) -> None:
+    """
+    Record the time elapsed since ``start`` and count the call.
+
+    Args:
+        name: Name of the timed operation; its call counter has the same name.
+        start: A time.perf_counter() value taken when the operation started.
+    """
+    elapsed = perf_counter() - start
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + 1
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.add(elapsed)
+
+
+def fast_path_ratio(counters: Dict[str, int]) -> Optional[float]:
+    """Get the share of ctl_cell_len() calls answered without shaping, or None if there were none."""
+    fast = sum(counters.get(name, 0) for name in _FAST_PATHS)
+    total = fast + counters.get("cell_len.shaped", 0)
+    return fast / total if total else None
+
+
+def stats() -> dict:
+    """
+    Get a snapshot of the collected statistics.
+
+    Returns:
+        Dictionary with:
+        - "enabled": whether recording is on
+        - "counters": call and hit/miss counters by name
+        - "latency": per-operation summaries from the histograms
+        - "fast_path_ratio": share of width lookups that needed no shaping
+        - "cache": the shared cache's cache_info(), including bytes cached
+    """
+    with _lock:
+        counters = dict(sorted(_counters.items()))
+        latency = {name: histogram.summary() for name, histogram in sorted(_histograms.items())}
+    return {
+        "enabled": enabled,
+        "counters": counters,
+        "latency": latency,
+        "fast_path_ratio": fast_path_ratio(counters),
+        "cache": shape_cache.cache_info()._asdict(),
+    }
@@ -0,0 +1,144 @@
+"""
+Text itemization for rich-ctl.
+
+This module splits text into runs that share a script, direction and font,
+so that each run can be shaped with its own HarfBuzz buffer settings and
+with a font that actually covers its characters.
+"""
+
+import re
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Tuple
+
+from .fallback import chain_for_script, coverage_for, generation
+from .scripts import COMMON, INHERITED, UNKNOWN, is_rtl_script, scripts_of
+
+# Alternating ASCII / non-ASCII spans; ASCII spans never need a table lookup
+_SPAN_RE = re.compile(r"[\x00-\x7f]+|[^\x00-\x7f]+")
+_ASCII_LETTER_RE = re.compile(r"[A-Za-z]")
+
+# Scripts that take on the script of the surrounding text
+_NEUTRAL_SCRIPTS = {COMMON, INHERITED, UNKNOWN}
+
+
+class Run(NamedTuple):
+    """A span of text that can be shaped with a single HarfBuzz buffer."""
+
+    start: int
+    end: int
+    script: str
+    direction: str
+    font: Optional[str]
+
+
+@lru_cache(maxsize=4096)
+def _itemize_span(span: str, script: Optional[str], generation: int) -> Tuple[Tuple[int, int, str, Optional[str]], ...]:
+    """
+    Split a non-ASCII span into (start, end, script, font) pieces.
+
+    Each character goes to the first font of its script's fallback chain
+    that covers it; combining marks stay with their base character, and
+    neutral characters stay in the current font when it covers them.
+    Spans are cached independently, so a line whose ASCII parts change
+    reuses the classification of its non-ASCII parts.
+
+    Args:
+        span: A string containing no ASCII characters.
+        script: Script to use for all non-neutral characters, or None to detect.
+        generation: Fallback configuration generation, part of the cache key.
+
+    Returns:
+        Tuple of (start, end, script, font) with offsets relative to ``span``.
+    """
+    pieces = []
+    start = 0
+    current = None
+    current_font = None
+    for i, char_script in enumerate(scripts_of(span)):
+        codepoint = ord(span[i])
+        if char_script == INHERITED and current is not None:
+            continue
+        if char_script in _NEUTRAL_SCRIPTS:
+            char_script = current if current is not None else COMMON
+            if current is not None and coverage_for(current_font).covers(codepoint):
+                continue
+        elif script is not None:
+            char_script = script
+        font = chain_for_script(char_script).font_for(codepoint)
+        if char_script != current or font != current_font:
+            if current is not None:
+                pieces.append((start, i, current, current_font))
+            start = i
+            current = char_script
+            current_font = font
+    if current is not None:
+        pieces.append((start, len(span), current, current_font))
+    return tuple(pieces)
+
+
+def _covered(font: Optional[str], text: str) -> bool:
+    """Check whether a font covers every character of a (short) string."""
+    coverage = coverage_for(font)
+    return all(coverage.covers(ord(char)) for char in text)
+
+
+def _script_pieces(text: str, script: Optional[str]) -> List[Tuple[int, int, str, Optional[str]]]:
+    """Classify text into (start, end, script, font) pieces, neutral pieces included."""
+    pieces = []
+    gen = generation()
+    for match in _SPAN_RE.finditer(text):
+        span = match.group()
+        offset = match.start()
+        if span.isascii():
+            if _ASCII_LETTER_RE.search(span):
+                span_script = script or 'Latn'
+            else:
+                span_script = COMMON
+            font = chain_for_script(span_script).font_for(ord(span[0]))
+            pieces.append((offset, match.end(), span_script, font))
+        else:
+            for start, end, span_script, font in _itemize_span(span, script, gen):
+                pieces.append((offset + start, offset + end, span_script, font))
+    return pieces
+
+
+def itemize(text: str, script: Optional[str] = None) -> List[Run]:
+    """
+    Split text into runs of uniform script, direction and font.
+
+    Common and inherited characters (spaces, punctuation, combining marks)
+    are attached to the preceding run when its font covers them, or to the
+    following run when they start the text. Fonts are chosen per character
+    from the script's fallback chain.
+
+    Args:
+        text: The text to itemize.
+        script: Optional script code to use instead of detection.
+
+    Returns:
+        List of Run objects covering ``text`` in logical order.
+    """
+    merged: List[List] = []
+    for start, end, piece_script, font in _script_pieces(text, script):
+        if merged:
+            prev = merged[-1]
+            if piece_script == prev[2] and font == prev[3]:
+                prev[1] = end
+                continue
+            if piece_script == COMMON and (font == prev[3] or _covered(prev[3], text[start:end])):
+                prev[1] = end
+                continue
+            if prev[2] == COMMON and (font == prev[3] or _covered(font, text[prev[0]:prev[1]])):
+                # Leading neutral text adopts the first real script and its font
+                prev[1] = end
+                prev[2] = piece_script
+                prev[3] = font
+                continue
+        merged.append([start, end, piece_script, font])
+
+    return [
+        Run(start, end, run_script,
+            'rtl' if is_rtl_script(run_script) else 'ltr',
+            font)
+        for start, end, run_script, font in merged
+    ]
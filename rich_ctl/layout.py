@@ -0,0 +1,286 @@
+"""
+Cell layout for rich-ctl.
+
+This module turns a shaped run into cumulative terminal cell offsets at
+every cluster boundary, so cut positions for wrapping and cropping, and the
+width of any substring, are found with a binary search instead of shaping
+substrings again.
+
+Converting a long run is vectorized with NumPy when it is installed
+(``pip install rich-ctl[numpy]``); without it the same arrays are built in
+pure Python.
+"""
+
+import sys
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from . import instrument
+from .cache import CacheKey, shape_cache
+from .measure import grapheme_widths, registry
+from .scripts import has_complex_script
+
+if TYPE_CHECKING:
+    from .calibrate import WidthModel
+    from .shape import ShapedRun
+
+# Runs with fewer clusters are converted in Python, where NumPy's call overhead dominates
+NUMPY_MIN_CLUSTERS = 256
+
+# The numpy module once imported, False if it is not installed, None if not tried yet
+_numpy = None
+
+
+def _get_numpy():
+    """Import NumPy on first use; None if it is not installed."""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+        except ImportError:
+            _numpy = False
+        else:
+            _numpy = numpy
+    return _numpy or None
+
+
+def _numpy_cells(np, run: "ShapedRun", model: "WidthModel") -> Tuple["array[int]", "array[int]"]:
+    """Convert a run with NumPy; see cluster_cells()."""
+    advances = np.asarray(run.advances, dtype=np.int64)
+    table = np.frombuffer(model.table, dtype=np.uint8)
+    limit = len(table)
+    # Negative advances index the table's 0; advances past it are converted one by one
+    widths = table[np.clip(advances, 0, limit - 1)].astype(np.uintc)
+    for i in np.flatnonzero(advances >= limit).tolist():
+        widths[i] = model._convert(int(advances[i]))
+    if registry.covers(run.text):
+        widths = np.array(registry.apply(run.text, run.offsets, widths.tolist()), dtype=np.uintc)
+    cells = np.zeros(len(widths) + 1, dtype=np.uintc)
+    np.cumsum(widths, dtype=np.uintc, out=cells[1:])
+    width_array = array('I')
+    width_array.frombytes(widths.tobytes())
+    cell_array = array('I')
+    cell_array.frombytes(cells.tobytes())
+    return width_array, cell_array
+
+
+def cluster_cells(run: "ShapedRun", model: "WidthModel") -> Tuple["array[int]", "array[int]"]:
+    """
+    Convert the clusters of a shaped run to terminal cells.
+
+    Long runs measured by their advances are converted with NumPy in one
+    pass when it is installed: table lookup, the rare clusters too wide for
+    the table, and the running sum. Registered width mappers are applied
+    to the clusters they cover.
+
+    Args:
+        run: The shaped run.
+        model: Width model converting clusters to cells.
+
+    Returns:
+        (widths, cells): the width of each cluster, and the cell offset of
+        each cluster boundary, starting at 0; ``cells[-1]`` is the total.
+    """
+    if model.shaped and len(run.advances) >= NUMPY_MIN_CLUSTERS:
+        np = _get_numpy()
+        if np is not None:
+            return _numpy_cells(np, run, model)
+    widths = model.cluster_widths(run.text, run.offsets, run.advances)
+    if registry.covers(run.text):
+        widths = registry.apply(run.text, run.offsets, widths)
+    cells = array('I', [0])
+    cells.extend(accumulate(widths))
+    return array('I', widths), cells
+
+
+class CellLayout:
+    """
+    Cluster boundaries of a string and the cell offset of each boundary.
+
+    ``offsets[k]`` is the string index where cluster ``k`` starts and
+    ``cells[k]`` is the width in cells of ``text[:offsets[k]]``; both arrays
+    have one entry more than there are clusters. Each cluster occupies the
+    cells the width model (and any registered width mapper) gives it on its
+    own, so widths add up across any split on a cluster boundary.
+    """
+
+    __slots__ = ("text", "offsets", "cells")
+
+    def __init__(self, text: str, offsets: "array[int]", cells: "array[int]"):
+        self.text = text
+        self.offsets = offsets
+        self.cells = cells
+
+    @classmethod
+    def from_run(cls, run: "ShapedRun", model: "WidthModel") -> "CellLayout":
+        """
+        Get the layout of a shaped run.
+
+        The layout is kept on the run, so a cached run is converted once
+        per width model and set of width mappers.
+
+        Args:
+            run: The shaped run.
+            model: Width model converting clusters to cells.
+
+        Returns:
+            A CellLayout over ``run.text``.
+        """
+        key = (model.key, registry.generation)
+        layouts = run.layouts
+        if layouts is None:
+            layouts = run.layouts = {}
+        layout = layouts.get(key)
+        if layout is None:
+            _, cells = cluster_cells(run, model)
+            layout = layouts[key] = cls(run.text, run.offsets, cells)
+        return layout
+
+    @classmethod
+    def from_graphemes(cls, text: str) -> "CellLayout":
+        """
+        Build a layout from the width table, for text that needs no shaping.
+
+        Args:
+            text: Text without complex-script characters.
+
+        Returns:
+            A CellLayout with one cluster per grapheme.
+        """
+        offsets, widths = grapheme_widths(text)
+        if registry.covers(text):
+            widths = registry.apply(text, offsets, widths)
+        cells = array('I', [0])
+        cells.extend(accumulate(widths))
+        return cls(text, offsets, cells)
+
+    @property
+    def total(self) -> int:
+        """Width of the whole string in cells."""
+        return self.cells[-1]
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the layout, for the cache byte limit."""
+        return (sys.getsizeof(self) + sys.getsizeof(self.text)
+                + sys.getsizeof(self.offsets) + sys.getsizeof(self.cells))
+
+    def boundary_of(self, index: int) -> int:
+        """
+        Get the cluster boundary at or before a string index.
+
+        Args:
+            index: A string index into ``text``.
+
+        Returns:
+            The boundary number ``k``, with ``offsets[k] <= index``.
+        """
+        return max(0, bisect_right(self.offsets, index) - 1)
+
+    def width(self, start: int = 0, end: Optional[int] = None) -> int:
+        """
+        Get the width of ``text[start:end]`` in cells without reshaping it.
+
+        Indices inside a cluster are moved back to the start of that cluster.
+
+        Args:
+            start: Start string index.
+            end: End string index; defaults to the end of the text.
+
+        Returns:
+            Width in cells.
+        """
+        cells = self.cells
+        end_cells = cells[-1] if end is None else cells[self.boundary_of(end)]
+        return max(0, end_cells - cells[self.boundary_of(start)])
+
+    def fit(self, start: int, cells: int) -> int:
+        """
+        Get the largest cluster-aligned index ``end`` with ``width(start, end) <= cells``.
+
+        Args:
+            start: Start string index.
+            cells: Available width in cells.
+
+        Returns:
+            A string index on a cluster boundary; equal to the (aligned)
+            start if not even one cluster fits.
+        """
+        k = self.boundary_of(start)
+        return self.offsets[self.boundary_at(self.cells[k] + cells)]
+
+    def boundary_at(self, cell: int) -> int:
+        """
+        Get the last cluster boundary whose cell offset is at most ``cell``.
+
+        Args:
+            cell: A cell position.
+
+        Returns:
+            The boundary number ``k``; the string index is ``offsets[k]``.
+        """
+        return max(0, bisect_right(self.cells, cell) - 1)
+
+    def cut(self, cell: int) -> Tuple[int, int]:
+        """
+        Find where to cut the string so the left part fits in ``cell`` cells.
+
+        Args:
+            cell: Available width in cells.
+
+        Returns:
+            A (string index, cells used) pair; the index is always a cluster
+            boundary, and cells used is less than ``cell`` only when a
+            cluster straddles the cut.
+        """
+        k = self.boundary_at(cell)
+        return self.offsets[k], self.cells[k]
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+
+def run_cells(run: "ShapedRun", model: "WidthModel") -> int:
+    """
+    Get the width of a shaped run in cells, as a CellLayout would count it.
+
+    Args:
+        run: The shaped run.
+        model: Width model converting clusters to cells.
+
+    Returns:
+        The sum of the cell widths of the run's clusters.
+    """
+    return CellLayout.from_run(run, model).total
+
+
+def get_layout(text: str, model: "WidthModel") -> CellLayout:
+    """
+    Get the cell layout of a string, shaping it if necessary.
+
+    Text without complex-script characters is laid out from the width
+    table by grapheme cluster, without HarfBuzz.
+
+    Args:
+        text: The text to lay out.
+        model: Width model converting clusters to cells.
+
+    Returns:
+        The CellLayout of ``text``; it is not normalized, so offsets index
+        the string as given.
+    """
+    key = CacheKey(text, width_model=model.key, kind="layout")
+    layout = shape_cache.get(key)
+    if instrument.enabled:
+        instrument.incr("layout.hit" if layout is not None else "layout.miss")
+    if layout is None:
+        if has_complex_script(text):
+            from .shape import _shape_text
+            run = _shape_text(text, None, None, "en", None, None, normalize=False)
+            layout = CellLayout.from_run(run, model)
+        else:
+            layout = CellLayout.from_graphemes(text)
+        shape_cache.put(key, layout)
+    return layout
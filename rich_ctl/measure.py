@@ -1,57 +1,381 @@
 """
 Width measurement module for rich-ctl.
 
-This module provides functions to convert pixel advances to terminal cell counts.
+This module provides functions to convert pixel advances to terminal cell counts,
+and a table-driven measurer for text that does not need shaping.
 """
 
 import math
-from typing import Callable, Dict, Optional
+import re
+import unicodedata
+from array import array
+from bisect import bisect_right
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
 
+# Code points covered by the precomputed width table; beyond it widths follow
+# the static ranges in _width_beyond_table()
+_TABLE_LIMIT = 0x20000
 
-def px_to_cells(advance_px: int, cell_width_px: int = 8) -> int:
+# Grapheme cluster pattern, compiled on first use since importing regex is slow
+_grapheme_re = None
+
+# Regional indicator symbols, which pair up into flags two cells wide
+_REGIONAL_INDICATORS = range(0x1F1E6, 0x1F200)
+
+_width_table: Optional[bytes] = None
+_not_narrow_re: Optional['re.Pattern[str]'] = None
+
+
+def px_to_cells(advance_px: int, cell_width_px: Optional[float] = None) -> int:
     """
-    Convert pixel advance to terminal cell count.
+    Convert a cluster advance to terminal cell count.
     
     Args:
-        advance_px: The pixel advance of a glyph cluster.
-        cell_width_px: The width of a single terminal cell in pixels (default: 8).
+        advance_px: The advance of a glyph cluster as HarfBuzz reports it,
+            in 1/64 pixel at the shaping size.
+        cell_width_px: The width of a single terminal cell in pixels at the
+            shaping size. If None, the calibrated width model is used.
     
     Returns:
         The number of terminal cells required to display the glyph cluster.
     """
     if advance_px <= 0:
         return 0
+    if cell_width_px is None:
+        from . import calibrate
+        return calibrate.width_model.cells(advance_px)
     
     # Use ceiling to ensure we allocate enough cells
     # even if the advance is slightly larger than n cells
-    return math.ceil(advance_px / cell_width_px)
+    return math.ceil(advance_px / (cell_width_px * 64))
+
+
+def _char_width(char: str) -> int:
+    """Get the terminal width of a single code point from Unicode properties."""
+    codepoint = ord(char)
+    if unicodedata.category(char) in ("Mn", "Me", "Cf", "Cc") or 0x1160 <= codepoint <= 0x11FF:
+        # Combining marks, format and control characters, Hangul medial vowels
+        return 0
+    if unicodedata.east_asian_width(char) in ("W", "F"):
+        return 2
+    return 1
+
+
+def _width_beyond_table(codepoint: int) -> int:
+    """Get the width of a code point above the table limit."""
+    if codepoint <= 0x3FFFF:
+        # Supplementary and tertiary ideographic planes
+        return 2
+    if 0xE0000 <= codepoint <= 0xE0FFF:
+        # Tags and variation selectors
+        return 0
+    return 1
+
+
+def _load_width_table() -> Tuple[bytes, 're.Pattern[str]']:
+    """
+    Build the code point to width table and a pattern for non-narrow characters.
+    
+    The table is built on first use, since it costs tens of milliseconds.
+    """
+    global _width_table, _not_narrow_re
+    if _width_table is None:
+        table = bytearray(_TABLE_LIMIT)
+        ranges = []
+        start = None
+        for codepoint in range(_TABLE_LIMIT):
+            width = _char_width(chr(codepoint))
+            table[codepoint] = width
+            if width != 1 and start is None:
+                start = codepoint
+            elif width == 1 and start is not None:
+                ranges.append(f"\\U{start:08x}-\\U{codepoint - 1:08x}")
+                start = None
+        if start is not None:
+            ranges.append(f"\\U{start:08x}-\\U{_TABLE_LIMIT - 1:08x}")
+        ranges.append(f"\\U{_TABLE_LIMIT:08x}-\\U0003ffff\\U000e0000-\\U000e0fff")
+        _not_narrow_re = re.compile(f"[{''.join(ranges)}]")
+        _width_table = bytes(table)
+    return _width_table, _not_narrow_re
+
+
+def grapheme_widths(text: str) -> Tuple['array[int]', 'array[int]']:
+    """
+    Split text into grapheme clusters and measure each from the width table.
+    
+    A cluster takes the width of its first visible code point; an emoji
+    presentation selector (U+FE0F) or a regional indicator pair makes it
+    two cells wide.
+    
+    Args:
+        text: Text without complex-script characters.
+    
+    Returns:
+        (offsets, widths): cluster start offsets with len(text) appended,
+        and the width in cells of each cluster.
+    """
+    global _grapheme_re
+    if _grapheme_re is None:
+        import regex
+        _grapheme_re = regex.compile(r"\X")
+    table, _ = _load_width_table()
+    offsets = array('I')
+    widths = array('I')
+    for match in _grapheme_re.finditer(text):
+        cluster = match.group()
+        width = 0
+        for char in cluster:
+            codepoint = ord(char)
+            width = table[codepoint] if codepoint < _TABLE_LIMIT else _width_beyond_table(codepoint)
+            if width:
+                break
+        if width == 1 and ("\ufe0f" in cluster or ord(cluster[0]) in _REGIONAL_INDICATORS):
+            width = 2
+        offsets.append(match.start())
+        widths.append(width)
+    offsets.append(len(text))
+    return offsets, widths
+
+
+def simple_cell_len(text: str) -> int:
+    """
+    Get the width of text that needs no shaping, without HarfBuzz.
+    
+    Text in which every character is one cell wide is answered with a
+    single regular expression scan; otherwise grapheme clusters are
+    measured with grapheme_widths().
+    
+    Args:
+        text: Text without complex-script characters.
+    
+    Returns:
+        The width in terminal cells.
+    """
+    _, not_narrow = _load_width_table()
+    if not_narrow.search(text) is None:
+        return len(text)
+    return sum(grapheme_widths(text)[1])
 
 
 # Type for a custom width mapping function
 WidthMapperFunc = Callable[[str, int], Optional[int]]
 
+# Cluster widths remembered by the registry before the memo is reset
+_MAX_OVERRIDES = 1 << 16
+
+# Any character outside the BMP
+_ASTRAL_RE = re.compile("[\U00010000-\U0010ffff]")
+
+# Inclusive (start, end) ranges of assigned code points whose East Asian
+# Width is Wide or Fullwidth, from the Unicode 14 EastAsianWidth.txt
+_EAST_ASIAN_WIDE_RANGES: Tuple[Tuple[int, int], ...] = (
+    (0x1100, 0x115F), (0x231A, 0x231B), (0x2329, 0x232A), (0x23E9, 0x23EC),
+    (0x23F0, 0x23F0), (0x23F3, 0x23F3), (0x25FD, 0x25FE), (0x2614, 0x2615),
+    (0x2648, 0x2653), (0x267F, 0x267F), (0x2693, 0x2693), (0x26A1, 0x26A1),
+    (0x26AA, 0x26AB), (0x26BD, 0x26BE), (0x26C4, 0x26C5), (0x26CE, 0x26CE),
+    (0x26D4, 0x26D4), (0x26EA, 0x26EA), (0x26F2, 0x26F3), (0x26F5, 0x26F5),
+    (0x26FA, 0x26FA), (0x26FD, 0x26FD), (0x2705, 0x2705), (0x270A, 0x270B),
+    (0x2728, 0x2728), (0x274C, 0x274C), (0x274E, 0x274E), (0x2753, 0x2755),
+    (0x2757, 0x2757), (0x2795, 0x2797), (0x27B0, 0x27B0), (0x27BF, 0x27BF),
+    (0x2B1B, 0x2B1C), (0x2B50, 0x2B50), (0x2B55, 0x2B55), (0x2E80, 0x2E99),
+    (0x2E9B, 0x2EF3), (0x2F00, 0x2FD5), (0x2FF0, 0x2FFB), (0x3000, 0x3029),
+    (0x302E, 0x303E), (0x3041, 0x3096), (0x309B, 0x30FF), (0x3105, 0x312F),
+    (0x3131, 0x318E), (0x3190, 0x31E3), (0x31F0, 0x321E), (0x3220, 0x3247),
+    (0x3250, 0x4DBF), (0x4E00, 0xA48C), (0xA490, 0xA4C6), (0xA960, 0xA97C),
+    (0xAC00, 0xD7A3), (0xF900, 0xFA6D), (0xFA70, 0xFAD9), (0xFE10, 0xFE19),
+    (0xFE30, 0xFE52), (0xFE54, 0xFE66), (0xFE68, 0xFE6B), (0xFF01, 0xFF60),
+    (0xFFE0, 0xFFE6), (0x16FE0, 0x16FE3), (0x16FF0, 0x16FF1), (0x17000, 0x187F7),
+    (0x18800, 0x18CD5), (0x18D00, 0x18D08), (0x1AFF0, 0x1AFF3), (0x1AFF5, 0x1AFFB),
+    (0x1AFFD, 0x1AFFE), (0x1B000, 0x1B122), (0x1B150, 0x1B152), (0x1B164, 0x1B167),
+    (0x1B170, 0x1B2FB), (0x1F004, 0x1F004), (0x1F0CF, 0x1F0CF), (0x1F18E, 0x1F18E),
+    (0x1F191, 0x1F19A), (0x1F200, 0x1F202), (0x1F210, 0x1F23B), (0x1F240, 0x1F248),
+    (0x1F250, 0x1F251), (0x1F260, 0x1F265), (0x1F300, 0x1F320), (0x1F32D, 0x1F335),
+    (0x1F337, 0x1F37C), (0x1F37E, 0x1F393), (0x1F3A0, 0x1F3CA), (0x1F3CF, 0x1F3D3),
+    (0x1F3E0, 0x1F3F0), (0x1F3F4, 0x1F3F4), (0x1F3F8, 0x1F43E), (0x1F440, 0x1F440),
+    (0x1F442, 0x1F4FC), (0x1F4FF, 0x1F53D), (0x1F54B, 0x1F54E), (0x1F550, 0x1F567),
+    (0x1F57A, 0x1F57A), (0x1F595, 0x1F596), (0x1F5A4, 0x1F5A4), (0x1F5FB, 0x1F64F),
+    (0x1F680, 0x1F6C5), (0x1F6CC, 0x1F6CC), (0x1F6D0, 0x1F6D2), (0x1F6D5, 0x1F6D7),
+    (0x1F6DD, 0x1F6DF), (0x1F6EB, 0x1F6EC), (0x1F6F4, 0x1F6FC), (0x1F7E0, 0x1F7EB),
+    (0x1F7F0, 0x1F7F0), (0x1F90C, 0x1F93A), (0x1F93C, 0x1F945), (0x1F947, 0x1F9FF),
+    (0x1FA70, 0x1FA74), (0x1FA78, 0x1FA7C), (0x1FA80, 0x1FA86), (0x1FA90, 0x1FAAC),
+    (0x1FAB0, 0x1FABA), (0x1FAC0, 0x1FAC5), (0x1FAD0, 0x1FAD9), (0x1FAE0, 0x1FAE7),
+    (0x1FAF0, 0x1FAF6), (0x20000, 0x2A6DF), (0x2A700, 0x2B738), (0x2B740, 0x2B81D),
+    (0x2B820, 0x2CEA1), (0x2CEB0, 0x2EBE0), (0x2F800, 0x2FA1D), (0x30000, 0x3134A),
+)
+_EAST_ASIAN_WIDE_STARTS = [start for start, _ in _EAST_ASIAN_WIDE_RANGES]
+
+
+class _Mapper(NamedTuple):
+    mapper: WidthMapperFunc
+    ranges: Optional[Tuple[Tuple[int, int], ...]]
+
 
 class WidthRegistry:
     """
     Registry for custom width mappers that can override the default px_to_cells logic.
     
     This allows for special handling of specific scripts or character classes,
-    such as East Asian full-width characters.
+    such as East Asian full-width characters. Mappers are called per cluster,
+    so overridden widths still add up across splits.
+    
+    A mapper registered for scripts or code point ranges is only called for
+    clusters containing one of its code points. On each registration the
+    index is compiled into a lookup table from code point to the mappers
+    covering it, and a pattern matching any covered code point, so text that
+    no mapper covers is passed over with one scan. The table is built on
+    first use after a change, and overrides are cached by cluster text.
     """
     
     def __init__(self):
-        self._mappers: Dict[str, WidthMapperFunc] = {}
+        self._mappers: Dict[str, _Mapper] = {}
+        self._overrides: Dict[Tuple[str, int], int] = {}
+        self._global: Tuple[WidthMapperFunc, ...] = ()
+        self._groups: List[Tuple[WidthMapperFunc, ...]] = [()]
+        self._index = bytes(_TABLE_LIMIT)
+        self._beyond: List[Tuple[int, int, int]] = []
+        self._beyond_starts: List[int] = []
+        self._covered: Optional['re.Pattern[str]'] = None
+        self._covers_astral = False
+        self._compiled = True
+        # Incremented on every change, so widths computed earlier can be told apart
+        self.generation = 0
     
-    def register(self, name: str, mapper: WidthMapperFunc) -> None:
+    def register(self, name: str, mapper: WidthMapperFunc,
+                 scripts: Optional[Iterable[str]] = None,
+                 ranges: Optional[Iterable[Tuple[int, int]]] = None) -> None:
         """
         Register a custom width mapper.
         
         Args:
             name: A unique name for the mapper.
-            mapper: A function that takes (text, default_width) and returns
+            mapper: A function that takes (cluster, default_width) and returns
                    a custom width, or None to use the default width.
+            scripts: ISO 15924 script codes whose clusters the mapper handles.
+            ranges: Inclusive (start, end) code point ranges the mapper handles.
+                   Without scripts or ranges, the mapper sees every cluster.
+        
+        Raises:
+            ValueError: If a script code is unknown.
+        """
+        covered: Optional[List[Tuple[int, int]]] = None
+        if scripts is not None or ranges is not None:
+            covered = list(ranges or ())
+            if scripts is not None:
+                from .scripts import _SCRIPT_RANGES
+                wanted = set(scripts)
+                known = {script for _, _, script in _SCRIPT_RANGES}
+                if not wanted <= known:
+                    raise ValueError(f"Unknown script codes: {sorted(wanted - known)}")
+                covered.extend((start, end) for start, end, script in _SCRIPT_RANGES if script in wanted)
+        self._mappers[name] = _Mapper(mapper, None if covered is None else tuple(covered))
+        self._changed()
+    
+    def unregister(self, name: str) -> None:
         """
-        self._mappers[name] = mapper
+        Remove a width mapper.
+        
+        Args:
+            name: The name it was registered under.
+        
+        Raises:
+            KeyError: If no mapper has that name.
+        """
+        del self._mappers[name]
+        self._changed()
+    
+    def _changed(self) -> None:
+        """Mark the dispatch table stale and drop widths measured with the previous mappers."""
+        self._compiled = False
+        self._overrides = {}
+        self.generation += 1
+        from .cache import clear_cache
+        clear_cache()
+    
+    def _compile(self) -> None:
+        """Rebuild the dispatch table from the registered mappers."""
+        entries = list(self._mappers.values())
+        # Split the covered ranges into intervals with the same set of mappers
+        points = set()
+        for entry in entries:
+            for start, end in entry.ranges or ():
+                points.add(start)
+                points.add(end + 1)
+        bounds = sorted(points)
+        group_ids: Dict[Tuple[WidthMapperFunc, ...], int] = {(): 0}
+        groups: List[Tuple[WidthMapperFunc, ...]] = [()]
+        intervals = []
+        for start, stop in zip(bounds, bounds[1:]):
+            group = tuple(entry.mapper for entry in entries
+                          if entry.ranges and any(lo <= start and stop - 1 <= hi for lo, hi in entry.ranges))
+            if not group:
+                continue
+            if group not in group_ids:
+                if len(groups) > 255:
+                    raise ValueError("Too many overlapping width mapper ranges")
+                group_ids[group] = len(groups)
+                groups.append(group)
+            intervals.append((start, stop - 1, group_ids[group]))
+        
+        index = bytearray(_TABLE_LIMIT)
+        beyond = []
+        parts = []
+        for start, end, group in intervals:
+            if start <= 0xFFFF:
+                parts.append(f"\\U{start:08x}-\\U{min(end, 0xFFFF):08x}")
+            if start < _TABLE_LIMIT:
+                index[start:min(end + 1, _TABLE_LIMIT)] = bytes((group,)) * (min(end + 1, _TABLE_LIMIT) - start)
+            if end >= _TABLE_LIMIT:
+                beyond.append((max(start, _TABLE_LIMIT), end, group))
+        
+        self._global = tuple(entry.mapper for entry in entries if entry.ranges is None)
+        self._groups = groups
+        self._index = bytes(index)
+        self._beyond = beyond
+        self._beyond_starts = [start for start, _, _ in beyond]
+        # A class of BMP ranges compiles to a bitmap; astral ranges would be
+        # tried one by one for every character, so they are looked up in the table
+        self._covered = re.compile(f"[{''.join(parts)}]") if parts else None
+        self._covers_astral = any(end > 0xFFFF for _, end, _ in intervals)
+        self._compiled = True
+    
+    def _group_of(self, codepoint: int) -> int:
+        """Get the dispatch group of a code point; 0 if no mapper covers it."""
+        if codepoint < _TABLE_LIMIT:
+            return self._index[codepoint]
+        i = bisect_right(self._beyond_starts, codepoint) - 1
+        if i >= 0 and codepoint <= self._beyond[i][1]:
+            return self._beyond[i][2]
+        return 0
+    
+    def _covered_positions(self, text: str) -> List[int]:
+        """Get the indices of the characters of ``text`` some mapper covers."""
+        positions = []
+        if self._covered is not None:
+            positions.extend(match.start() for match in self._covered.finditer(text))
+        if self._covers_astral:
+            positions.extend(match.start() for match in _ASTRAL_RE.finditer(text)
+                             if self._group_of(ord(match.group())))
+        return positions
+    
+    def covers(self, text: str) -> bool:
+        """
+        Check whether any mapper may override a width in ``text``.
+        
+        Args:
+            text: The text to check.
+        
+        Returns:
+            True if a mapper handles every cluster or one of the code points in ``text``.
+        """
+        if not self._compiled:
+            self._compile()
+        if self._global:
+            return True
+        if self._covered is not None and self._covered.search(text) is not None:
+            return True
+        if self._covers_astral:
+            return any(self._group_of(ord(match.group())) for match in _ASTRAL_RE.finditer(text))
+        return False
     
     def get_cell_width(self, text: str, default_width: int) -> int:
         """
@@ -64,37 +388,85 @@ class WidthRegistry:
         Returns:
             The width in cells, possibly modified by custom mappers.
         """
-        for mapper in self._mappers.values():
-            custom_width = mapper(text, default_width)
-            if custom_width is not None:
-                return custom_width
+        key = (text, default_width)
+        width = self._overrides.get(key)
+        if width is not None:
+            return width
         
-        return default_width
-
-
-# Singleton registry instance
-registry = WidthRegistry()
+        if not self._compiled:
+            self._compile()
+        width = default_width
+        groups = {self._group_of(ord(char)) for char in text}
+        groups.discard(0)
+        if groups or self._global:
+            wanted = set(self._global)
+            for group in groups:
+                wanted.update(self._groups[group])
+            for entry in self._mappers.values():
+                if entry.mapper in wanted:
+                    custom_width = entry.mapper(text, default_width)
+                    if custom_width is not None:
+                        width = custom_width
+                        break
+        
+        if len(self._overrides) >= _MAX_OVERRIDES:
+            self._overrides.clear()
+        self._overrides[key] = width
+        return width
+    
+    def apply(self, text: str, offsets: Sequence[int], widths: Iterable[int]) -> List[int]:
+        """
+        Apply the mappers to each cluster of a string.
+        
+        Args:
+            text: The string.
+            offsets: Cluster boundaries, one more than there are clusters.
+            widths: Default width of each cluster in cells.
+        
+        Returns:
+            The width of each cluster after the mappers.
+        """
+        widths = list(widths)
+        if not self._compiled:
+            self._compile()
+        if self._global:
+            clusters = range(len(widths))
+        else:
+            clusters = sorted({bisect_right(offsets, position) - 1
+                               for position in self._covered_positions(text)})
+        for i in clusters:
+            widths[i] = self.get_cell_width(text[offsets[i]:offsets[i + 1]], widths[i])
+        return widths
+    
+    def text_width(self, text: str, offsets: Sequence[int], widths: Iterable[int]) -> int:
+        """Get the width of a string after applying the mappers to each cluster."""
+        return sum(self.apply(text, offsets, widths))
+    
+    def __len__(self) -> int:
+        return len(self._mappers)
 
 
-# Example mapper for East Asian full-width characters
 def east_asian_width_mapper(text: str, default_width: int) -> Optional[int]:
     """
-    Width mapper for East Asian full-width characters.
+    Width mapper for East Asian wide and fullwidth characters.
     
-    This is just a simple example - a real implementation would use unicodedata.east_asian_width
-    to identify full-width characters and handle them appropriately.
+    Terminals give these two cells whatever the advance of their glyph in
+    the shaping font, so a cluster starting with one takes two cells.
     
     Args:
         text: The text cluster.
         default_width: The default width in cells.
     
     Returns:
-        Double the width for East Asian full-width characters, None otherwise.
+        2 for clusters starting with a Wide or Fullwidth character, None otherwise.
     """
-    # This is a simplified implementation
-    # In reality, we would check each character's east_asian_width property
-    return None  # No special handling in this example
+    codepoint = ord(text[0]) if text else 0
+    i = bisect_right(_EAST_ASIAN_WIDE_STARTS, codepoint) - 1
+    if i >= 0 and codepoint <= _EAST_ASIAN_WIDE_RANGES[i][1]:
+        return 2
+    return None
 
 
-# Register the East Asian width mapper by default
-# registry.register('east_asian', east_asian_width_mapper)
\ No newline at end of file
+# Singleton registry instance, with the East Asian width mapper registered by default
+registry = WidthRegistry()
+registry.register('east_asian', east_asian_width_mapper, ranges=_EAST_ASIAN_WIDE_RANGES)
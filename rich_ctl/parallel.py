@@ -0,0 +1,101 @@
+"""
+Process-pool measurement for rich-ctl.
+
+This module measures large batches of strings across worker processes, so
+offline exports of big multilingual reports are not limited by the GIL.
+Widths and cell layouts come back as compact arrays and are merged into
+the parent's cache, so rendering afterwards finds them there, as far as
+the cache limits hold them.
+
+Custom width mappers must be registered at import time of a module the
+workers also import; mappers added at run time in the parent are not seen
+by workers started with the "spawn" method.
+"""
+
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from . import calibrate, patch
+from .cache import CacheKey, shape_cache
+from .calibrate import WidthModel
+from .fallback import get_fallback_fonts, set_fallback_fonts
+from .fonts import get_font, get_font_index
+from .layout import CellLayout, get_layout
+from .patch import ctl_cell_len
+
+# Strings per task sent to a worker
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def _init_worker(model: WidthModel, fallback_fonts: Sequence[str]) -> None:
+    """Configure a worker process and load the font index and default font once."""
+    calibrate.set_width_model(model)
+    if fallback_fonts:
+        set_fallback_fonts(fallback_fonts)
+    get_font_index()
+    get_font()
+
+
+def _measure_chunk(texts: List[str]) -> Tuple["array[int]", List[Tuple["array[int]", "array[int]"]]]:
+    """
+    Measure a chunk of strings in a worker.
+
+    Returns:
+        (widths, layouts): the width of each string, and the cluster
+        offsets and cell offsets of its layout.
+    """
+    model = calibrate.width_model
+    widths = array('I')
+    layouts = []
+    for text in texts:
+        widths.append(ctl_cell_len(text))
+        layout = get_layout(text, model)
+        layouts.append((layout.offsets, layout.cells))
+    return widths, layouts
+
+
+def cell_len_parallel(texts: Iterable[str], max_workers: Optional[int] = None,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE, mp_context=None) -> List[int]:
+    """
+    Get the cell lengths of many strings using a pool of worker processes.
+
+    Only unique, non-ASCII strings whose width is not cached yet are sent to
+    the workers. Their widths and layouts are stored in the shared cache,
+    so later ctl_cell_len() calls and the cropping and wrapping patches in
+    this process find them there while the cache holds them; the returned
+    widths do not depend on the cache size. Batches that fit in a single
+    chunk are measured in this process.
+
+    Args:
+        texts: The strings to measure.
+        max_workers: Number of worker processes; defaults to the CPU count.
+        chunk_size: Number of strings per task.
+        mp_context: Optional multiprocessing context for the pool.
+
+    Returns:
+        The width in terminal cells of each string, in input order.
+    """
+    texts = list(texts)
+    model = calibrate.width_model
+    pending = patch.uncached_texts(texts)
+    measured: Dict[str, int] = {}
+
+    if len(pending) > chunk_size and (max_workers or os.cpu_count() or 1) > 1:
+        chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+        initargs = (model, get_fallback_fonts())
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context,
+                                 initializer=_init_worker, initargs=initargs) as pool:
+            for chunk, (widths, layouts) in zip(chunks, pool.map(_measure_chunk, chunks)):
+                for text, width, (offsets, cells) in zip(chunk, widths, layouts):
+                    measured[text] = width
+                    patch._put_width(CacheKey(text, width_model=model.key), width)
+                    shape_cache.put(CacheKey(text, width_model=model.key, kind="layout"),
+                                    CellLayout(text, offsets, cells))
+
+    # ASCII, already cached and in-process strings; the pool's widths are
+    # taken from its results, since a small cache may have evicted them
+    others = [text for text in dict.fromkeys(texts) if text not in measured]
+    measured.update(zip(others, patch.cell_len_many(others)))
+    return [measured[text] for text in texts]
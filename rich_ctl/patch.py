@@ -2,94 +2,439 @@
 Rich/Textual patching module for rich-ctl.
 
 This module monkey-patches Rich and Textual to use cluster-aware width measurements.
+
+HarfBuzz and the font machinery are imported on the first measurement of
+complex-script text, so ASCII-only programs never load them.
 """
 
-import functools
-import inspect
-from typing import Dict, List, Optional, Tuple, Union, Callable
+import sys
+from time import perf_counter
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
 
-from rich.console import Console
 from rich.segment import Segment
+from rich.text import Text
+import rich.cells
 import rich.segment
 
-from .shape import shape_text, Cluster
-from .measure import px_to_cells, registry
-
+from . import calibrate, instrument
+from .cache import CacheKey, configure_cache, shape_cache
+from .layout import get_layout, run_cells
+from .measure import grapheme_widths, registry, simple_cell_len
+from .scripts import has_complex_script
 
-# Cache for shaped clusters to avoid reshaping the same text multiple times
-_cluster_cache: Dict[str, List[Cluster]] = {}
+if TYPE_CHECKING:
+    from rich.console import Console
+    from .shape import ShapedRun
 
 
 # Store original functions for later restoration
-_original_cached_cell_len = rich.segment.cached_cell_len
+_original_cached_cell_len = rich.cells.cached_cell_len
+_original_cell_len = rich.cells.cell_len
+_original_set_cell_size = rich.cells.set_cell_size
+_original_chop_cells = rich.cells.chop_cells
+_original_split_text = getattr(rich.cells, "split_text", None)
+_original_split_cells = Segment.split_cells
+_original_divide = Text.divide
+
+# (owner, attribute, original value) for every patch applied by patch_rich()
+_patched: List[Tuple[object, str, object]] = []
 
 
-@functools.lru_cache(maxsize=1024)
-def ctl_cell_len(text: str) -> int:
+def ctl_cell_len(text: str, *args) -> int:
     """
     Get the cell length of text, taking into account complex scripts.
     
     Args:
         text: The text to measure.
+        *args: Passed on to Rich for ASCII text (e.g. unicode_version).
         
     Returns:
         The width in terminal cells.
     """
     # Fast path for ASCII text
     if not text or text.isascii():
+        if instrument.enabled:
+            instrument.incr("cell_len.ascii")
         # Use the original implementation for ASCII text
-        return _original_cached_cell_len(text)
+        return _original_cached_cell_len(text, *args)
+    
+    # Widths are cached next to the shaped runs, keyed by the width model
+    model = calibrate.width_model
+    key = CacheKey(text, width_model=model.key)
+    width = shape_cache.get(key)
+    if width is not None:
+        if instrument.enabled:
+            instrument.incr("cell_len.hit")
+        return width
+    
+    # Text without complex scripts is measured from the width table
+    if not has_complex_script(text):
+        if instrument.enabled:
+            instrument.incr("cell_len.simple")
+        return _store_simple_width(key)
+    
+    # Terminals that do not shape are measured from the text alone
+    if not model.shaped:
+        if instrument.enabled:
+            instrument.incr("cell_len.simple")
+        return _store_text_width(key, model)
+    
+    # Shape the text to get its cluster advances (runs come from the shape cache)
+    from .shape import shape_text_compact
+    if not instrument.enabled:
+        return _store_width(key, shape_text_compact(text), model)
+    start = perf_counter()
+    width = _store_width(key, shape_text_compact(text), model)
+    instrument.observe("cell_len.shaped", start)
+    return width
+
+
+def _store_simple_width(key: CacheKey) -> int:
+    """Measure text without complex scripts and cache its width under ``key``."""
+    text = key.text
+    if registry.covers(text):
+        # Custom mappers are applied per grapheme cluster
+        offsets, widths = grapheme_widths(text)
+        width = registry.text_width(text, offsets, widths)
+    else:
+        width = simple_cell_len(text)
+    _put_width(key, width)
+    return width
+
+
+def _store_text_width(key: CacheKey, model: "calibrate.WidthModel") -> int:
+    """Measure complex text with a text-based width model and cache its width under ``key``."""
+    text = key.text
+    if registry.covers(text):
+        offsets, _ = grapheme_widths(text)
+        width = registry.text_width(text, offsets, model.cluster_widths(text, offsets, ()))
+    else:
+        width = model.text_cells(text)
+    _put_width(key, width)
+    return width
+
+
+def _store_width(key: CacheKey, run: "ShapedRun", model: "calibrate.WidthModel") -> int:
+    """Convert a shaped run to cells and cache its width under ``key``."""
+    # Convert to cell count, cluster by cluster so widths add up across splits;
+    # custom width mappers are applied to each cluster
+    width = run_cells(run, model)
+    _put_width(key, width)
+    return width
+
+
+def _put_width(key: CacheKey, width: int) -> None:
+    """Cache a measured width; the entry size is the key text plus the int."""
+    shape_cache.put(key, width, nbytes=sys.getsizeof(key.text) + sys.getsizeof(width))
+
+
+def cell_len_many(texts: Iterable[str]) -> List[int]:
+    """
+    Get the cell lengths of many strings at once.
+    
+    Strings whose width is not cached yet are shaped together with
+    shape_many(), so measuring every cell of a table costs one batch
+    instead of one shaping call per cell.
+    
+    Args:
+        texts: The strings to measure.
     
-    # Shape the text to get its pixel advance
-    clusters = _cluster_cache.get(text)
-    if clusters is None:
-        clusters = shape_text(text)
-        _cluster_cache[text] = clusters
+    Returns:
+        The width in terminal cells of each string, in input order.
+    """
+    texts = list(texts)
+    model = calibrate.width_model
+    widths: Dict[str, int] = {}
+    missing: Dict[str, CacheKey] = {}
+    for text in texts:
+        if text in widths or text in missing:
+            continue
+        if not text or text.isascii():
+            path = "cell_len.ascii"
+            widths[text] = _original_cached_cell_len(text)
+        else:
+            key = CacheKey(text, width_model=model.key)
+            width = shape_cache.get(key)
+            if width is not None:
+                path = "cell_len.hit"
+                widths[text] = width
+            elif not has_complex_script(text):
+                path = "cell_len.simple"
+                widths[text] = _store_simple_width(key)
+            elif not model.shaped:
+                path = "cell_len.simple"
+                widths[text] = _store_text_width(key, model)
+            else:
+                path = "cell_len.shaped"
+                missing[text] = key
+        if instrument.enabled:
+            instrument.incr(path)
     
-    # Sum the advances of all clusters
-    total_advance = sum(cluster.advance_px for cluster in clusters)
+    if missing:
+        from .shape import shape_many
+        start = perf_counter()
+        for (text, key), shaped in zip(missing.items(), shape_many(missing)):
+            widths[text] = _store_width(key, shaped, model)
+        if instrument.enabled:
+            instrument.observe("cell_len_many.batch", start)
+    return [widths[text] for text in texts]
+
+
+def uncached_texts(texts: Iterable[str]) -> List[str]:
+    """
+    Get the unique strings whose width still has to be measured.
     
-    # Convert to cell count
-    cell_count = px_to_cells(total_advance)
+    Args:
+        texts: Candidate strings.
     
-    # Apply any custom width mappers
-    return registry.get_cell_width(text, cell_count)
+    Returns:
+        Non-ASCII strings without a cached width, in first-seen order.
+    """
+    return [
+        text for text in dict.fromkeys(texts)
+        if text and not text.isascii() and CacheKey(text, width_model=calibrate.width_model.key) not in shape_cache
+    ]
+
+
+def _split_at(text: str, cut: int) -> Tuple[str, str]:
+    """
+    Split non-ASCII text at a cell position, on a cluster boundary.
+    
+    A cluster straddling the cut is replaced by spaces on both sides, as
+    Rich does for a double-width character, so both parts keep their width.
+    """
+    layout = get_layout(text, calibrate.width_model)
+    if cut <= 0:
+        return "", text
+    if cut >= layout.total:
+        return text, ""
+    k = layout.boundary_at(cut)
+    index, used = layout.offsets[k], layout.cells[k]
+    if used == cut:
+        left, right = text[:index], text[index:]
+    else:
+        end, end_cells = layout.offsets[k + 1], layout.cells[k + 1]
+        left, right = text[:index] + " " * (cut - used), " " * (end_cells - cut) + text[end:]
+    return left, right
+
+
+def ctl_set_cell_size(text: str, total: int, *args) -> str:
+    """
+    Crop or pad text to exactly ``total`` cells without splitting a cluster.
+    
+    Args:
+        text: The text to adjust.
+        total: Desired size in cells.
+        *args: Passed on to Rich for ASCII text.
+    
+    Returns:
+        Text whose cell length equals ``total``.
+    """
+    if text.isascii():
+        return _original_set_cell_size(text, total, *args)
+    if total <= 0:
+        return ""
+    layout = get_layout(text, calibrate.width_model)
+    size = layout.total
+    if size == total:
+        return text
+    if size < total:
+        return text + " " * (total - size)
+    index, used = layout.cut(total)
+    return text[:index] + " " * (total - used)
+
+
+def ctl_chop_cells(text: str, width: int, *args) -> List[str]:
+    """
+    Split text into lines of at most ``width`` cells at cluster boundaries.
+    
+    A single cluster wider than ``width`` gets a line of its own.
+    
+    Args:
+        text: The text to fold.
+        width: Available width in cells.
+        *args: Passed on to Rich for ASCII text.
+    
+    Returns:
+        List of lines.
+    """
+    if text.isascii():
+        return _original_chop_cells(text, width, *args)
+    layout = get_layout(text, calibrate.width_model)
+    offsets = layout.offsets
+    lines = []
+    start = 0
+    while start < len(text):
+        end = layout.fit(start, width)
+        if end <= start:
+            # A cluster wider than the line gets a line of its own
+            end = offsets[layout.boundary_of(start) + 1]
+        lines.append(text[start:end])
+        start = end
+    return lines
+
+
+def ctl_split_text(text: str, cell_position: int, *args) -> Tuple[str, str]:
+    """
+    Split text at a cell position without splitting a cluster.
+    
+    Args:
+        text: The text to split.
+        cell_position: Offset in cells.
+        *args: Passed on to Rich for ASCII text.
+    
+    Returns:
+        The text before and after the cut.
+    """
+    if text.isascii():
+        return _original_split_text(text, cell_position, *args)
+    return _split_at(text, cell_position)
+
+
+def ctl_split_cells(self: Segment, cut: int) -> Tuple[Segment, Segment]:
+    """
+    Replacement for Segment.split_cells() that cuts on cluster boundaries.
+    
+    Args:
+        cut: Offset within the segment to cut.
+    
+    Returns:
+        Two segments.
+    """
+    text, style, control = self
+    if text.isascii():
+        return _original_split_cells(self, cut)
+    if cut >= get_layout(text, calibrate.width_model).total:
+        return self, Segment("", style, control)
+    left, right = _split_at(text, cut)
+    return Segment(left, style, control), Segment(right, style, control)
+
+
+def ctl_divide(self: Text, offsets: Iterable[int]):
+    """
+    Replacement for Text.divide() that moves offsets to cluster boundaries.
+    
+    An offset inside a cluster moves back to the start of that cluster.
+    
+    Args:
+        offsets: Offsets used to divide the text.
+    
+    Returns:
+        Lines: New Text instances between offsets.
+    """
+    text = self.plain
+    if text.isascii():
+        return _original_divide(self, offsets)
+    layout = get_layout(text, calibrate.width_model)
+    snapped = []
+    last = 0
+    for offset in offsets:
+        offset = layout.offsets[layout.boundary_of(offset)]
+        if offset > last:
+            snapped.append(offset)
+            last = offset
+    return _original_divide(self, snapped)
+
+
+def _patch_targets() -> List[object]:
+    """Get the loaded Rich and Textual modules that may hold cell functions."""
+    return [module for name, module in list(sys.modules.items())
+            if module is not None and name.split(".")[0] in ("rich", "textual")]
 
 
 def patch_rich() -> None:
     """
     Apply monkey patches to Rich to support complex text layout.
+    
+    The cell functions are replaced in rich.cells and in every loaded Rich
+    or Textual module that imported them by name; Segment.split_cells and
+    Text.divide are replaced on their classes.
     """
-    # Patch the cached_cell_len function at the module level
-    rich.segment.cached_cell_len = ctl_cell_len
+    if _patched:
+        return
+    replacements = {
+        id(_original_cached_cell_len): ctl_cell_len,
+        id(_original_cell_len): ctl_cell_len,
+        id(_original_set_cell_size): ctl_set_cell_size,
+        id(_original_chop_cells): ctl_chop_cells,
+    }
+    if _original_split_text is not None:
+        replacements[id(_original_split_text)] = ctl_split_text
+    
+    for module in _patch_targets():
+        for name, value in list(vars(module).items()):
+            replacement = replacements.get(id(value))
+            if replacement is not None:
+                _patched.append((module, name, value))
+                setattr(module, name, replacement)
+    
+    for owner, name, replacement in ((Segment, "split_cells", ctl_split_cells),
+                                     (Text, "divide", ctl_divide)):
+        _patched.append((owner, name, vars(owner)[name]))
+        setattr(owner, name, replacement)
 
 
 def unpatch_rich() -> None:
     """
     Remove monkey patches from Rich, restoring original behavior.
     """
-    # Restore the original cached_cell_len function
-    rich.segment.cached_cell_len = _original_cached_cell_len
+    while _patched:
+        owner, name, original = _patched.pop()
+        setattr(owner, name, original)
 
 
-def install_rich_ctl(console: Optional[Console] = None, **options) -> None:
+def install_rich_ctl(console: Optional["Console"] = None, **options) -> None:
     """
     Install rich-ctl patches into Rich and/or Textual.
     
     Args:
-        console: Optional Rich console to patch.
-        **options: Additional configuration options.
+        console: Optional Rich console to patch. Wrapping and cropping are
+            patched in Rich itself, so every console breaks lines at
+            cluster boundaries.
+        **options: Additional configuration options:
+            terminal: Terminal profile name (see calibrate.PROFILES);
+                detected from the environment by default.
+            cell_width_px: Width of a terminal cell in pixels at the shaping
+                size; derived from the terminal font by default.
+            terminal_font: Path or name of the terminal's monospace font,
+                used to derive the cell width.
+            cache_size: Maximum number of entries in the shape cache.
+            cache_bytes: Maximum estimated bytes held by the shape cache.
+            cache_policy: Cache eviction policy, "lru" or "tinylfu".
+            persistent_cache: Keep shaped runs on disk across processes.
+                True uses the XDG cache directory; a path selects the
+                database file or directory; False disables it.
+            fallback_fonts: Font names or paths tried after each script's
+                preferred font when it does not cover a character.
     """
     # Apply all Rich patches
     patch_rich()
     
-    # Store the original console.print method if a console is provided
-    if console is not None:
-        # TODO: Override console.print to ensure line-wrapping occurs only at cluster boundaries
-        pass
+    # Configure the shared shape cache
+    configure_cache(maxsize=options.get('cache_size'),
+                    maxbytes=options.get('cache_bytes'),
+                    policy=options.get('cache_policy'))
+    
+    # Enable or disable the on-disk shaping cache
+    persistent = options.get('persistent_cache')
+    if persistent is not None:
+        from .persist import disable_persistent_cache, enable_persistent_cache
+    if persistent is False:
+        disable_persistent_cache()
+    elif persistent is not None:
+        enable_persistent_cache(None if persistent is True else persistent)
+    
+    # Configure the font fallback chains
+    if options.get('fallback_fonts') is not None:
+        from .fallback import set_fallback_fonts
+        set_fallback_fonts(options['fallback_fonts'])
+        # Cached widths were measured with the previous chains
+        shape_cache.clear()
     
-    # Initialize cluster width registry with any custom mappers
-    cell_width_px = options.get('cell_width_px', 8)
+    # Configure how advances are converted to cells
+    width_options = [options.get(name) for name in ('terminal', 'cell_width_px', 'terminal_font')]
+    if any(option is not None for option in width_options):
+        calibrate.set_width_model(calibrate.WidthModel(*width_options))
     
     # If bidi support is enabled, configure it
     if options.get('bidi', False):
@@ -0,0 +1,214 @@
+"""
+Persistent shaping cache for rich-ctl.
+
+This module stores shaped runs in an sqlite database so that short-lived
+processes do not re-shape the same labels on every start. It is opt-in:
+enable it with install_rich_ctl(persistent_cache=True) or the rich-ctl
+``--persistent-cache`` flag.
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+from array import array
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+# Bump when the table layout or the meaning of stored advances changes
+SCHEMA_VERSION = 1
+
+DB_FILENAME = "shaping.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS shaped (
+    font TEXT NOT NULL,
+    hb_version TEXT NOT NULL,
+    script TEXT NOT NULL,
+    direction TEXT NOT NULL,
+    language TEXT NOT NULL,
+    text TEXT NOT NULL,
+    offsets BLOB NOT NULL,
+    advances BLOB NOT NULL,
+    PRIMARY KEY (font, hb_version, script, direction, language, text)
+) WITHOUT ROWID
+"""
+
+
+def default_cache_dir() -> Path:
+    """
+    Get the directory used for persistent caches.
+
+    Returns:
+        $XDG_CACHE_HOME/rich-ctl, or ~/.cache/rich-ctl if the variable is unset
+    """
+    base = os.environ.get("XDG_CACHE_HOME")
+    root = Path(base) if base else Path.home() / ".cache"
+    return root / "rich-ctl"
+
+
+def _to_blob(values: "array[int]") -> bytes:
+    """Serialize an array in little-endian byte order."""
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_blob(typecode: str, data: bytes) -> "array[int]":
+    """Deserialize an array stored by _to_blob()."""
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+class PersistentShapeCache:
+    """
+    Shaped runs stored in an sqlite database.
+
+    Entries are keyed by (font digest, HarfBuzz version, script, direction,
+    language, text), so upgrading HarfBuzz or replacing a font file never
+    returns stale advances. The database runs in WAL mode, which lets any
+    number of processes read while one writes; each thread uses its own
+    connection. A schema version mismatch drops the stored entries.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        if path is None:
+            path = default_cache_dir() / DB_FILENAME
+        import uharfbuzz as hb
+        self.path = Path(path)
+        self.hb_version = hb.version_string()
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self) -> None:
+        conn = self._connect()
+        if conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION:
+            return
+        with conn:
+            # Re-check under the write lock; another process may have migrated
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                conn.execute("DROP TABLE IF EXISTS shaped")
+                conn.execute(_SCHEMA)
+                conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    def get(self, font: str, script: str, direction: str, language: str,
+            text: str) -> Optional[Tuple["array[int]", "array[int]"]]:
+        """
+        Look up the cluster offsets and advances of a shaped run.
+
+        Args:
+            font: Digest of the font file used for shaping.
+            script: ISO 15924 script code.
+            direction: Text direction.
+            language: Language tag.
+            text: The run text.
+
+        Returns:
+            An (offsets, advances) pair as stored by put(), or None if absent.
+        """
+        row = self._connect().execute(
+            "SELECT offsets, advances FROM shaped WHERE font=? AND hb_version=? "
+            "AND script=? AND direction=? AND language=? AND text=?",
+            (font, self.hb_version, script, direction, language, text),
+        ).fetchone()
+        if row is None:
+            return None
+        return _from_blob('I', row[0]), _from_blob('i', row[1])
+
+    def put(self, font: str, script: str, direction: str, language: str, text: str,
+            offsets: "array[int]", advances: "array[int]") -> None:
+        """
+        Store the cluster offsets and advances of a shaped run.
+
+        Args:
+            font: Digest of the font file used for shaping.
+            script: ISO 15924 script code.
+            direction: Text direction.
+            language: Language tag.
+            text: The run text.
+            offsets: Cluster boundary offsets, as in ShapedRun.offsets.
+            advances: Cluster advances, as in ShapedRun.advances.
+        """
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO shaped VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (font, self.hb_version, script, direction, language, text,
+                 _to_blob(offsets), _to_blob(advances)),
+            )
+
+    def clear(self) -> None:
+        """Remove all stored entries."""
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM shaped")
+
+    def close(self) -> None:
+        """Close this thread's database connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+# Active persistent cache, or None when disabled
+_persistent_cache: Optional[PersistentShapeCache] = None
+
+
+def get_persistent_cache() -> Optional[PersistentShapeCache]:
+    """
+    Get the active persistent cache.
+
+    Returns:
+        The PersistentShapeCache in use, or None if persistence is disabled
+    """
+    return _persistent_cache
+
+
+def enable_persistent_cache(path: Optional[Union[str, Path]] = None) -> Optional[PersistentShapeCache]:
+    """
+    Enable the persistent shaping cache.
+
+    Args:
+        path: Database file or directory; defaults to the XDG cache directory
+
+    Returns:
+        The enabled cache, or None if the database could not be opened
+    """
+    global _persistent_cache
+    if path is not None:
+        path = Path(path)
+        if path.is_dir() or not path.suffix:
+            path = path / DB_FILENAME
+    disable_persistent_cache()
+    try:
+        _persistent_cache = PersistentShapeCache(path)
+    except (OSError, sqlite3.Error):
+        # A read-only home or a corrupt file must not break rendering
+        _persistent_cache = None
+    return _persistent_cache
+
+
+def disable_persistent_cache() -> None:
+    """
+    Disable the persistent shaping cache.
+    """
+    global _persistent_cache
+    if _persistent_cache is not None:
+        _persistent_cache.close()
+    _persistent_cache = None
@@ -2,32 +2,42 @@
 Rendering helpers for rich-ctl.
 
 This module provides functions to improve the rendering of complex scripts in terminals.
+
+Rich lays out text with rich-ctl's cluster widths, but a terminal without
+shaping moves its cursor by its own count, usually wcwidth() per code
+point. In the "pad" rendering mode, pad_segments() corrects every cluster
+where the two differ as the segments are written, by moving the cursor
+forward after a cluster the terminal counts narrower and back after one it
+counts wider. The legacy "spacing" mode inserts a hair space after every
+complex-script character instead.
 """
 
-import re
 import unicodedata
-from typing import Dict, List, Optional, Tuple, Set
-
-# Scripts that typically require complex text layout
-COMPLEX_SCRIPTS = {
-    'Deva',  # Devanagari
-    'Telu',  # Telugu
-    'Taml',  # Tamil
-    'Beng',  # Bengali
-    'Gujr',  # Gujarati
-    'Khmr',  # Khmer
-    'Knda',  # Kannada
-    'Laoo',  # Lao
-    'Mlym',  # Malayalam
-    'Mymr',  # Myanmar
-    'Thai',  # Thai
-    'Arab',  # Arabic
-    'Hebr',  # Hebrew
-}
-
-# Zero-width joiner and non-joiner
-ZWJ = '\u200D'
-ZWNJ = '\u200C'
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, Optional, Tuple
+
+from rich.control import Control
+from rich.segment import Segment
+
+from . import calibrate
+from .cache import CacheKey, shape_cache
+from .scripts import COMPLEX_SCRIPTS, UNKNOWN, has_complex_script, script_of, scripts_of
+
+if TYPE_CHECKING:
+    from .calibrate import WidthModel
+
+# Rendering modes: pad clusters to their cell widths, or insert hair spaces (legacy)
+PAD = "pad"
+SPACING = "spacing"
+RENDER_MODES = (PAD, SPACING)
+
+# Profile assumed for terminals that do not shape text
+TERMINAL_PROFILE = "wcwidth-compatible"
+
+# Terminal width model per measuring model, by model key
+_terminal_models: Dict[object, "WidthModel"] = {}
+
+# Cursor moves by cells, by offset
+_moves: Dict[int, Segment] = {}
 
 def get_script(char: str) -> str:
     """
@@ -37,16 +47,11 @@ def get_script(char: str) -> str:
         char: A single character.
         
     Returns:
-        The Unicode script name.
+        The ISO 15924 script code (e.g. 'Telu'), or 'Zzzz' if unknown.
     """
     if not char:
-        return 'Unknown'
-    try:
-        # Get the script for the character
-        script = unicodedata.name(char).split()[0]
-        return script
-    except (ValueError, IndexError):
-        return 'Unknown'
+        return UNKNOWN
+    return script_of(char)
 
 def needs_complex_rendering(text: str) -> bool:
     """
@@ -66,17 +71,15 @@ def needs_complex_rendering(text: str) -> bool:
         return False
     
     # Check for scripts that need complex rendering
-    for char in text:
-        script = get_script(char)
-        if script in COMPLEX_SCRIPTS:
-            return True
-    
-    return False
+    return has_complex_script(text)
 
 def insert_spacing(text: str) -> str:
     """
     Insert spacing between characters to improve rendering of complex scripts.
     
+    This is the legacy SPACING mode; it doubles the length of the text and
+    splits conjuncts, so PAD is the default.
+    
     Args:
         text: The text to process.
         
@@ -89,9 +92,8 @@ def insert_spacing(text: str) -> str:
     # Insert thin spaces between characters for complex scripts
     # This is a simple approach - could be refined based on script-specific rules
     result = []
-    for char in text:
+    for char, script in zip(text, scripts_of(text)):
         result.append(char)
-        script = get_script(char)
         if script in COMPLEX_SCRIPTS:
             # Add a thin space after each complex script character
             # This helps prevent overlapping
@@ -99,12 +101,120 @@ def insert_spacing(text: str) -> str:
     
     return ''.join(result)
 
-def improve_rendering(text: str) -> str:
+def terminal_model(model: Optional["WidthModel"] = None) -> "WidthModel":
+    """
+    Get the width model of the terminal's own cursor movement.
+    
+    Args:
+        model: Model rich-ctl measures with; the current width model if None.
+        
+    Returns:
+        ``model`` itself if it already counts cells as the terminal does
+        (a grapheme or wcwidth profile), otherwise a TERMINAL_PROFILE model.
+    """
+    if model is None:
+        model = calibrate.width_model
+    if not model.shaped:
+        return model
+    terminal = _terminal_models.get(model.key)
+    if terminal is None:
+        terminal = _terminal_models[model.key] = calibrate.WidthModel(
+            TERMINAL_PROFILE, model.cell_width_px, model.font)
+    return terminal
+
+def padding_plan(text: str, model: Optional["WidthModel"] = None,
+                 terminal: Optional["WidthModel"] = None) -> Tuple[Tuple[int, int], ...]:
+    """
+    Find the clusters whose width differs between rich-ctl and the terminal.
+    
+    The plan is computed from the cached cell layout of the text, and is
+    cached itself, so a string is compared once.
+    
+    Args:
+        text: The text to compare.
+        model: Model rich-ctl measures with; the current width model if None.
+        terminal: Model of the terminal; terminal_model(model) if None.
+        
+    Returns:
+        (end, cells) for each such cluster: the index after the cluster,
+        and the cells rich-ctl gives it minus the cells the terminal
+        moves by; empty if they agree everywhere.
+    """
+    if text.isascii():
+        return ()
+    if model is None:
+        model = calibrate.width_model
+    if terminal is None:
+        terminal = terminal_model(model)
+    if terminal is model or terminal.shaped:
+        return ()
+    key = CacheKey(text, width_model=(model.key, terminal.key), kind="padding")
+    plan = shape_cache.get(key)
+    if plan is None:
+        from .layout import get_layout
+        layout = get_layout(text, model)
+        offsets, cells = layout.offsets, layout.cells
+        theirs = terminal.cluster_widths(text, offsets, ())
+        plan = tuple((offsets[i + 1], cells[i + 1] - cells[i] - width)
+                     for i, width in enumerate(theirs) if cells[i + 1] - cells[i] != width)
+        shape_cache.put(key, plan)
+    return plan
+
+def _padding(cells: int) -> Segment:
+    """Get a segment moving the cursor ``cells`` forward, or back if negative."""
+    move = _moves.get(cells)
+    if move is None:
+        move = _moves[cells] = Control.move(cells).segment
+    return move
+
+def pad_segments(segments: Iterable[Segment], model: Optional["WidthModel"] = None,
+                 terminal: Optional["WidthModel"] = None) -> Iterator[Segment]:
+    """
+    Pad rendered segments so the terminal's cursor follows rich-ctl's layout.
+    
+    Padding segments are cursor movement control codes rather than spaces:
+    Rich counts control segments as zero cells, so cropping and padding of
+    lines are unchanged, and leaves them out of output that is not a
+    terminal and of exports. The cells skipped forward are not painted, so
+    they do not take the background color of styled text.
+    
+    Args:
+        segments: Segments rendered by a Console.
+        model: Model rich-ctl measures with; the current width model if None.
+        terminal: Model of the terminal; terminal_model(model) if None.
+        
+    Yields:
+        The segments, split after clusters that need padding, with the padding.
+    """
+    if model is None:
+        model = calibrate.width_model
+    if terminal is None:
+        terminal = terminal_model(model)
+    for segment in segments:
+        text, style, control = segment
+        if control or text.isascii():
+            yield segment
+            continue
+        plan = padding_plan(text, model, terminal)
+        if not plan:
+            yield segment
+            continue
+        start = 0
+        for end, cells in plan:
+            yield Segment(text[start:end], style)
+            yield _padding(cells)
+            start = end
+        if start < len(text):
+            yield Segment(text[start:], style)
+
+def improve_rendering(text: str, mode: str = PAD) -> str:
     """
     Apply various techniques to improve the rendering of complex scripts.
     
     Args:
         text: The text to process.
+        mode: PAD leaves cluster widths to pad_segments() at output time;
+            SPACING inserts hair spaces into the text (legacy).
         
     Returns:
         Text with improved rendering properties.
@@ -116,6 +226,7 @@ def improve_rendering(text: str) -> str:
     text = unicodedata.normalize('NFC', text)
     
     # Insert spacing for better rendering
-    text = insert_spacing(text)
+    if mode == SPACING:
+        text = insert_spacing(text)
     
     return text
@@ -0,0 +1,361 @@
+"""
+Unicode script classification for rich-ctl.
+
+This module maps code points to ISO 15924 script codes using a precomputed
+range table, avoiding per-character ``unicodedata.name()`` lookups.
+"""
+
+import re
+from bisect import bisect_right
+from typing import List, Optional, Tuple
+
+# Scripts that typically require complex text layout
+COMPLEX_SCRIPTS = {
+    'Deva',  # Devanagari
+    'Telu',  # Telugu
+    'Taml',  # Tamil
+    'Beng',  # Bengali
+    'Gujr',  # Gujarati
+    'Khmr',  # Khmer
+    'Knda',  # Kannada
+    'Laoo',  # Lao
+    'Mlym',  # Malayalam
+    'Mymr',  # Myanmar
+    'Thai',  # Thai
+    'Arab',  # Arabic
+    'Hebr',  # Hebrew
+}
+
+# Script codes with special meaning
+COMMON = 'Zyyy'     # Punctuation, digits, symbols shared by all scripts
+INHERITED = 'Zinh'  # Combining marks that take the script of their base
+UNKNOWN = 'Zzzz'    # Unassigned or unclassified code points
+
+# Scripts written right-to-left
+RTL_SCRIPTS = {'Arab', 'Hebr', 'Syrc', 'Thaa', 'Nkoo', 'Samr', 'Mand', 'Adlm'}
+
+# Inclusive (start, end, script) ranges, sorted by start and non-overlapping.
+# Ranges follow the Unicode block layout, refined where a block mixes
+# letters with Common punctuation. Gaps are reported as UNKNOWN.
+_SCRIPT_RANGES: Tuple[Tuple[int, int, str], ...] = (
+    (0x0000, 0x0040, COMMON),
+    (0x0041, 0x005A, 'Latn'),
+    (0x005B, 0x0060, COMMON),
+    (0x0061, 0x007A, 'Latn'),
+    (0x007B, 0x00A9, COMMON),
+    (0x00AA, 0x00AA, 'Latn'),
+    (0x00AB, 0x00B9, COMMON),
+    (0x00BA, 0x00BA, 'Latn'),
+    (0x00BB, 0x00BF, COMMON),
+    (0x00C0, 0x00D6, 'Latn'),
+    (0x00D7, 0x00D7, COMMON),
+    (0x00D8, 0x00F6, 'Latn'),
+    (0x00F7, 0x00F7, COMMON),
+    (0x00F8, 0x02AF, 'Latn'),
+    (0x02B0, 0x02FF, COMMON),
+    (0x0300, 0x036F, INHERITED),
+    (0x0370, 0x03FF, 'Grek'),
+    (0x0400, 0x052F, 'Cyrl'),
+    (0x0530, 0x058F, 'Armn'),
+    (0x0590, 0x05FF, 'Hebr'),
+    (0x0600, 0x060B, 'Arab'),
+    (0x060C, 0x060C, COMMON),
+    (0x060D, 0x061A, 'Arab'),
+    (0x061B, 0x061B, COMMON),
+    (0x061C, 0x061E, 'Arab'),
+    (0x061F, 0x061F, COMMON),
+    (0x0620, 0x063F, 'Arab'),
+    (0x0640, 0x0640, COMMON),
+    (0x0641, 0x064A, 'Arab'),
+    (0x064B, 0x0655, INHERITED),
+    (0x0656, 0x066F, 'Arab'),
+    (0x0670, 0x0670, INHERITED),
+    (0x0671, 0x06FF, 'Arab'),
+    (0x0700, 0x074F, 'Syrc'),
+    (0x0750, 0x077F, 'Arab'),
+    (0x0780, 0x07BF, 'Thaa'),
+    (0x07C0, 0x07FF, 'Nkoo'),
+    (0x0800, 0x083F, 'Samr'),
+    (0x0840, 0x085F, 'Mand'),
+    (0x0860, 0x086F, 'Syrc'),
+    (0x0870, 0x08FF, 'Arab'),
+    (0x0900, 0x0950, 'Deva'),
+    (0x0951, 0x0954, INHERITED),
+    (0x0955, 0x0963, 'Deva'),
+    (0x0964, 0x0965, COMMON),
+    (0x0966, 0x097F, 'Deva'),
+    (0x0980, 0x09FF, 'Beng'),
+    (0x0A00, 0x0A7F, 'Guru'),
+    (0x0A80, 0x0AFF, 'Gujr'),
+    (0x0B00, 0x0B7F, 'Orya'),
+    (0x0B80, 0x0BFF, 'Taml'),
+    (0x0C00, 0x0C7F, 'Telu'),
+    (0x0C80, 0x0CFF, 'Knda'),
+    (0x0D00, 0x0D7F, 'Mlym'),
+    (0x0D80, 0x0DFF, 'Sinh'),
+    (0x0E00, 0x0E3E, 'Thai'),
+    (0x0E3F, 0x0E3F, COMMON),
+    (0x0E40, 0x0E7F, 'Thai'),
+    (0x0E80, 0x0EFF, 'Laoo'),
+    (0x0F00, 0x0FFF, 'Tibt'),
+    (0x1000, 0x109F, 'Mymr'),
+    (0x10A0, 0x10FF, 'Geor'),
+    (0x1100, 0x11FF, 'Hang'),
+    (0x1200, 0x139F, 'Ethi'),
+    (0x13A0, 0x13FF, 'Cher'),
+    (0x1400, 0x167F, 'Cans'),
+    (0x1680, 0x169F, 'Ogam'),
+    (0x16A0, 0x16FF, 'Runr'),
+    (0x1700, 0x171F, 'Tglg'),
+    (0x1780, 0x17FF, 'Khmr'),
+    (0x1800, 0x18AF, 'Mong'),
+    (0x18B0, 0x18FF, 'Cans'),
+    (0x1900, 0x194F, 'Limb'),
+    (0x1950, 0x197F, 'Tale'),
+    (0x1980, 0x19DF, 'Talu'),
+    (0x19E0, 0x19FF, 'Khmr'),
+    (0x1A00, 0x1A1F, 'Bugi'),
+    (0x1A20, 0x1AAF, 'Lana'),
+    (0x1AB0, 0x1AFF, INHERITED),
+    (0x1B00, 0x1B7F, 'Bali'),
+    (0x1B80, 0x1BBF, 'Sund'),
+    (0x1BC0, 0x1BFF, 'Batk'),
+    (0x1C00, 0x1C4F, 'Lepc'),
+    (0x1C50, 0x1C7F, 'Olck'),
+    (0x1C80, 0x1C8F, 'Cyrl'),
+    (0x1C90, 0x1CBF, 'Geor'),
+    (0x1CD0, 0x1CFF, INHERITED),
+    (0x1D00, 0x1DBF, 'Latn'),
+    (0x1DC0, 0x1DFF, INHERITED),
+    (0x1E00, 0x1EFF, 'Latn'),
+    (0x1F00, 0x1FFF, 'Grek'),
+    (0x2000, 0x200B, COMMON),
+    (0x200C, 0x200D, INHERITED),
+    (0x200E, 0x2070, COMMON),
+    (0x2071, 0x2071, 'Latn'),
+    (0x2072, 0x207E, COMMON),
+    (0x207F, 0x207F, 'Latn'),
+    (0x2080, 0x208F, COMMON),
+    (0x2090, 0x209F, 'Latn'),
+    (0x20A0, 0x20CF, COMMON),
+    (0x20D0, 0x20FF, INHERITED),
+    (0x2100, 0x2BFF, COMMON),
+    (0x2C00, 0x2C5F, 'Glag'),
+    (0x2C60, 0x2C7F, 'Latn'),
+    (0x2C80, 0x2CFF, 'Copt'),
+    (0x2D00, 0x2D2F, 'Geor'),
+    (0x2D30, 0x2D7F, 'Tfng'),
+    (0x2D80, 0x2DDF, 'Ethi'),
+    (0x2DE0, 0x2DFF, 'Cyrl'),
+    (0x2E00, 0x2E7F, COMMON),
+    (0x2E80, 0x2FDF, 'Hani'),
+    (0x2FF0, 0x3004, COMMON),
+    (0x3005, 0x3005, 'Hani'),
+    (0x3006, 0x3006, COMMON),
+    (0x3007, 0x3007, 'Hani'),
+    (0x3008, 0x3020, COMMON),
+    (0x3021, 0x3029, 'Hani'),
+    (0x302A, 0x302D, INHERITED),
+    (0x302E, 0x302F, 'Hang'),
+    (0x3030, 0x3037, COMMON),
+    (0x3038, 0x303B, 'Hani'),
+    (0x303C, 0x303F, COMMON),
+    (0x3040, 0x3098, 'Hira'),
+    (0x3099, 0x309A, INHERITED),
+    (0x309B, 0x309C, COMMON),
+    (0x309D, 0x309F, 'Hira'),
+    (0x30A0, 0x30A0, COMMON),
+    (0x30A1, 0x30FA, 'Kana'),
+    (0x30FB, 0x30FC, COMMON),
+    (0x30FD, 0x30FF, 'Kana'),
+    (0x3100, 0x312F, 'Bopo'),
+    (0x3130, 0x318F, 'Hang'),
+    (0x3190, 0x319F, COMMON),
+    (0x31A0, 0x31BF, 'Bopo'),
+    (0x31C0, 0x31EF, COMMON),
+    (0x31F0, 0x31FF, 'Kana'),
+    (0x3200, 0x33FF, COMMON),
+    (0x3400, 0x4DBF, 'Hani'),
+    (0x4DC0, 0x4DFF, COMMON),
+    (0x4E00, 0x9FFF, 'Hani'),
+    (0xA000, 0xA4CF, 'Yiii'),
+    (0xA4D0, 0xA4FF, 'Lisu'),
+    (0xA500, 0xA63F, 'Vaii'),
+    (0xA640, 0xA69F, 'Cyrl'),
+    (0xA6A0, 0xA6FF, 'Bamu'),
+    (0xA700, 0xA721, COMMON),
+    (0xA722, 0xA7FF, 'Latn'),
+    (0xA800, 0xA82F, 'Sylo'),
+    (0xA830, 0xA83F, COMMON),
+    (0xA840, 0xA87F, 'Phag'),
+    (0xA880, 0xA8DF, 'Saur'),
+    (0xA8E0, 0xA8FF, 'Deva'),
+    (0xA900, 0xA92F, 'Kali'),
+    (0xA930, 0xA95F, 'Rjng'),
+    (0xA960, 0xA97F, 'Hang'),
+    (0xA980, 0xA9DF, 'Java'),
+    (0xA9E0, 0xA9FF, 'Mymr'),
+    (0xAA00, 0xAA5F, 'Cham'),
+    (0xAA60, 0xAA7F, 'Mymr'),
+    (0xAA80, 0xAADF, 'Tavt'),
+    (0xAAE0, 0xAAFF, 'Mtei'),
+    (0xAB00, 0xAB2F, 'Ethi'),
+    (0xAB30, 0xAB6F, 'Latn'),
+    (0xAB70, 0xABBF, 'Cher'),
+    (0xABC0, 0xABFF, 'Mtei'),
+    (0xAC00, 0xD7FF, 'Hang'),
+    (0xF900, 0xFAFF, 'Hani'),
+    (0xFB00, 0xFB06, 'Latn'),
+    (0xFB13, 0xFB17, 'Armn'),
+    (0xFB1D, 0xFB4F, 'Hebr'),
+    (0xFB50, 0xFD3D, 'Arab'),
+    (0xFD3E, 0xFD3F, COMMON),
+    (0xFD40, 0xFDFF, 'Arab'),
+    (0xFE00, 0xFE0F, INHERITED),
+    (0xFE10, 0xFE1F, COMMON),
+    (0xFE20, 0xFE2F, INHERITED),
+    (0xFE30, 0xFE6F, COMMON),
+    (0xFE70, 0xFEFE, 'Arab'),
+    (0xFEFF, 0xFF20, COMMON),
+    (0xFF21, 0xFF3A, 'Latn'),
+    (0xFF3B, 0xFF40, COMMON),
+    (0xFF41, 0xFF5A, 'Latn'),
+    (0xFF5B, 0xFF65, COMMON),
+    (0xFF66, 0xFF6F, 'Kana'),
+    (0xFF70, 0xFF70, COMMON),
+    (0xFF71, 0xFF9D, 'Kana'),
+    (0xFF9E, 0xFF9F, COMMON),
+    (0xFFA0, 0xFFDF, 'Hang'),
+    (0xFFE0, 0xFFFF, COMMON),
+    (0x10000, 0x100FF, 'Linb'),
+    (0x10300, 0x1032F, 'Ital'),
+    (0x10330, 0x1034F, 'Goth'),
+    (0x10400, 0x1044F, 'Dsrt'),
+    (0x11000, 0x1107F, 'Brah'),
+    (0x16FE0, 0x16FFF, COMMON),
+    (0x1B000, 0x1B0FF, 'Kana'),
+    (0x1D000, 0x1D166, COMMON),
+    (0x1D167, 0x1D169, INHERITED),
+    (0x1D16A, 0x1D7FF, COMMON),
+    (0x1E900, 0x1E95F, 'Adlm'),
+    (0x1EE00, 0x1EEFF, 'Arab'),
+    (0x1F000, 0x1FAFF, COMMON),
+    (0x1FB00, 0x1FBFF, COMMON),
+    (0x20000, 0x3FFFF, 'Hani'),
+    (0xE0001, 0xE007F, COMMON),
+    (0xE0100, 0xE01EF, INHERITED),
+)
+
+
+def _build_table() -> Tuple[List[int], List[str]]:
+    """Flatten the range table into bisectable start points with gap filling."""
+    starts: List[int] = []
+    scripts: List[str] = []
+    next_cp = 0
+    for start, end, script in _SCRIPT_RANGES:
+        if start > next_cp:
+            starts.append(next_cp)
+            scripts.append(UNKNOWN)
+        starts.append(start)
+        scripts.append(script)
+        next_cp = end + 1
+    starts.append(next_cp)
+    scripts.append(UNKNOWN)
+    return starts, scripts
+
+
+_RANGE_STARTS, _RANGE_SCRIPTS = _build_table()
+
+# Distinct script codes, indexed by a small integer for the BMP lookup table
+_SCRIPT_NAMES: List[str] = sorted(set(_RANGE_SCRIPTS))
+_SCRIPT_INDEX = {name: i for i, name in enumerate(_SCRIPT_NAMES)}
+
+
+def _build_bmp_table() -> bytes:
+    """Build a 64K-entry table mapping each BMP code point to a script index."""
+    table = bytearray(0x10000)
+    for i, start in enumerate(_RANGE_STARTS):
+        if start > 0xFFFF:
+            break
+        end = _RANGE_STARTS[i + 1] if i + 1 < len(_RANGE_STARTS) else 0x10000
+        end = min(end, 0x10000)
+        table[start:end] = bytes((_SCRIPT_INDEX[_RANGE_SCRIPTS[i]],)) * (end - start)
+    return bytes(table)
+
+
+# One byte per BMP code point, so classification is a single index operation
+_BMP_TABLE = _build_bmp_table()
+
+
+def _build_complex_pattern() -> 're.Pattern[str]':
+    """Compile a character class matching every code point of a complex script."""
+    parts = []
+    for start, end, script in _SCRIPT_RANGES:
+        if script in COMPLEX_SCRIPTS:
+            parts.append(f"\\U{start:08x}-\\U{end:08x}")
+    return re.compile(f"[{''.join(parts)}]")
+
+
+_COMPLEX_RE = _build_complex_pattern()
+
+
+def script_of(char: str) -> str:
+    """
+    Get the ISO 15924 script code for a single character.
+
+    Args:
+        char: A single character.
+
+    Returns:
+        A four-letter script code such as 'Latn', 'Deva' or 'Telu'.
+    """
+    cp = ord(char)
+    if cp <= 0xFFFF:
+        return _SCRIPT_NAMES[_BMP_TABLE[cp]]
+    return _RANGE_SCRIPTS[bisect_right(_RANGE_STARTS, cp) - 1]
+
+
+def scripts_of(text: str) -> List[str]:
+    """
+    Get the ISO 15924 script code of every character in a string.
+
+    BMP characters are classified with one table index each; only
+    supplementary-plane characters fall back to a bisect lookup.
+
+    Args:
+        text: The text to classify.
+
+    Returns:
+        A list with one script code per character of ``text``.
+    """
+    names = _SCRIPT_NAMES
+    table = _BMP_TABLE
+    if not text or max(text) <= '\uffff':
+        return [names[table[ord(c)]] for c in text]
+    return [script_of(c) for c in text]
+
+
+def has_complex_script(text: str) -> bool:
+    """
+    Check whether text contains any character from a complex script.
+
+    Args:
+        text: The text to check.
+
+    Returns:
+        True if any character belongs to a script in COMPLEX_SCRIPTS.
+    """
+    return _COMPLEX_RE.search(text) is not None
+
+
+def is_rtl_script(script: Optional[str]) -> bool:
+    """
+    Check whether a script is written right-to-left.
+
+    Args:
+        script: An ISO 15924 script code (case-insensitive).
+
+    Returns:
+        True for right-to-left scripts such as Arabic and Hebrew.
+    """
+    return bool(script) and script.title() in RTL_SCRIPTS
@@ -4,21 +4,31 @@ Text shaping module for rich-ctl.
 This module uses HarfBuzz to shape Unicode text into glyph clusters with proper metrics.
 """
 
+import sqlite3
+import sys
+import threading
 import unicodedata
-from typing import List, Tuple, Dict, Optional
+from array import array
+from time import perf_counter
+from typing import Iterable, Iterator, List, Tuple, Dict, Optional, Sequence
 
 import uharfbuzz as hb
 
-# LRU cache for shaped clusters to improve performance
-from functools import lru_cache
+# Shared bounded cache for shaped runs
+from . import instrument
+from .cache import CacheKey, shape_cache
 
 # Import font utilities
-from .fonts import get_font
+from .fonts import get_font, font_digest, resolve_font_face
+from .persist import PersistentShapeCache, get_persistent_cache
+from .itemize import itemize
 
 
 class Cluster:
     """A text cluster with its advance width in pixels."""
     
+    __slots__ = ("text", "advance_px")
+    
     def __init__(self, text: str, advance_px: int):
         self.text = text
         self.advance_px = advance_px
@@ -27,85 +37,413 @@ class Cluster:
         return f"Cluster(text='{self.text}', advance_px={self.advance_px})"
 
 
-@lru_cache(maxsize=1024)
-def shape_text(text: str, direction: str = "ltr", script: Optional[str] = None,
+class ShapedRun:
+    """Compact shaping result for a string.
+    
+    Cluster boundaries and advances are kept in parallel arrays instead of
+    one Cluster object per cluster. ``offsets`` holds len(self) + 1 character
+    offsets, so cluster ``i`` is ``text[offsets[i]:offsets[i + 1]]``.
+    Iterating yields Cluster objects created on demand. ``layouts`` keeps
+    the cell layouts computed from the run, so a cached run is converted to
+    cells once per width model.
+    """
+    
+    __slots__ = ("text", "offsets", "advances", "total_advance", "layouts")
+    
+    def __init__(self, text: str, offsets: "array[int]", advances: "array[int]"):
+        self.text = text
+        self.offsets = offsets
+        self.advances = advances
+        self.total_advance = sum(advances)
+        self.layouts: Optional[Dict] = None
+    
+    @classmethod
+    def from_clusters(cls, clusters: Sequence[Cluster]) -> "ShapedRun":
+        """Build a compact run from a sequence of Cluster objects.
+        
+        Args:
+            clusters: Clusters in logical order.
+        
+        Returns:
+            A ShapedRun over the concatenated cluster text.
+        """
+        offsets = array('I', [0])
+        advances = array('i')
+        position = 0
+        for cluster in clusters:
+            position += len(cluster.text)
+            offsets.append(position)
+            advances.append(cluster.advance_px)
+        return cls(''.join(cluster.text for cluster in clusters), offsets, advances)
+    
+    @classmethod
+    def concat(cls, text: str, runs: Sequence["ShapedRun"]) -> "ShapedRun":
+        """Join runs that together cover ``text`` in logical order.
+        
+        Args:
+            text: The full text covered by the runs.
+            runs: Shaped runs of consecutive slices of ``text``.
+        
+        Returns:
+            A single ShapedRun over ``text``.
+        """
+        if len(runs) == 1:
+            return runs[0]
+        offsets = array('I', [0])
+        advances = array('i')
+        base = 0
+        for run in runs:
+            offsets.extend(base + offset for offset in run.offsets[1:])
+            advances.extend(run.advances)
+            base += len(run.text)
+        return cls(text, offsets, advances)
+    
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the run, used for cache accounting.
+        
+        Includes room for the cell offsets of one layout, which has as
+        many entries as ``offsets``.
+        """
+        return (sys.getsizeof(self.text) + 2 * sys.getsizeof(self.offsets)
+                + sys.getsizeof(self.advances) + 64)
+    
+    def __len__(self) -> int:
+        return len(self.advances)
+    
+    def __getitem__(self, index: int) -> Cluster:
+        if index < 0:
+            index += len(self.advances)
+        if not 0 <= index < len(self.advances):
+            raise IndexError("ShapedRun index out of range")
+        offsets = self.offsets
+        return Cluster(self.text[offsets[index]:offsets[index + 1]], self.advances[index])
+    
+    def __iter__(self) -> Iterator[Cluster]:
+        text = self.text
+        offsets = self.offsets
+        for i, advance in enumerate(self.advances):
+            yield Cluster(text[offsets[i]:offsets[i + 1]], advance)
+    
+    def __repr__(self) -> str:
+        return (f"ShapedRun(text='{self.text}', clusters={len(self)}, "
+                f"total_advance={self.total_advance})")
+
+
+_EMPTY_RUN = ShapedRun("", array('I', [0]), array('i'))
+
+# Per-thread state; holds one reusable hb.Buffer per thread
+_local = threading.local()
+
+
+def shape_text(text: str, direction: Optional[str] = None, script: Optional[str] = None,
              language: str = "en") -> List[Cluster]:
     """Shape unicode text into glyph clusters with proper metrics.
     
     Args:
         text: The Unicode text to shape.
-        direction: Text direction ('ltr' or 'rtl').
+        direction: Text direction ('ltr' or 'rtl'). Derived per run if None.
         script: Optional script tag (e.g., 'arab', 'deva', 'telu'). Auto-detected if None.
         language: Language tag (e.g., 'en', 'ar', 'hi').
     
     Returns:
         List of Cluster objects containing the shaped text with advance widths.
     """
+    return list(shape_text_compact(text, direction, script, language))
+
+
+def shape_text_compact(text: str, direction: Optional[str] = None,
+                       script: Optional[str] = None, language: str = "en") -> ShapedRun:
+    """Shape unicode text into a compact ShapedRun.
+    
+    Takes the same arguments as shape_text(), but returns the clusters as
+    parallel arrays with the total advance precomputed.
+    
+    Args:
+        text: The Unicode text to shape.
+        direction: Text direction ('ltr' or 'rtl'). Derived per run if None.
+        script: Optional script tag (e.g., 'arab', 'deva', 'telu'). Auto-detected if None.
+        language: Language tag (e.g., 'en', 'ar', 'hi').
+    
+    Returns:
+        A ShapedRun covering the NFC-normalized text.
+    """
+    return _shape_text(text, direction, script, language, None, None)
+
+
+def shape_many(texts: Iterable[str], direction: Optional[str] = None,
+               script: Optional[str] = None, language: str = "en") -> List[ShapedRun]:
+    """Shape many strings with one HarfBuzz buffer.
+    
+    Intended for tables and logs that measure many short cells at once.
+    Identical inputs are shaped once, fonts are resolved once per batch and
+    a single buffer is cleared and reused between runs. Results also land in
+    the shared shape cache, so this can pre-warm later shape_text() calls.
+    
+    Args:
+        texts: The strings to shape.
+        direction: Text direction ('ltr' or 'rtl'). Derived per run if None.
+        script: Optional script tag. Auto-detected if None.
+        language: Language tag.
+    
+    Returns:
+        One ShapedRun per input string, in input order.
+    """
+    buf = hb.Buffer()
+    fonts: Dict[Optional[str], "hb.Font"] = {}
+    shaped: Dict[str, ShapedRun] = {}
+    results = []
+    for text in texts:
+        result = shaped.get(text)
+        if result is None:
+            result = shaped[text] = _shape_text(text, direction, script, language, buf, fonts)
+        results.append(result)
+    return results
+
+
+def _shape_text(text: str, direction: Optional[str], script: Optional[str], language: str,
+                buf: Optional["hb.Buffer"], fonts: Optional[Dict],
+                normalize: bool = True) -> ShapedRun:
+    """Itemize and shape one string; see shape_text_compact().
+    
+    With ``normalize=False`` the cluster offsets index the text as given,
+    which callers cutting the original string rely on.
+    """
     # Normalize text to NFC form (normalize combining marks)
-    text = unicodedata.normalize('NFC', text)
+    if normalize:
+        text = unicodedata.normalize('NFC', text)
     
     if not text:
-        return []
+        return _EMPTY_RUN
     
-    # TODO: Script detection if script is None
-    if script is None:
-        script = "latn"  # Default to Latin script
+    # An explicit script still splits the text where the font changes
+    runs = itemize(text, script)
     
-    # Create HarfBuzz buffer
-    buf = hb.Buffer()
+    # Shape each run separately and join them in logical order
+    shaped = [_shape_run(text[run.start:run.end], direction or run.direction,
+                         run.script, language, run.font, buf, fonts)
+              for run in runs]
+    if len(shaped) == 1:
+        return shaped[0]
+    return ShapedRun.concat(text, shaped)
+
+
+def _shape_run(text: str, direction: str, script: str, language: str,
+               font_path: Optional[str], buf: Optional["hb.Buffer"] = None,
+               fonts: Optional[Dict] = None) -> ShapedRun:
+    """Shape a single run of uniform script, direction and font.
+    
+    Runs are cached in the shared shape cache on their own text, so an
+    unchanged run inside an otherwise different line is not shaped again.
+    
+    Args:
+        text: The run text, already NFC-normalized.
+        direction: Text direction ('ltr' or 'rtl').
+        script: ISO 15924 script code of the run.
+        language: Language tag.
+        font_path: Font file chosen by the itemizer, or None for the default font.
+        buf: Buffer to reuse; the calling thread's buffer is used if None.
+        fonts: Per-batch font lookup memo, filled in by this function.
+    
+    Returns:
+        A ShapedRun for the run.
+    """
+    key = CacheKey(text, script, direction, language, font_path)
+    cached = shape_cache.get(key)
+    if instrument.enabled:
+        instrument.incr("shape.run_hit" if cached is not None else "shape.run_miss")
+    if cached is not None:
+        return cached
+    
+    # Try the on-disk cache before shaping
+    persistent = get_persistent_cache()
+    digest = None
+    if persistent is not None:
+        digest = _persistent_font_key(font_path)
+        stored = _persistent_get(persistent, digest, script, direction, language, text)
+        if instrument.enabled:
+            instrument.incr("shape.persistent_hit" if stored is not None else "shape.persistent_miss")
+        if stored is not None:
+            result = ShapedRun(text, *stored)
+            shape_cache.put(key, result)
+            return result
+    
+    # Reuse this thread's HarfBuzz buffer unless the caller passed one
+    if buf is None:
+        buf = _thread_buffer()
+    buf.clear_contents()
     buf.direction = direction
     buf.script = script
     buf.language = language
     buf.add_str(text)
     
     # Load a font using the font utilities
-    # Try to find a suitable font for the given script
-    try:
-        # Try to find a script-specific font
-        if script == "arab":
-            font = get_font(font_name="NotoSansArabic") 
-        elif script == "deva":
-            font = get_font(font_name="NotoSansDevanagari")
-        elif script == "telu":
-            font = get_font(font_name="NotoSansTelugu")
-        else:
-            # Use a default font with Unicode coverage
+    font = fonts.get(font_path) if fonts is not None else None
+    if font is None:
+        try:
+            font = get_font(font_path=font_path) if font_path else get_font()
+        except ValueError:
+            # Fall back to default font if no suitable font is found
             font = get_font()
+        if fonts is not None:
+            fonts[font_path] = font
+    
+    # Shape the text
+    start = perf_counter()
+    hb.shape(font, buf)
+    
+    result = _clusters_from_buffer(text, buf, direction == "rtl")
+    if instrument.enabled:
+        instrument.observe("shape.harfbuzz", start)
+    shape_cache.put(key, result)
+    if persistent is not None and digest is not None:
+        _persistent_put(persistent, digest, script, direction, language, result)
+    return result
+
+
+def _thread_buffer() -> "hb.Buffer":
+    """Get the calling thread's HarfBuzz buffer; buffers must not be shared."""
+    buf = getattr(_local, "buffer", None)
+    if buf is None:
+        buf = _local.buffer = hb.Buffer()
+    return buf
+
+
+# Glyph flag marking a cluster start where the text cannot be shaped in two pieces
+UNSAFE_TO_BREAK = int(hb.GlyphFlags.UNSAFE_TO_BREAK)
+
+
+def shape_item_tail(text: str, start: int, direction: str, script: str, language: str,
+                    font_path: Optional[str]) -> Tuple[ShapedRun, bytes]:
+    """Shape the tail of an itemized run, keeping HarfBuzz's glyph flags.
+    
+    ``text[:start]`` is passed as pre-context, so the tail is shaped as it
+    would be inside the whole run. The glyph flags of each cluster tell
+    where the result can be reused after the text changes: a cluster
+    without UNSAFE_TO_BREAK starts at a point where the text before it and
+    the text from it shape the same apart as together. Results bypass the
+    shape cache.
+    
+    Args:
+        text: The text of one itemized run.
+        start: Offset where shaping starts.
+        direction: Text direction ('ltr' or 'rtl').
+        script: ISO 15924 script code of the run.
+        language: Language tag.
+        font_path: Font file chosen by the itemizer, or None for the default font.
+    
+    Returns:
+        (run, flags): a ShapedRun over ``text[start:]``, and the glyph
+        flags of each of its clusters, OR-ed over the cluster's glyphs.
+    """
+    tail = text[start:]
+    if not tail:
+        return _EMPTY_RUN, b""
+    buf = getattr(_local, "flagged_buffer", None)
+    if buf is None:
+        buf = _local.flagged_buffer = hb.Buffer()
+    buf.clear_contents()
+    buf.direction = direction
+    buf.script = script
+    buf.language = language
+    buf.add_str(text, start, len(tail))
+    try:
+        font = get_font(font_path=font_path) if font_path else get_font()
     except ValueError:
-        # Fall back to default font if no suitable font is found
         font = get_font()
     
-    # Shape the text
+    begin = perf_counter()
     hb.shape(font, buf)
     
-    # Extract glyph information
+    flags = bytearray()
+    run = _clusters_from_buffer(tail, buf, direction == "rtl", start, flags)
+    if instrument.enabled:
+        instrument.observe("shape.harfbuzz", begin)
+    return run, bytes(flags)
+
+
+def _persistent_font_key(font_path: Optional[str]) -> Optional[str]:
+    """Get the digest of the font face a run would be shaped with."""
+    face = resolve_font_face(font_path=font_path)
+    if face is None:
+        return None
+    path, index = face
+    try:
+        digest = font_digest(path)
+    except OSError:
+        return None
+    # Faces of one collection share the file
+    return f"{digest}#{index}" if index else digest
+
+
+def _persistent_get(persistent: "PersistentShapeCache", digest: Optional[str], script: str,
+                    direction: str, language: str, text: str) -> Optional[tuple]:
+    """Read from the on-disk cache, treating database errors as misses."""
+    if digest is None:
+        return None
+    try:
+        return persistent.get(digest, script, direction, language, text)
+    except sqlite3.Error:
+        return None
+
+
+def _persistent_put(persistent: "PersistentShapeCache", digest: str, script: str,
+                    direction: str, language: str, run: ShapedRun) -> None:
+    """Write to the on-disk cache, ignoring database errors (e.g. a locked file)."""
+    try:
+        persistent.put(digest, script, direction, language, run.text,
+                       run.offsets, run.advances)
+    except sqlite3.Error:
+        pass
+
+
+def _clusters_from_buffer(text: str, buf: "hb.Buffer", rtl: bool, start: int = 0,
+                          flags: Optional[bytearray] = None) -> ShapedRun:
+    """Map shaped glyphs back to character clusters in one linear pass.
+    
+    HarfBuzz reports glyphs in visual order with the character offset of
+    their cluster; RTL buffers are walked backwards so clusters come out in
+    logical order. Each cluster spans from its start offset to the start of
+    the next cluster, so characters that produced no glyph of their own
+    (e.g. a virama merged into a conjunct) stay with the preceding cluster.
+    
+    Args:
+        text: The text that was shaped, without any pre-context.
+        buf: A shaped HarfBuzz buffer.
+        rtl: Whether the buffer was shaped right-to-left.
+        start: Offset of ``text`` in the string added to the buffer, after
+            its pre-context.
+        flags: If given, the glyph flags of each cluster, OR-ed over its
+            glyphs, are appended to it.
+    
+    Returns:
+        A ShapedRun over ``text``.
+    """
     infos = buf.glyph_infos
     positions = buf.glyph_positions
+    order = range(len(infos) - 1, -1, -1) if rtl else range(len(infos))
     
-    # Map glyph runs back to original character clusters
-    clusters = []
-    current_cluster = ""
-    current_advance = 0
-    
-    # This is a simplified implementation
-    # A real implementation would need to handle cluster mapping properly
-    for i, info in enumerate(infos):
-        cluster_idx = info.cluster
-        char = text[cluster_idx] if cluster_idx < len(text) else ''
-        
-        if char and i > 0 and infos[i-1].cluster != cluster_idx:
-            # New cluster
-            if current_cluster:
-                clusters.append(Cluster(current_cluster, current_advance))
-            current_cluster = char
-            current_advance = positions[i].x_advance
+    offsets = array('I')
+    advances = array('i')
+    last = -1
+    for i in order:
+        info = infos[i]
+        cluster = info.cluster - start
+        if cluster > last:
+            offsets.append(cluster)
+            advances.append(positions[i].x_advance)
+            if flags is not None:
+                flags.append(int(info.flags) & 0xFF)
+            last = cluster
         else:
-            # Continue current cluster
-            current_cluster += char if char else ''
-            current_advance += positions[i].x_advance
-    
-    # Add the last cluster
-    if current_cluster:
-        clusters.append(Cluster(current_cluster, current_advance))
+            # Another glyph of the current cluster (or an out-of-order one)
+            advances[-1] += positions[i].x_advance
+            if flags is not None:
+                flags[-1] |= int(info.flags) & 0xFF
     
-    return clusters
\ No newline at end of file
+    if not offsets:
+        return _EMPTY_RUN
+    # Leading characters without glyphs belong to the first cluster
+    offsets[0] = 0
+    offsets.append(len(text))
+    return ShapedRun(text, offsets, advances)
@@ -0,0 +1,192 @@
+"""
+Streaming output for rich-ctl.
+
+This module wraps text read incrementally from files or pipes with the CTL
+width engine and writes it in large chunks, so inputs of any size can be
+piped through ``rich-ctl cat`` in bounded memory. Only one chunk of input,
+one line and one output buffer are held at a time; lines longer than the
+line limit are passed on in pieces.
+"""
+
+from typing import Callable, Iterator, List, TextIO
+
+from . import calibrate, patch
+from .layout import get_layout
+
+# Characters read from the input at a time in chunked mode
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+# Characters collected before the output is written
+DEFAULT_BUFFER_SIZE = 1 << 20
+
+# Longest line held in memory; longer lines are split at this length
+DEFAULT_MAX_LINE = 1 << 20
+
+# Prefixes of the two renderings in compare mode
+CTL_PREFIX = "ctl  │ "
+RICH_PREFIX = "rich │ "
+
+# Given a line, returns a function mapping (start, width) to the end of the part that fits
+FitFunc = Callable[[str], Callable[[int, int], int]]
+
+
+def read_lines(stream: TextIO, line_buffered: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE,
+               max_line: int = DEFAULT_MAX_LINE) -> Iterator[str]:
+    """
+    Read lines from a text stream, without their line endings.
+
+    Args:
+        stream: The input stream.
+        line_buffered: Read one line at a time, so each line is available
+            as soon as it is written (for example from ``tail -f``).
+        chunk_size: Characters per read in chunked mode.
+        max_line: Lines longer than this are yielded in pieces of this length.
+
+    Yields:
+        Lines of the input.
+    """
+    if line_buffered:
+        while True:
+            line = stream.readline(max_line)
+            if not line:
+                return
+            yield line[:-1] if line.endswith("\n") else line
+    partial = ""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (partial + chunk).split("\n")
+        partial = lines.pop()
+        yield from lines
+        while len(partial) >= max_line:
+            yield partial[:max_line]
+            partial = partial[max_line:]
+    if partial:
+        yield partial
+
+
+def ctl_fit(text: str) -> Callable[[int, int], int]:
+    """
+    Get a function finding where a line ends, measured with the CTL engine.
+
+    Args:
+        text: The text being wrapped.
+
+    Returns:
+        A function of (start, width) returning the end index of the part
+        that fits; the end is on a cluster boundary, and at least one
+        cluster is taken even if it is wider than ``width``.
+    """
+    if text.isascii():
+        length = len(text)
+        return lambda start, width: min(length, start + max(width, 1))
+    layout = get_layout(text, calibrate.width_model)
+
+    def fit(start: int, width: int) -> int:
+        end = layout.fit(start, width)
+        if end <= start:
+            end = layout.offsets[min(layout.boundary_of(start) + 1, len(layout))]
+        return end
+    return fit
+
+
+def rich_fit(text: str) -> Callable[[int, int], int]:
+    """Get a function finding where a line ends as Rich would measure it without rich-ctl."""
+    cell_len = patch._original_cell_len
+
+    def fit(start: int, width: int) -> int:
+        used = 0
+        end = start
+        for char in text[start:]:
+            used += cell_len(char)
+            if used > width and end > start:
+                break
+            end += 1
+        return end
+    return fit
+
+
+def wrap(text: str, width: int, fit: FitFunc = ctl_fit, words: bool = True) -> List[str]:
+    """
+    Wrap a line of text to a width.
+
+    Args:
+        text: A line without line endings.
+        width: Width in cells.
+        fit: Function returning the line-end finder for ``text``.
+        words: Break after the last space that fits rather than anywhere.
+
+    Returns:
+        The wrapped lines; trailing spaces at breaks are dropped.
+    """
+    fit_from = fit(text)
+    lines = []
+    start = 0
+    length = len(text)
+    while start < length:
+        end = fit_from(start, width)
+        if end >= length:
+            lines.append(text[start:])
+            break
+        if words:
+            space = text.rfind(" ", start, end + 1)
+            if space > start:
+                end = space
+        lines.append(text[start:end].rstrip(" "))
+        start = end
+        while start < length and text[start] == " ":
+            start += 1
+    return lines or [""]
+
+
+def stream(inputs: List[TextIO], out: TextIO, width: int, wrap_lines: bool = True,
+           compare: bool = False, line_buffered: bool = False,
+           chunk_size: int = DEFAULT_CHUNK_SIZE, buffer_size: int = DEFAULT_BUFFER_SIZE) -> int:
+    """
+    Copy text from inputs to an output, wrapping it with the CTL engine.
+
+    Args:
+        inputs: Input streams, read one after another.
+        out: Output stream.
+        width: Output width in cells.
+        wrap_lines: Wrap lines longer than ``width``; otherwise lines are copied as they are.
+        compare: Write each line as rich-ctl wraps it and then as plain Rich would.
+        line_buffered: Read and flush line by line instead of in chunks.
+        chunk_size: Characters per read in chunked mode.
+        buffer_size: Characters collected before each write.
+
+    Returns:
+        The number of input lines.
+    """
+    if compare:
+        width = max(1, width - len(CTL_PREFIX))
+    pending: List[str] = []
+    size = 0
+    count = 0
+    for stream_in in inputs:
+        for line in read_lines(stream_in, line_buffered, chunk_size):
+            count += 1
+            line = line.expandtabs()
+            if not wrap_lines:
+                pieces = [line]
+            else:
+                pieces = wrap(line, width)
+            if compare:
+                pieces = [CTL_PREFIX + piece for piece in pieces]
+                base = wrap(line, width, rich_fit) if wrap_lines else [line]
+                pieces.extend(RICH_PREFIX + piece for piece in base)
+            for piece in pieces:
+                pending.append(piece)
+                pending.append("\n")
+                size += len(piece) + 1
+            if line_buffered or size >= buffer_size:
+                out.write("".join(pending))
+                pending.clear()
+                size = 0
+                if line_buffered:
+                    out.flush()
+    if pending:
+        out.write("".join(pending))
+    out.flush()
+    return count
@@ -0,0 +1,16 @@
+"""
+Tests for rich-ctl.
+
+The font index and the persistent cache are written under the XDG cache
+directory; tests point it at a temporary directory, so they never touch
+the user's cache. Subprocesses started by the tests inherit it.
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+
+_cache_home = tempfile.mkdtemp(prefix="rich-ctl-tests-")
+os.environ["XDG_CACHE_HOME"] = _cache_home
+atexit.register(shutil.rmtree, _cache_home, ignore_errors=True)
@@ -0,0 +1,108 @@
+"""
+Tests for the aio module.
+"""
+
+import asyncio
+import io
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from rich.table import Table
+
+from rich_ctl import CTLConsole
+from rich_ctl.aio import collect_renderables, prerender, prewarm, texts_to_warm
+from rich_ctl.cache import cache_info, clear_cache
+from rich_ctl.calibrate import WidthModel, set_width_model
+from rich_ctl.patch import ctl_cell_len, unpatch_rich
+
+TEXTS = [f"తెలుగు {i}" for i in range(40)]
+
+
+class TestPrewarm(unittest.TestCase):
+    """Test cases for off-loop shaping."""
+    
+    def setUp(self):
+        clear_cache()
+    
+    def test_prewarm_fills_cache(self):
+        """Test that measurements after prewarm() are cache hits."""
+        count = asyncio.run(prewarm(TEXTS + TEXTS, batch_size=8, max_pending=2))
+        self.assertEqual(count, len(TEXTS))
+        hits = cache_info().hits
+        for text in TEXTS:
+            ctl_cell_len(text)
+        self.assertEqual(cache_info().hits, hits + len(TEXTS))
+    
+    def test_backpressure(self):
+        """Test that no more than max_pending batches run at once."""
+        running = []
+        peak = []
+        lock = threading.Lock()
+        
+        class CountingExecutor(ThreadPoolExecutor):
+            def submit(self, fn, *args):
+                def wrapped():
+                    with lock:
+                        running.append(1)
+                        peak.append(len(running))
+                    try:
+                        return fn(*args)
+                    finally:
+                        with lock:
+                            running.pop()
+                return super().submit(wrapped)
+        
+        with CountingExecutor(max_workers=8) as executor:
+            asyncio.run(prewarm(TEXTS, executor=executor, batch_size=4, max_pending=2))
+        self.assertLessEqual(max(peak), 2)
+    
+    def test_texts_to_warm_includes_words(self):
+        """Test that the words Rich's wrapper measures are warmed."""
+        texts = texts_to_warm(["తెలుగు భాష\nరెండు", 42])
+        self.assertIn("తెలుగు భాష", texts)
+        self.assertIn("తెలుగు ", texts)
+        self.assertIn("రెండు", texts)
+    
+    def test_aprint(self):
+        """Test that aprint prints the text after warming the cache."""
+        saved_model = set_width_model(WidthModel("default", cell_width_px=20))
+        try:
+            output = io.StringIO()
+            console = CTLConsole(file=output, width=40, improve_display=False)
+            asyncio.run(console.aprint("తెలుగు భాష"))
+        finally:
+            unpatch_rich()
+            set_width_model(saved_model)
+        self.assertIn("తెలుగు భాష", output.getvalue())
+    
+    def test_collect_renderables_converts_markup(self):
+        """Test that strings are joined and their markup removed."""
+        console = CTLConsole(file=io.StringIO(), width=40, improve_display=False)
+        try:
+            table = Table("భాష")
+            renderables = collect_renderables(console, ["[bold]తెలుగు[/bold]", "భాష", table])
+        finally:
+            unpatch_rich()
+        self.assertEqual(renderables[0].plain, "తెలుగు భాష")
+        self.assertIs(renderables[1], table)
+    
+    def test_prerender_covers_renderables(self):
+        """Test that printing markup and a table after prerender() shapes nothing new."""
+        saved_model = set_width_model(WidthModel("default", cell_width_px=20))
+        try:
+            console = CTLConsole(file=io.StringIO(), width=30, improve_display=False)
+            table = Table("భాష", "వివరణ")
+            table.add_row("తెలుగు", "దక్షిణ భారతదేశంలో మాట్లాడే ద్రావిడ భాష")
+            objects = ["[bold]తెలుగు భాష[/bold] ఒక ద్రావిడ భాష", table]
+            asyncio.run(prerender(console, collect_renderables(console, objects)))
+            misses = cache_info().misses
+            console.print(*objects)
+            self.assertEqual(cache_info().misses, misses)
+        finally:
+            unpatch_rich()
+            set_width_model(saved_model)
+
+
+if __name__ == "__main__":
+    unittest.main()
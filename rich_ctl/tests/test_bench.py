@@ -0,0 +1,60 @@
+"""
+Tests for the bench module and the bench command.
+"""
+
+import contextlib
+import io
+import json
+import unittest
+
+from rich_ctl import patch
+from rich_ctl.bench import BenchResult, overhead, run_benchmarks
+from rich_ctl.cli import main
+
+
+class TestRunBenchmarks(unittest.TestCase):
+    """Test cases for running benchmarks."""
+    
+    def test_filters(self):
+        """Test that only benchmarks matching a filter run."""
+        results = run_benchmarks(["cell_len_hit/telugu", "print_ctl/panel/mixed"], repeat=1, min_time=0)
+        self.assertEqual([result.name for result in results],
+                         ["cell_len_hit/telugu", "print_ctl/panel/mixed"])
+        for result in results:
+            self.assertGreater(result.best_us, 0)
+            self.assertLessEqual(result.best_us, result.median_us)
+    
+    def test_patch_state_restored(self):
+        """Test that running print benchmarks leaves Rich unpatched if it was."""
+        patch.unpatch_rich()
+        run_benchmarks(["print_ctl/panel/hindi"], repeat=1, min_time=0)
+        self.assertEqual(patch._patched, [])
+    
+    def test_overhead(self):
+        """Test the overhead of rich-ctl over plain Rich."""
+        results = [
+            BenchResult("print_rich/table/telugu", "print", 1, 100.0, 100.0, 100.0),
+            BenchResult("print_ctl/table/telugu", "print", 1, 105.0, 105.0, 105.0),
+            BenchResult("print_ctl/panel/telugu", "print", 1, 10.0, 10.0, 10.0),
+        ]
+        self.assertEqual(list(overhead(results)), ["table/telugu"])
+        self.assertAlmostEqual(overhead(results)["table/telugu"], 0.05)
+
+
+class TestBenchCommand(unittest.TestCase):
+    """Test cases for `rich-ctl bench`."""
+    
+    def test_json(self):
+        """Test that --json prints a report that round-trips through JSON."""
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            code = main(["bench", "--json", "--filter", "shape_text_warm/arabic", "--repeat", "1", "--min-time", "0"])
+        self.assertEqual(code, 0)
+        data = json.loads(out.getvalue())
+        self.assertEqual(set(data), {"environment", "results", "overhead"})
+        self.assertEqual(data["results"][0]["name"], "shape_text_warm/arabic")
+        self.assertIn("harfbuzz", data["environment"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+"""
+pytest-benchmark suite for the CTL pipeline.
+
+Runs only when pytest-benchmark is installed; compare runs with
+``pytest rich_ctl/tests/test_benchmarks.py --benchmark-autosave`` and
+``pytest-benchmark compare``.
+"""
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from rich_ctl import patch
+from rich_ctl.bench import _cases
+
+CASES = {case.name: case for case in _cases()}
+
+
+@pytest.fixture(autouse=True)
+def _restore_patches():
+    yield
+    patch.unpatch_rich()
+
+
+@pytest.mark.parametrize("name", list(CASES))
+def test_pipeline(benchmark, name):
+    case = CASES[name]
+    benchmark.group = case.group
+    if case.prepare is not None:
+        case.prepare()
+    case.func()
+    if case.reset is None:
+        benchmark(case.func)
+    else:
+        benchmark.pedantic(case.func, setup=case.reset, rounds=20)
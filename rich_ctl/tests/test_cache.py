@@ -0,0 +1,105 @@
+"""
+Tests for the cache module.
+"""
+
+import unittest
+from rich_ctl.cache import DEFAULT_STRIPES, MIN_STRIPE_BYTES, CacheKey, ShapeCache, StripedShapeCache
+
+
+class TestShapeCache(unittest.TestCase):
+    """Test cases for the bounded shape cache."""
+    
+    def test_hits_and_misses(self):
+        """Test that lookups are counted."""
+        cache = ShapeCache(maxsize=4)
+        key = CacheKey("తెలుగు", "Telu", "ltr")
+        self.assertIsNone(cache.get(key))
+        cache.put(key, 12)
+        self.assertEqual(cache.get(key), 12)
+        info = cache.cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (1, 1, 1))
+    
+    def test_key_includes_width_model(self):
+        """Test that entries for different width models do not collide."""
+        cache = ShapeCache()
+        cache.put(CacheKey("x", width_model=("default", 8, None)), 1)
+        self.assertIsNone(cache.get(CacheKey("x", width_model=("default", 10, None))))
+    
+    def test_lru_eviction_by_size(self):
+        """Test that the least recently used entry is evicted first."""
+        cache = ShapeCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertEqual(cache.cache_info().evictions, 1)
+    
+    def test_eviction_by_bytes(self):
+        """Test that the byte limit bounds the cache."""
+        cache = ShapeCache(maxsize=100, maxbytes=250)
+        for i in range(10):
+            cache.put(i, i, nbytes=100)
+        info = cache.cache_info()
+        self.assertLessEqual(info.currbytes, 250)
+        self.assertEqual(info.currsize, 2)
+    
+    def test_tinylfu_keeps_popular_entries(self):
+        """Test that one-off keys do not flush frequently used entries."""
+        cache = ShapeCache(maxsize=2, policy="tinylfu")
+        for key in ("hot1", "hot2"):
+            for _ in range(5):
+                cache.get(key)
+            cache.put(key, key)
+        for i in range(50):
+            key = f"line {i}"
+            if cache.get(key) is None:
+                cache.put(key, key)
+        self.assertIn("hot1", cache)
+        self.assertIn("hot2", cache)
+    
+    def test_clear(self):
+        """Test that clear empties the cache and resets statistics."""
+        cache = ShapeCache()
+        cache.put("a", 1)
+        cache.get("a")
+        cache.clear()
+        self.assertEqual(cache.cache_info()[:3], (0, 0, 0))
+        self.assertEqual(len(cache), 0)
+    
+    def test_invalid_policy(self):
+        """Test that an unknown policy is rejected."""
+        with self.assertRaises(ValueError):
+            ShapeCache(policy="fifo")
+
+
+class TestStripedShapeCache(unittest.TestCase):
+    """Test cases for the striped cache shared between threads."""
+    
+    def test_small_limits_use_fewer_stripes(self):
+        """Test that every key is cached when the limits are too small for all stripes."""
+        cache = StripedShapeCache(maxsize=8)
+        for i in range(8):
+            cache.put(f"key {i}", i)
+        self.assertEqual(len(cache), 8)
+        self.assertEqual(cache.cache_info().maxsize, 8)
+    
+    def test_large_entry_fits(self):
+        """Test that an entry bigger than an even share of the byte limit is admitted."""
+        cache = StripedShapeCache(maxbytes=4 * MIN_STRIPE_BYTES)
+        cache.put("layout", "x", nbytes=MIN_STRIPE_BYTES)
+        self.assertIn("layout", cache)
+    
+    def test_reconfigure_keeps_entries(self):
+        """Test that changing the number of stripes keeps the cached entries."""
+        cache = StripedShapeCache(maxsize=8)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.configure(maxsize=1024)
+        self.assertEqual(len(cache._stripes), DEFAULT_STRIPES)
+        self.assertEqual((cache.get("a"), cache.get("b")), (1, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
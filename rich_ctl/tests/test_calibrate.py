@@ -0,0 +1,102 @@
+"""
+Tests for the calibrate module.
+"""
+
+import pickle
+import unittest
+
+from rich_ctl import calibrate
+from rich_ctl.cache import clear_cache
+from rich_ctl.calibrate import PROFILES, TerminalProfile, WidthModel, detect_profile, register_profile
+from rich_ctl.patch import ctl_cell_len, install_rich_ctl, unpatch_rich
+
+
+class TestDetectProfile(unittest.TestCase):
+    """Test cases for choosing a profile from the environment."""
+    
+    def test_detection(self):
+        """Test the environment variables that select a profile."""
+        self.assertEqual(detect_profile({}), "default")
+        self.assertEqual(detect_profile({"TERM": "xterm-256color"}), "default")
+        self.assertEqual(detect_profile({"TERM": "xterm-kitty"}), "kitty")
+        self.assertEqual(detect_profile({"TERM": "xterm-256color", "VTE_VERSION": "7600"}), "gnome-terminal")
+        self.assertEqual(detect_profile({"TERM": "xterm-kitty", "RICH_CTL_TERMINAL": "wcwidth-compatible"}),
+                         "wcwidth-compatible")
+    
+    def test_unknown_profile(self):
+        """Test that an unknown profile name is rejected."""
+        with self.assertRaises(ValueError):
+            WidthModel("no-such-terminal")
+        with self.assertRaises(ValueError):
+            register_profile(TerminalProfile("odd", "shaped", "floor", ""))
+
+
+class TestWidthModel(unittest.TestCase):
+    """Test cases for converting clusters to cells."""
+    
+    def test_cell_width_from_font(self):
+        """Test that the cell width is a monospace '0' advance, not a fixed pixel count."""
+        units = calibrate.font_cell_units()
+        # A monospace '0' is roughly half to two thirds of an em (36px * 64)
+        self.assertGreater(units, 36 * 64 * 0.4)
+        self.assertLess(units, 36 * 64 * 0.7)
+    
+    def test_table_matches_rounding(self):
+        """Test that the lookup table agrees with the rounding rule."""
+        model = WidthModel("default", cell_width_px=10)
+        self.assertEqual(model.cells(0), 0)
+        self.assertEqual(model.cells(1), 1)
+        self.assertEqual(model.cells(640), 1)
+        self.assertEqual(model.cells(959), 1)
+        self.assertEqual(model.cells(960), 2)
+        self.assertEqual(model.cells(640 * 100), 100)
+        ceil = WidthModel("mlterm", cell_width_px=10)
+        self.assertEqual(ceil.cells(641), 2)
+    
+    def test_text_profiles(self):
+        """Test the profiles that measure clusters from their text."""
+        text = "తెలుగు"
+        # Per code point, the spacing vowel signs (ు) take a cell each
+        self.assertEqual(WidthModel("wcwidth-compatible").text_cells(text), 5)
+        # One cell per grapheme cluster: తె, లు, గు
+        self.assertEqual(WidthModel("kitty").text_cells(text), 3)
+        self.assertEqual(WidthModel("wcwidth-compatible").text_cells("中a"), 3)
+    
+    def test_key_and_pickle(self):
+        """Test that equal settings give equal keys, also across processes."""
+        model = WidthModel("kitty", cell_width_px=12)
+        self.assertEqual(model.key, WidthModel("kitty", cell_width_px=12).key)
+        self.assertNotEqual(model.key, WidthModel("default", cell_width_px=12).key)
+        copy = pickle.loads(pickle.dumps(model))
+        self.assertEqual(copy.key, model.key)
+        self.assertEqual(copy.cell_units, model.cell_units)
+    
+    def test_profiles_table(self):
+        """Test that the named terminal profiles exist."""
+        for name in ("default", "kitty", "gnome-terminal", "wcwidth-compatible"):
+            self.assertIn(name, PROFILES)
+
+
+class TestInstall(unittest.TestCase):
+    """Test cases for selecting a profile through install_rich_ctl()."""
+    
+    def setUp(self):
+        self.saved_model = calibrate.width_model
+        clear_cache()
+    
+    def tearDown(self):
+        unpatch_rich()
+        calibrate.set_width_model(self.saved_model)
+        clear_cache()
+    
+    def test_terminal_option(self):
+        """Test that the terminal option changes measured widths."""
+        install_rich_ctl(terminal="wcwidth-compatible")
+        self.assertEqual(calibrate.width_model.profile.name, "wcwidth-compatible")
+        self.assertEqual(ctl_cell_len("తెలుగు భాష"), 8)
+        install_rich_ctl(terminal="default", cell_width_px=20)
+        self.assertEqual(calibrate.width_model.cell_units, 20 * 64)
+
+
+if __name__ == "__main__":
+    unittest.main()
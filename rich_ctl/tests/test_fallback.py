@@ -0,0 +1,80 @@
+"""
+Tests for the font fallback module.
+"""
+
+import unittest
+
+from rich_ctl import fallback
+from rich_ctl.cache import cache_info
+from rich_ctl.fallback import FallbackChain, FontCoverage, chain_for_script, coverage_for
+from rich_ctl.fonts import resolve_font_path
+from rich_ctl.patch import ctl_cell_len
+
+DEFAULT_FONT = resolve_font_path()
+
+
+@unittest.skipIf(DEFAULT_FONT is None, "no default font available")
+class TestFontCoverage(unittest.TestCase):
+    """Test cases for cmap coverage bitmaps."""
+    
+    def test_covers_matches_cmap(self):
+        """Test that coverage agrees with the font's nominal glyphs."""
+        coverage = FontCoverage(str(DEFAULT_FONT))
+        self.assertTrue(coverage.covers(ord("A")))
+        self.assertFalse(coverage.covers(0x10FFFD))
+    
+    def test_pages_built_lazily(self):
+        """Test that only the pages that were queried are built."""
+        coverage = FontCoverage(str(DEFAULT_FONT))
+        coverage.covers(ord("A"))
+        coverage.covers(ord("z"))
+        self.assertEqual(list(coverage._pages), [0])
+    
+    def test_shared_per_font(self):
+        """Test that coverage_for returns one bitmap per font."""
+        self.assertIs(coverage_for(str(DEFAULT_FONT)), coverage_for(str(DEFAULT_FONT)))
+
+
+@unittest.skipIf(DEFAULT_FONT is None, "no default font available")
+class TestFallbackChain(unittest.TestCase):
+    """Test cases for per-script fallback chains."""
+    
+    def tearDown(self):
+        fallback.set_fallback_fonts([])
+    
+    def test_first_covering_font_wins(self):
+        """Test that a code point goes to the first font covering it."""
+        chain = FallbackChain(["/nonexistent/font.ttf", str(DEFAULT_FONT)])
+        self.assertEqual(chain.font_for(ord("A")), str(DEFAULT_FONT))
+    
+    def test_uncovered_uses_last_font(self):
+        """Test that a code point no font covers goes to the last font."""
+        chain = FallbackChain([str(DEFAULT_FONT)])
+        self.assertEqual(chain.font_for(0x10FFFD), str(DEFAULT_FONT))
+    
+    def test_decisions_memoized(self):
+        """Test that repeated lookups do not probe coverage again."""
+        chain = FallbackChain([str(DEFAULT_FONT)])
+        chain.font_for(ord("A"))
+        self.assertIn(ord("A"), chain._decisions)
+    
+    def test_configured_fonts_reset_chains(self):
+        """Test that configuring fallback fonts rebuilds the chains."""
+        before = chain_for_script("Latn")
+        generation = fallback.generation()
+        fallback.set_fallback_fonts([str(DEFAULT_FONT)])
+        self.assertIsNot(chain_for_script("Latn"), before)
+        self.assertEqual(fallback.generation(), generation + 1)
+        self.assertEqual(chain_for_script("Latn").fonts[0], str(DEFAULT_FONT))
+    
+    def test_configured_fonts_drop_cached_widths(self):
+        """Test that widths measured with the old chains are measured again."""
+        ctl_cell_len("తెలుగు")
+        fallback.set_fallback_fonts([str(DEFAULT_FONT)])
+        misses = cache_info().misses
+        ctl_cell_len("తెలుగు")
+        self.assertGreater(cache_info().misses, misses)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+Tests for the font discovery index.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from rich_ctl import fontindex
+from rich_ctl.fontindex import FontIndex, name_key
+from rich_ctl.fonts import get_system_font_paths
+
+
+def _any_system_font():
+    """Find one installed .ttf file to copy into a test directory."""
+    for font_dir in get_system_font_paths():
+        for path in font_dir.rglob("*.ttf"):
+            return path
+    return None
+
+
+SAMPLE_FONT = _any_system_font()
+
+
+@unittest.skipIf(SAMPLE_FONT is None, "no system .ttf font available")
+class TestFontIndex(unittest.TestCase):
+    """Test cases for FontIndex."""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        root = Path(self.tmpdir.name)
+        self.font_dir = root / "fonts"
+        nested = self.font_dir / "truetype" / "sample"
+        nested.mkdir(parents=True)
+        self.font_path = nested / "SampleFont-Regular.ttf"
+        shutil.copy(SAMPLE_FONT, self.font_path)
+        self.cache_path = root / "cache" / "font-index.json"
+    
+    def tearDown(self):
+        self.tmpdir.cleanup()
+    
+    def test_finds_fonts_in_subdirectories(self):
+        """Test that the scan is recursive."""
+        index = FontIndex([self.font_dir])
+        self.assertEqual(len(index), 1)
+        self.assertEqual(index.find("SampleFont-Regular").path, str(self.font_path))
+    
+    def test_lookup_by_family_and_substring(self):
+        """Test lookups by family name and by partial file stem."""
+        index = FontIndex([self.font_dir])
+        info = index.fonts[0]
+        self.assertEqual(index.find(info.family).path, info.path)
+        self.assertEqual(index.find("samplefont").path, info.path)
+        self.assertIsNone(index.find("NoSuchFont"))
+    
+    def test_scripts_from_cmap(self):
+        """Test that script support is derived from cmap coverage."""
+        index = FontIndex([self.font_dir])
+        self.assertIn("Latn", index.fonts[0].scripts)
+        self.assertEqual(index.for_script("latn"), index.fonts)
+    
+    def test_persisted_index_skips_parsing(self):
+        """Test that an unchanged directory tree is not parsed again."""
+        FontIndex([self.font_dir], self.cache_path)
+        self.assertTrue(self.cache_path.exists())
+        with mock.patch.object(fontindex, "read_font_info") as read:
+            index = FontIndex([self.font_dir], self.cache_path)
+        read.assert_not_called()
+        self.assertEqual(len(index), 1)
+    
+    def test_new_file_invalidates(self):
+        """Test that adding a font to a directory is picked up."""
+        FontIndex([self.font_dir], self.cache_path)
+        shutil.copy(SAMPLE_FONT, self.font_path.with_name("Other-Regular.ttf"))
+        index = FontIndex([self.font_dir], self.cache_path)
+        self.assertEqual(len(index), 2)
+        self.assertIsNotNone(index.find("Other-Regular"))
+    
+    def test_file_replaced_in_place_invalidates(self):
+        """Test that a font rewritten without changing its directory is parsed again."""
+        FontIndex([self.font_dir], self.cache_path)
+        directory = self.font_path.parent
+        dir_stat = os.stat(directory)
+        self.font_path.write_bytes(SAMPLE_FONT.read_bytes() + b"\0" * 4)
+        os.utime(directory, ns=(dir_stat.st_atime_ns, dir_stat.st_mtime_ns))
+        with mock.patch.object(fontindex, "read_font_info", return_value=[]) as read:
+            index = FontIndex([self.font_dir], self.cache_path)
+        read.assert_called_once_with(self.font_path)
+        self.assertEqual(len(index), 0)
+    
+    def test_name_key(self):
+        """Test that name variants share a lookup key."""
+        self.assertEqual(name_key("Noto Sans Telugu"), name_key("NotoSansTelugu"))
+
+
+if __name__ == "__main__":
+    unittest.main()
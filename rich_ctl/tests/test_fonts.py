@@ -0,0 +1,99 @@
+"""
+Tests for the fonts module.
+"""
+
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+from pathlib import Path
+
+from rich_ctl import fonts
+from rich_ctl.fonts import (find_font_file, font_ref, get_face, get_font, load_font_from_path,
+                            resolve_font_face, resolve_font_path)
+
+DEFAULT_FONT = resolve_font_path()
+MONO_FONT = find_font_file("DejaVuSansMono")
+
+
+def write_collection(path, font_files):
+    """Write the fonts in font_files into one TrueType collection."""
+    fonts_data = [Path(font_file).read_bytes() for font_file in font_files]
+    tables = []
+    for data in fonts_data:
+        count = struct.unpack(">H", data[4:6])[0]
+        records = [struct.unpack(">4sIII", data[12 + 16 * i:28 + 16 * i]) for i in range(count)]
+        tables.append((data[:12], records))
+    offset = 12 + 4 * len(fonts_data)
+    directories = []
+    for header, records in tables:
+        directories.append(offset)
+        offset += 12 + 16 * len(records)
+    out = bytearray(struct.pack(">4sHHI", b"ttcf", 1, 0, len(fonts_data)))
+    out += b"".join(struct.pack(">I", start) for start in directories)
+    body = bytearray()
+    for data, (header, records) in zip(fonts_data, tables):
+        out += header
+        for tag, checksum, start, length in records:
+            out += struct.pack(">4sIII", tag, checksum, offset + len(body), length)
+            body += data[start:start + length]
+            body += b"\0" * (-len(body) % 4)
+    Path(path).write_bytes(bytes(out + body))
+
+
+@unittest.skipIf(DEFAULT_FONT is None, "no default font available")
+class TestFontLoading(unittest.TestCase):
+    """Test cases for font and face caching."""
+    
+    def test_face_shared_across_sizes(self):
+        """Test that fonts of different sizes share one face."""
+        small = load_font_from_path(DEFAULT_FONT, 12)
+        large = load_font_from_path(DEFAULT_FONT, 48)
+        self.assertIsNot(small, large)
+        self.assertEqual(small.scale, (12 * 64, 12 * 64))
+        self.assertIs(small.face, get_face(DEFAULT_FONT))
+        self.assertIs(large.face, get_face(DEFAULT_FONT))
+    
+    def test_index_in_test_cache_dir(self):
+        """Test that the font index is saved outside the user's cache directory."""
+        cache_path = fonts.get_font_index().cache_path
+        self.assertEqual(cache_path.parent.parent, Path(os.environ["XDG_CACHE_HOME"]))
+        self.assertNotEqual(cache_path.parent.parent, Path.home() / ".cache")
+    
+    def test_name_and_path_share_font(self):
+        """Test that a name and a path resolving to one file share the font."""
+        by_path = get_font(font_path=str(DEFAULT_FONT))
+        by_name = get_font(font_name=DEFAULT_FONT.stem)
+        self.assertIs(by_path, by_name)
+    
+    def test_fallback_cached_under_requested_name(self):
+        """Test that a missing font name is cached, not resolved again."""
+        font = get_font(font_name="NoSuchFontAnywhere")
+        self.assertIs(fonts._font_cache[("NoSuchFontAnywhere", fonts.DEFAULT_FONT_SIZE)], font)
+        self.assertIs(get_font(font_name="NoSuchFontAnywhere"), font)
+    
+    @unittest.skipIf(MONO_FONT is None, "no second font available")
+    def test_collection_face_index(self):
+        """Test that each face of a collection is loaded and cached separately."""
+        directory = tempfile.mkdtemp()
+        try:
+            collection = os.path.join(directory, "pair.ttc")
+            write_collection(collection, [DEFAULT_FONT, MONO_FONT])
+            self.assertEqual(get_face(collection).glyph_count, get_face(DEFAULT_FONT).glyph_count)
+            self.assertEqual(get_face(collection, 1).glyph_count, get_face(MONO_FONT).glyph_count)
+            self.assertIsNot(get_face(collection, 1), get_face(collection))
+            self.assertEqual(resolve_font_face(font_ref(collection, 1)), (Path(collection), 1))
+            font = get_font(font_path=font_ref(collection, 1))
+            self.assertIs(font.face, get_face(collection, 1))
+        finally:
+            shutil.rmtree(directory)
+    
+    def test_invalid_file_raises(self):
+        """Test that a file that is not a font raises ValueError."""
+        with self.assertRaises(ValueError):
+            get_face(__file__)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+Tests for the incremental module.
+"""
+
+import unittest
+
+from rich_ctl import instrument
+from rich_ctl.bench import SAMPLES
+from rich_ctl.cache import clear_cache, shape_cache
+from rich_ctl.incremental import IncrementalLines, IncrementalShaper, lines_for, watch_widget
+from rich_ctl.itemize import itemize
+from rich_ctl.patch import ctl_cell_len
+from rich_ctl.shape import _shape_text
+
+
+def _full(text):
+    """Shape text from scratch the way layouts do."""
+    return _shape_text(text, None, None, "en", None, None, normalize=False)
+
+
+class TestIncrementalShaper(unittest.TestCase):
+    """Test cases for reshaping lines as they change."""
+    
+    def setUp(self):
+        clear_cache()
+        instrument.reset()
+    
+    def tearDown(self):
+        instrument.disable()
+        instrument.reset()
+    
+    def assertSameRun(self, shaper, text):
+        run = shaper.update(text)
+        full = _full(text)
+        self.assertEqual(list(run.offsets), list(full.offsets), text)
+        self.assertEqual(list(run.advances), list(full.advances), text)
+        self.assertEqual([shaped.item for shaped in shaper._items], itemize(text), text)
+    
+    def test_typing(self):
+        """Test that typing a line character by character matches shaping it whole."""
+        for text in SAMPLES.values():
+            shaper = IncrementalShaper()
+            for i in range(1, len(text) + 1):
+                self.assertSameRun(shaper, text[:i])
+    
+    def test_edits(self):
+        """Test insertions and deletions inside a line, including marks left behind."""
+        shaper = IncrementalShaper()
+        text = SAMPLES["telugu"]
+        self.assertSameRun(shaper, text)
+        # Delete a consonant so that its vowel sign follows another vowel sign
+        position = text.index("వి")
+        self.assertSameRun(shaper, text[:position] + text[position + 1:])
+        self.assertSameRun(shaper, text[:position] + "x" + text[position:])
+        self.assertSameRun(shaper, SAMPLES["mixed"] + text)
+        self.assertSameRun(shaper, "")
+        self.assertSameRun(shaper, SAMPLES["arabic"])
+    
+    def test_reuses_prefix(self):
+        """Test that appending reshapes only the end of the line."""
+        instrument.enable()
+        shaper = IncrementalShaper()
+        text = SAMPLES["hindi"]
+        shaper.update(text)
+        shaper.update(text + " और")
+        self.assertGreater(instrument.stats()["counters"].get("incremental.reused", 0), 0)
+    
+    def test_cell_len_fills_cache(self):
+        """Test that measured lines are cache hits for ctl_cell_len()."""
+        instrument.enable()
+        shaper = IncrementalShaper()
+        text = SAMPLES["mixed"]
+        width = shaper.cell_len(text)
+        self.assertEqual(ctl_cell_len(text), width)
+        self.assertEqual(instrument.stats()["counters"].get("cell_len.hit"), 1)
+        self.assertEqual(shaper.cell_len("plain"), 5)
+    
+    def test_other_language_not_cached(self):
+        """Test that lines shaped for another language do not fill the shared cache."""
+        shaper = IncrementalShaper(language="te")
+        shaper.cell_len(SAMPLES["telugu"])
+        self.assertEqual([key for key in shape_cache.keys() if key.text == SAMPLES["telugu"]], [])
+
+
+class TestIncrementalLines(unittest.TestCase):
+    """Test cases for multi-line state and the widget hook."""
+    
+    def setUp(self):
+        clear_cache()
+    
+    def test_lines_keep_shapers(self):
+        """Test that inserting a line keeps the shapers of the lines after it."""
+        lines = IncrementalLines()
+        first = SAMPLES["telugu"] + "\n" + SAMPLES["arabic"]
+        widths = lines.update(first)
+        shapers = list(lines.shapers)
+        self.assertEqual(widths, [ctl_cell_len(line) for line in first.split("\n")])
+        lines.update(SAMPLES["hindi"] + "\n" + first)
+        self.assertIs(lines.shapers[1], shapers[0])
+        self.assertIs(lines.shapers[2], shapers[1])
+    
+    def test_watch_widget(self):
+        """Test that a watched attribute is measured on every change."""
+        class Widget:
+            def watch(self, obj, attribute, callback, init=True):
+                self.callback = callback
+        
+        widget = Widget()
+        lines = watch_widget(widget, "value")
+        self.assertIs(lines_for(widget), lines)
+        widget.callback(SAMPLES["telugu"])
+        self.assertEqual(lines.shapers[0].text, SAMPLES["telugu"])
+
+
+if __name__ == "__main__":
+    unittest.main()
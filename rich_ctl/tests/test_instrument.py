@@ -0,0 +1,90 @@
+"""
+Tests for the instrument module.
+"""
+
+import contextlib
+import io
+import json
+import unittest
+
+import rich_ctl
+from rich_ctl import instrument
+from rich_ctl.cache import clear_cache
+from rich_ctl.cli import main
+from rich_ctl.instrument import Histogram
+from rich_ctl.patch import cell_len_many, ctl_cell_len
+
+
+class TestInstrument(unittest.TestCase):
+    """Test cases for counters and timings."""
+    
+    def setUp(self):
+        clear_cache()
+        instrument.reset()
+    
+    def tearDown(self):
+        instrument.disable()
+        instrument.reset()
+    
+    def test_disabled_records_nothing(self):
+        """Test that nothing is recorded unless instrumentation is enabled."""
+        ctl_cell_len("తెలుగు")
+        self.assertEqual(rich_ctl.stats()["counters"], {})
+    
+    def test_measurement_paths(self):
+        """Test that each ctl_cell_len() path is counted."""
+        instrument.enable()
+        for text in ["hello", "తెలుగు", "తెలుగు", "café"]:
+            ctl_cell_len(text)
+        stats = rich_ctl.stats()
+        counters = stats["counters"]
+        self.assertEqual(counters["cell_len.ascii"], 1)
+        self.assertEqual(counters["cell_len.shaped"], 1)
+        self.assertEqual(counters["cell_len.hit"], 1)
+        self.assertEqual(counters["cell_len.simple"], 1)
+        self.assertGreaterEqual(counters["shape.harfbuzz"], 1)
+        self.assertEqual(stats["latency"]["cell_len.shaped"]["count"], 1)
+        self.assertAlmostEqual(stats["fast_path_ratio"], 0.75)
+        self.assertGreater(stats["cache"]["currbytes"], 0)
+    
+    def test_batch_paths(self):
+        """Test that cell_len_many() counts the same paths."""
+        instrument.enable()
+        cell_len_many(["x", "हिन्दी", "हिन्दी"])
+        counters = rich_ctl.stats()["counters"]
+        self.assertEqual(counters["cell_len.ascii"], 1)
+        self.assertEqual(counters["cell_len.shaped"], 1)
+        self.assertEqual(counters["cell_len_many.batch"], 1)
+    
+    def test_histogram(self):
+        """Test histogram percentiles."""
+        histogram = Histogram()
+        for micros in [1, 2, 3, 100, 1000]:
+            histogram.add(micros / 1e6)
+        summary = histogram.summary()
+        self.assertEqual(summary["count"], 5)
+        self.assertEqual(summary["p50_us"], 4.0)
+        self.assertAlmostEqual(summary["max_us"], 1000)
+        self.assertAlmostEqual(summary["p99_us"], 1000)
+
+
+class TestStatsCommand(unittest.TestCase):
+    """Test cases for `rich-ctl stats`."""
+    
+    def setUp(self):
+        clear_cache()
+    
+    def test_json(self):
+        """Test that the command renders a workload and prints its statistics."""
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            code = main(["stats", "--json", "--repeat", "1"])
+        self.assertEqual(code, 0)
+        data = json.loads(out.getvalue())
+        self.assertFalse(data["enabled"])
+        self.assertGreater(data["counters"]["cell_len.ascii"], 0)
+        self.assertIn("shape.harfbuzz", data["latency"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+"""
+Tests for the itemize module.
+"""
+
+import unittest
+from rich_ctl.itemize import itemize, _itemize_span
+
+
+class TestItemize(unittest.TestCase):
+    """Test cases for script/direction itemization."""
+    
+    def test_empty_text(self):
+        """Test that empty text produces no runs."""
+        self.assertEqual(itemize(""), [])
+    
+    def test_single_script(self):
+        """Test that single-script text is one run."""
+        runs = itemize("తెలుగు")
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(runs[0][:4], (0, 6, "Telu", "ltr"))
+    
+    def test_mixed_text(self):
+        """Test that mixed text is split by script with neutrals attached."""
+        text = "English, తెలుగు, हिन्दी, مرحبا"
+        runs = itemize(text)
+        self.assertEqual([r.script for r in runs], ["Latn", "Telu", "Deva", "Arab"])
+        self.assertEqual([r.direction for r in runs], ["ltr", "ltr", "ltr", "rtl"])
+        self.assertEqual(text[runs[1].start:runs[1].end], "తెలుగు, ")
+        # Runs cover the text contiguously
+        self.assertEqual(runs[0].start, 0)
+        self.assertEqual(runs[-1].end, len(text))
+        for prev, run in zip(runs, runs[1:]):
+            self.assertEqual(prev.end, run.start)
+    
+    def test_leading_neutrals(self):
+        """Test that leading neutral characters join the first script run."""
+        runs = itemize("12 తెలుగు")
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(runs[0].script, "Telu")
+    
+    def test_explicit_script(self):
+        """Test that an explicit script overrides detection."""
+        runs = itemize("abc", script="Telu")
+        self.assertEqual([r.script for r in runs], ["Telu"])
+    
+    def test_neutral_only(self):
+        """Test that text without any script letters is a single Common run."""
+        self.assertEqual([r.script for r in itemize("123 !")], ["Zyyy"])
+    
+    def test_span_cache_reused_for_ascii_suffix(self):
+        """Test that changing an ASCII suffix does not re-itemize the prefix."""
+        _itemize_span.cache_clear()
+        itemize("తెలుగు line 1")
+        itemize("తెలుగు line 2")
+        info = _itemize_span.cache_info()
+        self.assertEqual(info.misses, 1)
+        self.assertEqual(info.hits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+Tests for the layout module.
+"""
+
+import unittest
+from array import array
+
+from rich_ctl import layout
+from rich_ctl.calibrate import WidthModel
+from rich_ctl.layout import NUMPY_MIN_CLUSTERS, CellLayout, cluster_cells, run_cells
+from rich_ctl.shape import ShapedRun
+
+
+def _layout(text, boundaries, advances, cell_width_px=10):
+    """Build a layout from hand-written cluster boundaries and pixel advances."""
+    run = ShapedRun(text, array('I', boundaries), array('i', [advance * 64 for advance in advances]))
+    # The mlterm profile rounds every cluster up
+    return CellLayout.from_run(run, WidthModel("mlterm", cell_width_px=cell_width_px))
+
+
+class TestCellLayout(unittest.TestCase):
+    """Test cases for cumulative cell offsets."""
+    
+    def setUp(self):
+        # Clusters "ab" (2 cells), "c" (1 cell), "def" (3 cells), "g" (0 cells)
+        self.layout = _layout("abcdefg", [0, 2, 3, 6, 7], [20, 10, 25, 0])
+    
+    def test_cells_per_cluster_rounded_up(self):
+        """Test that each cluster is rounded up on its own."""
+        self.assertEqual(list(self.layout.cells), [0, 2, 3, 6, 6])
+        self.assertEqual(self.layout.total, 6)
+    
+    def test_width_of_substring(self):
+        """Test substring widths on and inside cluster boundaries."""
+        self.assertEqual(self.layout.width(0, 3), 3)
+        self.assertEqual(self.layout.width(2), 4)
+        # Index 1 is inside "ab" and index 5 inside "def"
+        self.assertEqual(self.layout.width(1, 5), 3)
+    
+    def test_fit(self):
+        """Test the largest cluster-aligned end that fits."""
+        self.assertEqual(self.layout.fit(0, 2), 2)
+        self.assertEqual(self.layout.fit(0, 5), 3)
+        self.assertEqual(self.layout.fit(3, 3), 7)
+        self.assertEqual(self.layout.fit(3, 2), 3)
+    
+    def test_cut(self):
+        """Test cut positions and the cells they use."""
+        self.assertEqual(self.layout.cut(4), (3, 3))
+        self.assertEqual(self.layout.cut(100), (7, 6))
+
+class TestClusterCells(unittest.TestCase):
+    """Test cases for converting whole runs to cells."""
+    
+    def setUp(self):
+        self.model = WidthModel("mlterm", cell_width_px=10)
+        # Long enough for the NumPy path, with negative and very wide advances
+        advances = [(i * 37) % 900 - 20 for i in range(NUMPY_MIN_CLUSTERS * 3)] + [10 * 64 * 40]
+        self.run = ShapedRun("x" * len(advances), array('I', range(len(advances) + 1)), array('i', advances))
+        self.expected = [self.model._convert(advance) for advance in advances]
+        self.saved = layout._numpy
+    
+    def tearDown(self):
+        layout._numpy = self.saved
+    
+    def _check(self):
+        widths, cells = cluster_cells(self.run, self.model)
+        self.assertEqual(list(widths), self.expected)
+        self.assertEqual(cells[0], 0)
+        self.assertEqual(list(cells[1:]), [sum(self.expected[:i + 1]) for i in range(len(self.expected))])
+    
+    def test_pure_python(self):
+        """Test the conversion without NumPy."""
+        layout._numpy = False
+        self._check()
+    
+    def test_numpy(self):
+        """Test that the NumPy conversion gives the same arrays."""
+        if layout._get_numpy() is None:
+            self.skipTest("NumPy is not installed")
+        self._check()
+    
+    def test_layout_kept_on_run(self):
+        """Test that a run is converted once per width model."""
+        first = CellLayout.from_run(self.run, self.model)
+        self.assertIs(CellLayout.from_run(self.run, self.model), first)
+        self.assertEqual(run_cells(self.run, self.model), first.total)
+        other = CellLayout.from_run(self.run, WidthModel("default", cell_width_px=10))
+        self.assertIsNot(other, first)
+
+
+if __name__ == "__main__":
+    unittest.main()
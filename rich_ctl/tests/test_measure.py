@@ -0,0 +1,106 @@
+"""
+Tests for the measure module.
+"""
+
+import unittest
+
+from rich_ctl.measure import WidthRegistry, east_asian_width_mapper, grapheme_widths, px_to_cells, simple_cell_len
+
+
+class TestPxToCells(unittest.TestCase):
+    """Test cases for pixel to cell conversion."""
+    
+    def test_rounds_up(self):
+        """Test that partial cells are rounded up; advances are in 1/64 pixel."""
+        self.assertEqual(px_to_cells(0, 8), 0)
+        self.assertEqual(px_to_cells(8 * 64, 8), 1)
+        self.assertEqual(px_to_cells(8 * 64 + 1, 8), 2)
+
+
+class TestSimpleCellLen(unittest.TestCase):
+    """Test cases for the table-driven measurer."""
+    
+    def test_narrow_text(self):
+        """Test Latin, Greek, Cyrillic and box-drawing text."""
+        for text in ("café", "Ωμέγα", "Привет", "┌──┐"):
+            self.assertEqual(simple_cell_len(text), len(text))
+    
+    def test_combining_marks(self):
+        """Test that a decomposed accent does not take a cell."""
+        self.assertEqual(simple_cell_len("cafe\u0301"), 4)
+    
+    def test_wide_characters(self):
+        """Test East Asian wide characters and emoji."""
+        self.assertEqual(simple_cell_len("日本語"), 6)
+        self.assertEqual(simple_cell_len("\U0001f44d"), 2)
+    
+    def test_emoji_sequences(self):
+        """Test that emoji sequences are measured as one cluster."""
+        # Thumbs up with skin tone, a ZWJ family, a flag and a heart with VS16
+        for text in ("\U0001f44d\U0001f3fd", "\U0001f468\u200d\U0001f469\u200d\U0001f467",
+                     "\U0001f1ee\U0001f1f3", "\u2764\ufe0f"):
+            self.assertEqual(simple_cell_len(text), 2)
+    
+    def test_grapheme_offsets(self):
+        """Test that grapheme offsets cover the text."""
+        offsets, widths = grapheme_widths("éx")
+        self.assertEqual(list(offsets), [0, 2, 3])
+        self.assertEqual(list(widths), [1, 1])
+
+class TestWidthRegistry(unittest.TestCase):
+    """Test cases for custom width mappers."""
+    
+    def setUp(self):
+        self.calls = []
+        self.registry = WidthRegistry()
+    
+    def _mapper(self, width):
+        def mapper(cluster, default_width):
+            self.calls.append(cluster)
+            return width
+        return mapper
+    
+    def test_dispatch_by_script(self):
+        """Test that a script-keyed mapper only sees clusters of its script."""
+        self.registry.register("telugu", self._mapper(3), scripts=["Telu"])
+        text = "aతెb"
+        self.assertFalse(self.registry.covers("hello"))
+        self.assertTrue(self.registry.covers(text))
+        widths = self.registry.apply(text, [0, 1, 3, 4], [1, 1, 1])
+        self.assertEqual(widths, [1, 3, 1])
+        self.assertEqual(self.calls, ["తె"])
+    
+    def test_dispatch_by_range(self):
+        """Test range-keyed mappers, including code points above the table."""
+        self.registry.register("ext-b", self._mapper(5), ranges=[(0x20000, 0x2A6DF)])
+        self.assertEqual(self.registry.get_cell_width("\U00020001", 2), 5)
+        self.assertEqual(self.registry.get_cell_width("x", 1), 1)
+    
+    def test_overrides_cached(self):
+        """Test that a cluster's override is computed once."""
+        self.registry.register("all", self._mapper(4))
+        self.assertEqual(self.registry.get_cell_width("é", 1), 4)
+        self.assertEqual(self.registry.get_cell_width("é", 1), 4)
+        self.assertEqual(self.calls, ["é"])
+    
+    def test_registration_order(self):
+        """Test that the first mapper returning a width wins, and unregistering recompiles."""
+        self.registry.register("none", lambda cluster, width: None, scripts=["Hani"])
+        self.registry.register("six", self._mapper(6), scripts=["Hani"])
+        self.assertEqual(self.registry.get_cell_width("中", 2), 6)
+        self.registry.unregister("six")
+        self.assertEqual(self.registry.get_cell_width("中", 2), 2)
+        with self.assertRaises(ValueError):
+            self.registry.register("bad", self._mapper(1), scripts=["Nope"])
+    
+    def test_east_asian_width(self):
+        """Test the East Asian width mapper."""
+        self.assertEqual(east_asian_width_mapper("中", 1), 2)
+        self.assertEqual(east_asian_width_mapper("Ａ", 1), 2)
+        self.assertEqual(east_asian_width_mapper("\U0001f600", 1), 2)
+        self.assertIsNone(east_asian_width_mapper("a", 1))
+        self.assertIsNone(east_asian_width_mapper("తె", 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
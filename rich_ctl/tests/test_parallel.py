@@ -0,0 +1,63 @@
+"""
+Tests for the parallel module.
+"""
+
+import unittest
+
+from rich_ctl import calibrate, instrument
+from rich_ctl.cache import DEFAULT_MAXSIZE, CacheKey, cache_info, clear_cache, configure_cache, shape_cache
+from rich_ctl.parallel import cell_len_parallel
+from rich_ctl.patch import ctl_cell_len
+
+TEXTS = ["hello", "తెలుగు", "हिन्दी", "café"] + [f"తెలుగు {i}" for i in range(30)] + ["తెలుగు"]
+
+
+class TestCellLenParallel(unittest.TestCase):
+    """Test cases for process-pool measurement."""
+    
+    def setUp(self):
+        clear_cache()
+    
+    def test_matches_single_process(self):
+        """Test that pooled widths equal measuring in this process."""
+        widths = cell_len_parallel(TEXTS, max_workers=2, chunk_size=8)
+        clear_cache()
+        self.assertEqual(widths, [ctl_cell_len(text) for text in TEXTS])
+    
+    def test_results_merged_into_cache(self):
+        """Test that widths measured by workers are cached in the parent."""
+        cell_len_parallel(TEXTS, max_workers=2, chunk_size=8)
+        hits = cache_info().hits
+        ctl_cell_len("తెలుగు 7")
+        self.assertEqual(cache_info().hits, hits + 1)
+    
+    def test_layouts_merged_into_cache(self):
+        """Test that layouts measured by workers are cached, so cutting the strings does not shape them."""
+        cell_len_parallel(TEXTS, max_workers=2, chunk_size=8)
+        key = CacheKey("తెలుగు 7", width_model=calibrate.width_model.key, kind="layout")
+        self.assertEqual(shape_cache.get(key).total, ctl_cell_len("తెలుగు 7"))
+    
+    def test_small_cache(self):
+        """Test that widths come from the workers even when the cache cannot hold them."""
+        expected = [ctl_cell_len(text) for text in TEXTS]
+        clear_cache()
+        configure_cache(maxsize=4)
+        instrument.reset()
+        instrument.enable()
+        try:
+            widths = cell_len_parallel(TEXTS, max_workers=2, chunk_size=8)
+            misses = instrument.stats()["counters"].get("shape.run_miss", 0)
+        finally:
+            instrument.disable()
+            instrument.reset()
+            configure_cache(maxsize=DEFAULT_MAXSIZE)
+        self.assertEqual(widths, expected)
+        self.assertEqual(misses, 0)
+    
+    def test_small_batch_in_process(self):
+        """Test that a batch within one chunk needs no pool."""
+        self.assertEqual(cell_len_parallel(["తెలుగు"], chunk_size=8), [ctl_cell_len("తెలుగు")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+"""
+Tests for the patch module.
+"""
+
+import unittest
+
+import rich.cells
+import rich.text
+from rich.segment import Segment
+from rich.text import Text
+
+from rich_ctl import calibrate, patch
+from rich_ctl.cache import cache_info, clear_cache, shape_cache
+from rich_ctl.calibrate import WidthModel, set_width_model
+from rich_ctl.layout import get_layout
+from rich_ctl.patch import cell_len_many, ctl_cell_len, patch_rich, unpatch_rich
+
+TELUGU = "తెలుగు భాష చాలా అందమైనది మరియు ప్రాచీనమైనది"
+ARABIC = "اللغة العربية هي أكثر اللغات السامية تحدثا"
+
+
+class TestCellLenMany(unittest.TestCase):
+    """Test cases for batch width measurement."""
+    
+    def setUp(self):
+        clear_cache()
+    
+    def test_matches_single_measurement(self):
+        """Test that batch widths equal measuring each string on its own."""
+        texts = ["hello", "తెలుగు", "", "हिन्दी", "తెలుగు"]
+        widths = cell_len_many(texts)
+        clear_cache()
+        self.assertEqual(widths, [ctl_cell_len(text) for text in texts])
+    
+    def test_simple_text_skips_shaping(self):
+        """Test that text without complex scripts is not shaped."""
+        self.assertEqual(cell_len_many(["café ┌─┐", "日本"]), [8, 4])
+        self.assertEqual(ctl_cell_len("Ωμέγα"), 5)
+        shaped = [key for key in shape_cache.keys() if key.script is not None]
+        self.assertEqual(shaped, [])
+    
+    def test_prewarms_cache(self):
+        """Test that widths measured in a batch are cached for ctl_cell_len."""
+        cell_len_many(["తెలుగు"])
+        hits = cache_info().hits
+        ctl_cell_len("తెలుగు")
+        self.assertEqual(cache_info().hits, hits + 1)
+
+
+
+class TestRichPatches(unittest.TestCase):
+    """Test cases for the cluster-aware Rich patch layer."""
+    
+    def setUp(self):
+        # Fix the width model, so results do not depend on the terminal
+        self.saved_model = set_width_model(WidthModel("default", cell_width_px=20))
+        clear_cache()
+        patch_rich()
+    
+    def tearDown(self):
+        unpatch_rich()
+        set_width_model(self.saved_model)
+        clear_cache()
+    
+    def test_unpatch_restores_rich(self):
+        """Test that unpatching restores every replaced function."""
+        unpatch_rich()
+        self.assertIs(rich.cells.cell_len, patch._original_cell_len)
+        self.assertIs(rich.text.set_cell_size, patch._original_set_cell_size)
+        self.assertIs(Segment.split_cells, patch._original_split_cells)
+        self.assertIs(Text.divide, patch._original_divide)
+    
+    def test_modules_importing_by_name_are_patched(self):
+        """Test that names imported into other Rich modules are replaced."""
+        self.assertIs(rich.text.cell_len, ctl_cell_len)
+        self.assertIs(rich.cells.cell_len, ctl_cell_len)
+    
+    def test_chop_cells_keeps_clusters(self):
+        """Test that chopped lines end on cluster boundaries and fit."""
+        boundaries = set(get_layout(TELUGU, calibrate.width_model).offsets)
+        lines = rich.cells.chop_cells(TELUGU, 10)
+        self.assertEqual("".join(lines), TELUGU)
+        position = 0
+        for line in lines:
+            position += len(line)
+            self.assertIn(position, boundaries)
+            self.assertLessEqual(ctl_cell_len(line), 10)
+    
+    def test_set_cell_size_is_exact(self):
+        """Test that cropping and padding produce the requested width."""
+        for total in (1, 5, 9, 20, 60):
+            self.assertEqual(ctl_cell_len(rich.cells.set_cell_size(TELUGU, total)), total)
+    
+    def test_split_cells_keeps_width(self):
+        """Test that splitting a segment preserves the cut and total widths."""
+        total = ctl_cell_len(TELUGU)
+        for cut in (1, 7, 13):
+            left, right = Segment(TELUGU).split_cells(cut)
+            self.assertEqual(ctl_cell_len(left.text), cut)
+            self.assertEqual(ctl_cell_len(left.text) + ctl_cell_len(right.text), total)
+    
+    def test_pieces_measured_on_their_own(self):
+        """Test that chopping contextual text does not change the widths of its pieces."""
+        for width in range(3, 12):
+            clear_cache()
+            lines = rich.cells.chop_cells(ARABIC, width)
+            after_chop = [ctl_cell_len(line) for line in lines]
+            clear_cache()
+            self.assertEqual(after_chop, [ctl_cell_len(line) for line in lines])
+    
+    def test_divide_snaps_to_clusters(self):
+        """Test that Text.divide moves offsets out of clusters."""
+        # Offset 1 falls inside the first cluster "తె"
+        lines = Text(TELUGU).divide([1, 7])
+        self.assertEqual([line.plain for line in lines], ["తెలుగు ", TELUGU[7:]])
+    
+    def test_wide_clusters_in_shaped_text(self):
+        """Test that East Asian wide clusters take two cells in shaped text, also after a cut."""
+        text = "తెలుగు 中文"
+        self.assertEqual(ctl_cell_len(text), ctl_cell_len("తెలుగు ") + 4)
+        left, right = Segment(text).split_cells(ctl_cell_len("తెలుగు 中"))
+        self.assertEqual(right.text, "文")
+        self.assertEqual(ctl_cell_len(right.text), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+Tests for the persistent shaping cache.
+"""
+
+import sqlite3
+import tempfile
+import threading
+import unittest
+from array import array
+from pathlib import Path
+
+from rich_ctl.persist import SCHEMA_VERSION, PersistentShapeCache
+
+
+class TestPersistentShapeCache(unittest.TestCase):
+    """Test cases for the sqlite-backed shaping cache."""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmpdir.name) / "shaping.sqlite3"
+        self.offsets = array('I', [0, 2, 4, 6])
+        self.advances = array('i', [14, 12, 13])
+    
+    def tearDown(self):
+        self.tmpdir.cleanup()
+    
+    def test_round_trip(self):
+        """Test that stored arrays are read back unchanged."""
+        cache = PersistentShapeCache(self.path)
+        cache.put("digest", "Telu", "ltr", "en", "తెలుగు", self.offsets, self.advances)
+        offsets, advances = cache.get("digest", "Telu", "ltr", "en", "తెలుగు")
+        self.assertEqual(offsets, self.offsets)
+        self.assertEqual(advances, self.advances)
+        cache.close()
+    
+    def test_key_fields(self):
+        """Test that font, direction and language are part of the key."""
+        cache = PersistentShapeCache(self.path)
+        cache.put("digest", "Telu", "ltr", "en", "తెలుగు", self.offsets, self.advances)
+        self.assertIsNone(cache.get("other", "Telu", "ltr", "en", "తెలుగు"))
+        self.assertIsNone(cache.get("digest", "Telu", "rtl", "en", "తెలుగు"))
+        self.assertIsNone(cache.get("digest", "Telu", "ltr", "te", "తెలుగు"))
+        cache.close()
+    
+    def test_shared_between_instances(self):
+        """Test that a second process-like instance sees the stored entries."""
+        writer = PersistentShapeCache(self.path)
+        writer.put("digest", "Telu", "ltr", "en", "తెలుగు", self.offsets, self.advances)
+        reader = PersistentShapeCache(self.path)
+        self.assertIsNotNone(reader.get("digest", "Telu", "ltr", "en", "తెలుగు"))
+        writer.close()
+        reader.close()
+    
+    def test_hb_version_invalidates(self):
+        """Test that entries from another HarfBuzz version are not returned."""
+        cache = PersistentShapeCache(self.path)
+        cache.put("digest", "Telu", "ltr", "en", "తెలుగు", self.offsets, self.advances)
+        cache.hb_version = "0.0.0"
+        self.assertIsNone(cache.get("digest", "Telu", "ltr", "en", "తెలుగు"))
+        cache.close()
+    
+    def test_schema_version_invalidates(self):
+        """Test that a schema version change drops stored entries."""
+        cache = PersistentShapeCache(self.path)
+        cache.put("digest", "Telu", "ltr", "en", "తెలుగు", self.offsets, self.advances)
+        cache.close()
+        conn = sqlite3.connect(str(self.path))
+        conn.execute(f"PRAGMA user_version={SCHEMA_VERSION + 1}")
+        conn.close()
+        cache = PersistentShapeCache(self.path)
+        self.assertIsNone(cache.get("digest", "Telu", "ltr", "en", "తెలుగు"))
+        cache.close()
+    
+    def test_concurrent_writers(self):
+        """Test that several threads can write at once."""
+        cache = PersistentShapeCache(self.path)
+        errors = []
+        
+        def write(n):
+            try:
+                for i in range(20):
+                    cache.put("digest", "Telu", "ltr", "en", f"{n}-{i}", self.offsets, self.advances)
+            except Exception as e:  # pragma: no cover - reported below
+                errors.append(e)
+        
+        threads = [threading.Thread(target=write, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertIsNotNone(cache.get("digest", "Telu", "ltr", "en", "3-19"))
+        cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
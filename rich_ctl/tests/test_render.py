@@ -0,0 +1,127 @@
+"""
+Tests for the render module.
+"""
+
+import io
+import threading
+import unittest
+
+from rich.segment import ControlType, Segment
+from rich.style import Style
+
+from rich_ctl import CTLConsole
+from rich_ctl.cache import clear_cache, shape_cache
+from rich_ctl.calibrate import WidthModel, set_width_model
+from rich_ctl.patch import ctl_cell_len
+from rich_ctl.render import PAD, SPACING, improve_rendering, pad_segments, padding_plan, terminal_model
+
+TELUGU = "తెలుగు భాష చాలా అందమైనది"
+
+
+def _terminal_cells(segments, terminal):
+    """Get the cells a terminal moves by when writing segments."""
+    cells = 0
+    for text, _style, control in segments:
+        if control:
+            code = control[0]
+            cells += code[1] if code[0] == ControlType.CURSOR_FORWARD else -code[1]
+        else:
+            cells += terminal.text_cells(text)
+    return cells
+
+
+class TestPadding(unittest.TestCase):
+    """Test cases for padding clusters to their cell widths."""
+    
+    def setUp(self):
+        self.saved_model = set_width_model(WidthModel("default", cell_width_px=20))
+        clear_cache()
+    
+    def tearDown(self):
+        set_width_model(self.saved_model)
+        clear_cache()
+    
+    def test_plan(self):
+        """Test that the plan covers the difference between the two widths, and is cached."""
+        terminal = terminal_model()
+        plan = padding_plan(TELUGU)
+        self.assertTrue(plan)
+        self.assertEqual(sum(cells for _end, cells in plan), ctl_cell_len(TELUGU) - terminal.text_cells(TELUGU))
+        self.assertIn("padding", [key.kind for key in shape_cache.keys()])
+        self.assertIs(padding_plan(TELUGU), plan)
+        self.assertEqual(padding_plan("plain"), ())
+        # A terminal counting as rich-ctl does needs no padding
+        self.assertEqual(padding_plan(TELUGU, WidthModel("wcwidth-compatible")), ())
+    
+    def test_segments(self):
+        """Test that padded segments move the terminal's cursor by rich-ctl's widths."""
+        style = Style(bold=True)
+        segments = [Segment("x "), Segment(TELUGU, style), Segment("\n")]
+        padded = list(pad_segments(segments))
+        self.assertEqual("".join(text for text, _style, control in padded if not control), "x " + TELUGU + "\n")
+        self.assertEqual(_terminal_cells(padded, terminal_model()), ctl_cell_len("x " + TELUGU))
+        # Rich counts the padding as zero cells
+        self.assertEqual(sum(segment.cell_length for segment in padded),
+                         sum(segment.cell_length for segment in segments))
+        # Padding is a real cursor movement, written as its escape code
+        moves = [segment for segment in padded if segment.control]
+        self.assertTrue(moves)
+        self.assertTrue(all(segment.text.startswith("\x1b[") for segment in moves))
+    
+    def test_cursor_back(self):
+        """Test that clusters the terminal counts wider move the cursor back."""
+        model = WidthModel("kitty")
+        terminal = WidthModel("wcwidth-compatible")
+        padded = list(pad_segments([Segment(TELUGU)], model, terminal))
+        self.assertIn(ControlType.CURSOR_BACKWARD, [segment.control[0][0] for segment in padded if segment.control])
+        self.assertEqual(_terminal_cells(padded, terminal), model.text_cells(TELUGU))
+
+
+class TestConsoleModes(unittest.TestCase):
+    """Test cases for the CTLConsole render modes."""
+    
+    def setUp(self):
+        self.saved_model = set_width_model(WidthModel("default", cell_width_px=20))
+        clear_cache()
+    
+    def tearDown(self):
+        set_width_model(self.saved_model)
+        clear_cache()
+    
+    def _print(self, text, **kwargs):
+        output = io.StringIO()
+        console = CTLConsole(file=output, width=40, color_system=None, **kwargs)
+        console.print(text)
+        return output.getvalue()
+    
+    def test_pad_mode(self):
+        """Test that the default mode pads terminal output and leaves the text alone."""
+        padded = self._print(TELUGU, force_terminal=True)
+        self.assertNotIn(" ", padded)
+        self.assertGreater(len(padded), len(TELUGU) + 1)
+        # Output that is not a terminal has no cursor to correct
+        self.assertEqual(self._print(TELUGU, force_terminal=False), TELUGU + "\n")
+    
+    def test_threads_pad_independently(self):
+        """Test that a render in progress on one thread does not turn off padding on another."""
+        console = CTLConsole(file=io.StringIO(), width=40, color_system=None, force_terminal=True)
+        rendering = console.render(TELUGU)
+        next(rendering)
+        padded = []
+        thread = threading.Thread(target=lambda: padded.extend(
+            segment for segment in console.render(TELUGU) if segment.control))
+        thread.start()
+        thread.join()
+        list(rendering)
+        self.assertTrue(padded)
+    
+    def test_spacing_mode(self):
+        """Test that the legacy mode still inserts hair spaces."""
+        self.assertIn(" ", self._print(TELUGU, force_terminal=True, render_mode=SPACING))
+        self.assertEqual(improve_rendering(TELUGU, PAD), TELUGU)
+        with self.assertRaises(ValueError):
+            CTLConsole(file=io.StringIO(), render_mode="hair")
+
+
+if __name__ == "__main__":
+    unittest.main()
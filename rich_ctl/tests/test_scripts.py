@@ -0,0 +1,57 @@
+"""
+Tests for the scripts module.
+"""
+
+import unittest
+from rich_ctl.scripts import (
+    COMPLEX_SCRIPTS,
+    has_complex_script,
+    is_rtl_script,
+    script_of,
+    scripts_of,
+)
+from rich_ctl.render import get_script, needs_complex_rendering, insert_spacing
+
+
+class TestScriptClassification(unittest.TestCase):
+    """Test cases for code point to script classification."""
+    
+    def test_iso_codes(self):
+        """Test that characters map to ISO 15924 script codes."""
+        self.assertEqual(script_of("a"), "Latn")
+        self.assertEqual(script_of("త"), "Telu")
+        self.assertEqual(script_of("ह"), "Deva")
+        self.assertEqual(script_of("م"), "Arab")
+        self.assertEqual(script_of("ש"), "Hebr")
+        self.assertEqual(script_of("中"), "Hani")
+        self.assertEqual(script_of(" "), "Zyyy")
+        self.assertEqual(script_of("́"), "Zinh")
+    
+    def test_supplementary_plane(self):
+        """Test that non-BMP characters are classified."""
+        self.assertEqual(script_of("😀"), "Zyyy")
+        self.assertEqual(script_of("\U00020000"), "Hani")
+    
+    def test_scripts_of_matches_script_of(self):
+        """Test that the batch API agrees with the per-character API."""
+        text = "Hi తెలుగు, हिन्दी مرحبا 😀 中文"
+        self.assertEqual(scripts_of(text), [script_of(c) for c in text])
+        self.assertEqual(scripts_of(""), [])
+    
+    def test_complex_detection(self):
+        """Test complex script detection."""
+        self.assertTrue(has_complex_script("abc తెలుగు"))
+        self.assertFalse(has_complex_script("café Ωμέγα"))
+        self.assertTrue(is_rtl_script("arab"))
+        self.assertFalse(is_rtl_script("Telu"))
+    
+    def test_render_uses_iso_codes(self):
+        """Test that render helpers see the COMPLEX_SCRIPTS tags."""
+        self.assertIn(get_script("త"), COMPLEX_SCRIPTS)
+        self.assertTrue(needs_complex_rendering("తెలుగు"))
+        self.assertFalse(needs_complex_rendering("Ελληνικά"))
+        self.assertEqual(insert_spacing("\u0c24\u0c46"), "\u0c24\u200a\u0c46\u200a")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,7 +3,18 @@ Tests for the shape module.
 """
 
 import unittest
-from rich_ctl.shape import shape_text, Cluster
+from types import SimpleNamespace
+from rich_ctl.cache import clear_cache
+from rich_ctl.shape import (shape_many, shape_text, shape_text_compact, Cluster, ShapedRun,
+                            _clusters_from_buffer)
+
+
+def _fake_buffer(glyphs):
+    """Build a stand-in for a shaped hb.Buffer from (cluster, x_advance) pairs."""
+    return SimpleNamespace(
+        glyph_infos=[SimpleNamespace(cluster=c) for c, _ in glyphs],
+        glyph_positions=[SimpleNamespace(x_advance=a) for _, a in glyphs],
+    )
 
 
 class TestShapeText(unittest.TestCase):
@@ -38,5 +49,87 @@ class TestShapeText(unittest.TestCase):
         self.assertTrue(all(isinstance(c, Cluster) for c in result))
 
 
+class TestShapedRun(unittest.TestCase):
+    """Test cases for the compact ShapedRun type."""
+    
+    def test_from_clusters(self):
+        """Test that a run round-trips through Cluster objects."""
+        run = ShapedRun.from_clusters([Cluster("తె", 14), Cluster("లు", 12), Cluster("గు", 13)])
+        self.assertEqual(run.text, "తెలుగు")
+        self.assertEqual(len(run), 3)
+        self.assertEqual(run.total_advance, 39)
+        self.assertEqual([c.text for c in run], ["తె", "లు", "గు"])
+        self.assertEqual(run[-1].advance_px, 13)
+        with self.assertRaises(IndexError):
+            run[3]
+    
+    def test_concat(self):
+        """Test that runs are joined with shifted offsets."""
+        first = ShapedRun.from_clusters([Cluster("ab", 10)])
+        second = ShapedRun.from_clusters([Cluster("c", 5), Cluster("d", 6)])
+        joined = ShapedRun.concat("abcd", [first, second])
+        self.assertEqual(list(joined.offsets), [0, 2, 3, 4])
+        self.assertEqual(joined.total_advance, 21)
+    
+    def test_cluster_has_no_dict(self):
+        """Test that clusters use slots instead of a per-instance dict."""
+        self.assertFalse(hasattr(Cluster("a", 1), "__dict__"))
+    
+    def test_compact_empty_text(self):
+        """Test that empty text returns an empty run."""
+        run = shape_text_compact("")
+        self.assertEqual(len(run), 0)
+        self.assertEqual(run.total_advance, 0)
+
+
+class TestClusterMapping(unittest.TestCase):
+    """Test cases for mapping HarfBuzz glyphs back to clusters."""
+    
+    def test_multi_glyph_cluster(self):
+        """Test that glyphs sharing a cluster value are summed."""
+        run = _clusters_from_buffer("abc", _fake_buffer([(0, 5), (0, 2), (1, 6), (2, 7)]), False)
+        self.assertEqual([(c.text, c.advance_px) for c in run], [("a", 7), ("b", 6), ("c", 7)])
+    
+    def test_glyphless_characters_are_kept(self):
+        """Test that characters between cluster starts stay in the cluster."""
+        # Telugu KA + VIRAMA + SSA form one conjunct glyph at cluster 0
+        text = "\u0c15\u0c4d\u0c37\u0c3f"
+        run = _clusters_from_buffer(text, _fake_buffer([(0, 20), (3, 4)]), False)
+        self.assertEqual([c.text for c in run], ["\u0c15\u0c4d\u0c37", "\u0c3f"])
+        self.assertEqual("".join(c.text for c in run), text)
+    
+    def test_rtl_clusters_in_logical_order(self):
+        """Test that RTL glyph order is mapped back to logical order."""
+        run = _clusters_from_buffer("abc", _fake_buffer([(2, 3), (1, 2), (0, 1)]), True)
+        self.assertEqual([(c.text, c.advance_px) for c in run], [("a", 1), ("b", 2), ("c", 3)])
+
+
+
+class TestShapeMany(unittest.TestCase):
+    """Test cases for batch shaping."""
+    
+    def setUp(self):
+        clear_cache()
+    
+    def test_matches_single_shaping(self):
+        """Test that batch results equal shaping each string on its own."""
+        texts = ["తెలుగు", "hello", "", "مرحبا", "English తెలుగు"]
+        batch = shape_many(texts)
+        self.assertEqual(len(batch), len(texts))
+        for text, run in zip(texts, batch):
+            single = shape_text_compact(text)
+            self.assertEqual(run.text, single.text)
+            self.assertEqual(list(run.advances), list(single.advances))
+    
+    def test_duplicates_shaped_once(self):
+        """Test that identical inputs share one result."""
+        first, second = shape_many(["తెలుగు", "తెలుగు"])
+        self.assertIs(first, second)
+    
+    def test_accepts_iterables(self):
+        """Test that any iterable of strings is accepted."""
+        self.assertEqual([run.text for run in shape_many(iter(["a", "b"]))], ["a", "b"])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,85 @@
+"""
+Tests for import-time cost.
+
+Each check runs in a fresh interpreter, since modules already imported by
+the test process would hide the cost.
+"""
+
+import json
+import subprocess
+import sys
+import unittest
+
+# Modules that must not be loaded until something needs them
+HEAVY_MODULES = ["uharfbuzz", "rich.console", "asyncio", "regex"]
+
+# Import-time budgets in milliseconds, generous enough for slow CI machines
+IMPORT_BUDGET_MS = {
+    "rich_ctl": 50,
+    "rich_ctl.cli": 150,
+    "rich_ctl.patch": 300,
+}
+
+
+def _run(code):
+    """Run code in a fresh interpreter and return the JSON it prints."""
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def _loaded_after(code):
+    """Get which heavy modules are loaded after running code."""
+    return _run(code + f"\nimport json, sys\nprint(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))")
+
+
+def _import_ms(module):
+    """Get the best of three import times of a module, in milliseconds."""
+    code = (
+        "import json, time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "print(json.dumps((time.perf_counter() - start) * 1000))\n"
+    )
+    return min(_run(code) for _ in range(3))
+
+
+class TestLazyImports(unittest.TestCase):
+    """Test cases for deferred imports."""
+
+    def test_import_package(self):
+        """Test that importing the package loads no heavy dependencies."""
+        self.assertEqual(_loaded_after("import rich_ctl"), [])
+
+    def test_measure_without_shaping(self):
+        """Test that measuring text without complex scripts does not load HarfBuzz."""
+        code = (
+            "from rich_ctl.patch import ctl_cell_len\n"
+            "assert ctl_cell_len('hello') == 5\n"
+            "assert ctl_cell_len('caf\\u00e9') == 4\n"
+        )
+        self.assertEqual(_loaded_after(code), [])
+
+    def test_lazy_names(self):
+        """Test that public names resolve on first access."""
+        code = "import rich_ctl\nrich_ctl.CTLConsole\nrich_ctl.shape_text"
+        self.assertIn("uharfbuzz", _loaded_after(code))
+        self.assertIn("rich.console", _loaded_after(code))
+        import rich_ctl
+        for name in rich_ctl.__all__:
+            self.assertIn(name, dir(rich_ctl))
+        with self.assertRaises(AttributeError):
+            rich_ctl.no_such_name
+
+
+class TestImportBudget(unittest.TestCase):
+    """Test cases for import-time budgets."""
+
+    def test_budgets(self):
+        """Test that importing each module stays within its budget."""
+        for module, budget in IMPORT_BUDGET_MS.items():
+            with self.subTest(module=module):
+                self.assertLess(_import_ms(module), budget)
+
+
+if __name__ == "__main__":
+    unittest.main()
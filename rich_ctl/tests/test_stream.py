@@ -0,0 +1,87 @@
+"""
+Tests for the stream module and the cat command.
+"""
+
+import io
+import unittest
+
+from rich_ctl import calibrate
+from rich_ctl.calibrate import WidthModel, set_width_model
+from rich_ctl.layout import get_layout
+from rich_ctl.stream import CTL_PREFIX, RICH_PREFIX, read_lines, stream, wrap
+
+
+class TestReadLines(unittest.TestCase):
+    """Test cases for incremental reading."""
+    
+    def test_chunks_split_lines(self):
+        """Test that lines spanning chunk boundaries are joined."""
+        text = "first line\nసెకండ్ లైన్\n\nlast"
+        self.assertEqual(list(read_lines(io.StringIO(text), chunk_size=3)),
+                         ["first line", "సెకండ్ లైన్", "", "last"])
+    
+    def test_line_buffered(self):
+        """Test reading one line at a time."""
+        self.assertEqual(list(read_lines(io.StringIO("a\nb\n"), line_buffered=True)), ["a", "b"])
+    
+    def test_long_lines_bounded(self):
+        """Test that a line longer than the limit is yielded in pieces."""
+        pieces = list(read_lines(io.StringIO("x" * 25), chunk_size=4, max_line=10))
+        self.assertEqual(pieces, ["x" * 10, "x" * 10, "x" * 5])
+
+
+class TestWrap(unittest.TestCase):
+    """Test cases for wrapping with the CTL engine."""
+    
+    def setUp(self):
+        self.saved_model = set_width_model(WidthModel("default", cell_width_px=20))
+    
+    def tearDown(self):
+        set_width_model(self.saved_model)
+    
+    def test_ascii_words(self):
+        """Test word wrapping of ASCII text."""
+        self.assertEqual(wrap("the quick brown fox", 10), ["the quick", "brown fox"])
+        self.assertEqual(wrap("", 10), [""])
+    
+    def test_clusters_fit(self):
+        """Test that wrapped lines fit and break on cluster boundaries."""
+        text = "తెలుగు భాష ద్రావిడ భాషల కుటుంబానికి చెందినది"
+        offsets = get_layout(text, calibrate.width_model).offsets
+        lines = wrap(text, 8, words=False)
+        # Spaces at the breaks are dropped
+        self.assertEqual("".join(lines).replace(" ", ""), text.replace(" ", ""))
+        position = 0
+        for line in lines:
+            position = text.index(line, position)
+            self.assertIn(position, offsets)
+            self.assertIn(position + len(line), offsets)
+            layout = get_layout(line, calibrate.width_model)
+            # Only a single cluster wider than the line may overflow
+            self.assertTrue(layout.total <= 8 or len(layout) == 1)
+    
+    def test_stream_compare(self):
+        """Test that compare mode writes both renderings of each line."""
+        out = io.StringIO()
+        count = stream([io.StringIO("abc\nహలో\n")], out, 40, compare=True)
+        self.assertEqual(count, 2)
+        self.assertEqual(out.getvalue().splitlines(), [
+            CTL_PREFIX + "abc", RICH_PREFIX + "abc", CTL_PREFIX + "హలో", RICH_PREFIX + "హలో",
+        ])
+    
+    def test_stream_buffered_writes(self):
+        """Test that output is written in chunks of the buffer size."""
+        writes = []
+        
+        class Out(io.StringIO):
+            def write(self, s):
+                writes.append(s)
+                return super().write(s)
+        
+        stream([io.StringIO("line\n" * 100)], Out(), 40, buffer_size=50)
+        self.assertLess(len(writes), 20)
+        self.assertEqual("".join(writes), "line\n" * 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+"""
+Stress tests for shaping and measuring from several threads.
+"""
+
+import threading
+import unittest
+
+from rich_ctl.cache import clear_cache, configure_cache, DEFAULT_MAXSIZE
+from rich_ctl.fonts import get_font
+from rich_ctl.patch import ctl_cell_len
+
+THREADS = 8
+ROUNDS = 20
+
+TEXTS = [
+    "తెలుగు భాష", "हिन्दी भाषा", "مرحبا بالعالم", "தமிழ்", "ಕನ್ನಡ", "ภาษาไทย",
+    "café crème", "Ωμέγα", "日本語", "\U0001f44d\U0001f3fd ok", "English తెలుగు mix",
+] + [f"తెలుగు {i}" for i in range(50)]
+
+
+def _run_threads(target):
+    """Start THREADS threads on ``target`` together and collect their results."""
+    barrier = threading.Barrier(THREADS)
+    results = [None] * THREADS
+    errors = []
+    
+    def worker(index):
+        try:
+            barrier.wait()
+            results[index] = target()
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+    
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return results
+
+
+class TestThreadSafety(unittest.TestCase):
+    """Test cases for concurrent use of the shaping engine."""
+    
+    def tearDown(self):
+        configure_cache(maxsize=DEFAULT_MAXSIZE)
+        clear_cache()
+    
+    def test_cell_len_matches_single_threaded(self):
+        """Test that concurrent measurement matches a single-threaded run."""
+        clear_cache()
+        expected = [ctl_cell_len(text) for text in TEXTS]
+        # A small cache keeps entries being evicted while threads read them
+        configure_cache(maxsize=32)
+        clear_cache()
+        
+        def measure():
+            return [[ctl_cell_len(text) for text in TEXTS] for _ in range(ROUNDS)]
+        
+        for rounds in _run_threads(measure):
+            for widths in rounds:
+                self.assertEqual(widths, expected)
+    
+    def test_font_loaded_once(self):
+        """Test that concurrent first lookups share one font object."""
+        fonts = _run_threads(lambda: get_font(size=13))
+        self.assertTrue(all(font is fonts[0] for font in fonts))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -30,6 +30,9 @@ setup(
         "regex",
         "python-bidi",
     ],
+    extras_require={
+        "numpy": ["numpy"],
+    },
     entry_points={
         "console_scripts": [
             "rich-ctl=rich_ctl.cli:main",